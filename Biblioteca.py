@@ -1,20 +1,74 @@
 import streamlit as st
-from pymongo import MongoClient
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
 from datetime import datetime, UTC
 import tempfile
 import json
 # import os
-import re
+from functools import partial
+
+from catalogo import (
+    TAMANHO_PAGINA,
+    buscar_arquivos,
+    chave_paginacao,
+    contar_arquivos,
+    contar_facetas,
+    filtro_prefixo,
+    listar_temas,
+    versao_catalogo
+)
+from cards import chave_card, html_card, html_grade, imagens_card
+from funcoes_auxiliares import (
+    cache_miniaturas,
+    cards_catalogo,
+    catalogo_parquet,
+    conectar_mongo_dialogos_babacu,
+    consultas_catalogo_async,
+    indice_catalogo,
+    snapshot_catalogo
+)
+from rastreamento import fase
 
 
 # --------------------------------------------------------------
 # Configurações do MongoDB
 # --------------------------------------------------------------
 
-client = MongoClient(st.secrets.mongo.string_conexao_mongo)
-db = client[st.secrets.mongo.bd_dialogos]
+# Conexão compartilhada (pool único para todas as páginas)
+db = conectar_mongo_dialogos_babacu()
+
+# Índice do catálogo em memória, mantido por change stream, ou snapshot Parquet
+# atualizado periodicamente (None se os dois estiverem desativados).
+# Com ele, os cards, contagens e temas são lidos da memória.
+indice_memoria = indice_catalogo()
+indice = indice_memoria or catalogo_parquet()
+fonte_versao = "indice" if indice_memoria else "parquet" if indice else "mongo"
+
+
+# Consultas ao MongoDB: uma por coleção, em paralelo (cliente assíncrono), ou
+# um único pipeline com $unionWith. As duas formas retornam o mesmo resultado.
+consultas_async = consultas_catalogo_async()
+if consultas_async:
+    consultar_arquivos = consultas_async.buscar_arquivos
+    consultar_total = consultas_async.contar_arquivos
+    consultar_facetas = consultas_async.contar_facetas
+else:
+    consultar_arquivos = partial(buscar_arquivos, db)
+    consultar_total = partial(contar_arquivos, db)
+    consultar_facetas = partial(contar_facetas, db)
+
+
+# Versão do catálogo: a do índice em memória ou o contador salvo no MongoDB
+def ler_versao():
+    return indice.versao if indice else versao_catalogo(db)
+
+
+# Resultados de consultas compartilhados entre as sessões, válidos
+# enquanto a versão do catálogo não muda (ela muda a cada escrita no acervo).
+# A página só lê os resultados (copiar=False): os cards, as contagens e os
+# temas nunca alteram os documentos recebidos
+snapshot = snapshot_catalogo(fonte_versao)
+versao = ler_versao()
 
 # Carragando cada coleção
 publicacoes = db["publicacoes"]
@@ -110,326 +164,204 @@ TIPOS_MIDIA = {
     "Pesquisa": ":material/query_stats: Pesquisa"
 }
 
-TIPOS_MIDIA_ICONE = {
-    "Publicação": "menu_book",
-    "Imagem": "add_a_photo",
-    "Relatório": "assignment",
-    "Vídeo": "videocam",
-    "Podcast": "podcasts",
-    "Site": "language",
-    "Mapa": "map",
-    "Legislação": "balance",
-    "Ponto de interesse": "location_on",
-    "Organização": "things_to_do",
-    "Projeto": "assignment",
-    "Pesquisa": "query_stats"
-}
-
 
 # ------------------ 1. FORMULÁRIO DE FILTROS ------------------ #
-with st.expander("Filtros"):
+
+# Quantidade de documentos por tipo e por tema para a palavra-chave buscada
+# (uma única agregação com $facet, compartilhada entre as sessões)
+def calcular_facetas(texto):
+    if indice:
+        return indice.contar_facetas(texto)
+
+    facetas = consultar_facetas(texto=texto)
+
+    # Mesma regra da listagem: sem resultado na busca textual, usa a busca por prefixo
+    if texto and not facetas["tipo"]:
+        facetas = consultar_facetas(filtro_prefixo(texto))
+
+    return facetas
+
+
+# Aplica os filtros no clique em "Filtrar". Como callback, roda antes da
+# execução da página, então o formulário já mostra as quantidades da nova
+# palavra-chave na mesma execução, sem um st.rerun()
+def aplicar_filtros():
+    texto = st.session_state.filtro_busca.strip() or None
+    iniciar_consulta(st.session_state.filtro_tipos, st.session_state.filtro_temas, texto, versao_consulta=ler_versao())
+
+
+with fase("formulário de filtros"), st.expander("Filtros"):
     with st.form("form_filtros", border=False):
 
-        # Lista com ícones para exibir nas pills
-        rotulos_com_icone = list(TIPOS_MIDIA.values())
+        # Filtros aplicados na última consulta desta sessão. As quantidades se referem
+        # à palavra-chave aplicada e, como elas fazem parte dos rótulos, a seleção
+        # aplicada é repassada como padrão quando os rótulos mudam.
+        tipos_aplicados, temas_aplicados, texto_aplicado = st.session_state.get("biblioteca_filtros", (None, None, None))
+        tipos_aplicados, temas_aplicados = tipos_aplicados or [], temas_aplicados or []
 
-        pills_selecionadas = st.pills(
+        facetas = snapshot.obter(versao, repr(("facetas", texto_aplicado)), lambda: calcular_facetas(texto_aplicado), copiar=False)
+
+        # Pills com ícone e quantidade de documentos de cada tipo
+        st.pills(
             label="Tipo de Mídia",
-            options=rotulos_com_icone,
-            selection_mode="multi"
+            options=list(TIPOS_MIDIA),
+            format_func=lambda tipo: f"{TIPOS_MIDIA[tipo]} ({facetas['tipo'].get(tipo, 0)})",
+            selection_mode="multi",
+            default=tipos_aplicados,
+            key="filtro_tipos"
         )
 
-        # Converter de volta para o valor real (sem ícone)
-        tipo_midia_selecionada = [
-            tipo for tipo, rotulo in TIPOS_MIDIA.items() if rotulo in pills_selecionadas
-        ]
-
-        # Buscar temas distintos em cada coleção
-        temas_publicacoes = publicacoes.distinct("tema")
-        temas_imagens = imagens.distinct("tema")
-        temas_videos = videos.distinct("tema")
-        temas_podcasts = podcasts.distinct("tema")
-        temas_sites = sites.distinct("tema")
-        temas_mapas = mapas.distinct("tema")
-        temas_legislacao = legislacao.distinct("tema")
-        temas_pontos = pontos_interesse.distinct("tema")
-        temas_relatorios = relatorios.distinct("tema")
-        temas_organizacoes = organizacoes.distinct("tema")
-        temas_projetos = projetos.distinct("tema")
-        temas_pesquisas = pesquisas.distinct("tema")
-
-        todos_os_temas = set(
-            temas_publicacoes + temas_imagens + temas_videos + temas_podcasts +
-            temas_sites + temas_mapas + temas_legislacao + temas_pontos + temas_relatorios + 
-            temas_organizacoes + temas_projetos + temas_pesquisas
-        )
-        temas_disponiveis = sorted(todos_os_temas)
+        # Temas disponíveis, lidos da coleção de facetas (uma única consulta)
+        temas_disponiveis = snapshot.obter(versao, "temas", lambda: indice.temas() if indice else listar_temas(db), copiar=False)
 
-        temas_selecionados = st.pills(
+        st.pills(
             label="Tema",
             options=temas_disponiveis,
-            selection_mode="multi"
+            format_func=lambda tema: f"{tema} ({facetas['tema'].get(tema, 0)})",
+            selection_mode="multi",
+            default=[tema for tema in temas_aplicados if tema in temas_disponiveis],
+            key="filtro_temas"
         )
 
         col1, col2, col3 = st.columns([6, 4, 2])
-        busca_texto = col1.text_input("Buscar palavra chave")
+        col1.text_input("Buscar palavra chave", key="filtro_busca")
 
         # col3.write('')
         # col3.write('')
 
-        filtrar = st.form_submit_button("Filtrar", icon=":material/filter_list:", type="primary", width=200)
+        st.form_submit_button("Filtrar", icon=":material/filter_list:", type="primary", width=200, on_click=aplicar_filtros)
 
 
 
-# ------------------ 2. CONSULTA INICIAL (sem filtros = mostra tudo) ------------------ #
-def buscar_arquivos(query={}):
-    docs_publicacoes = list(publicacoes.find(query))
-    docs_imagens = list(imagens.find(query))
-    docs_videos = list(videos.find(query))
-    docs_podcasts = list(podcasts.find(query))
-    docs_sites = list(sites.find(query))
-    docs_mapas = list(mapas.find(query))
-    docs_legislacao = list(legislacao.find(query))
-    docs_pontos = list(pontos_interesse.find(query))
-    docs_relatorios = list(relatorios.find(query))
-    docs_organizacoes = list(organizacoes.find(query))
-    docs_projetos = list(projetos.find(query))
-    docs_pesquisas = list(pesquisas.find(query))
+# ------------------ 2. CONSULTA PAGINADA ------------------ #
 
-    for doc in docs_publicacoes: doc["_colecao"] = "publicacoes"
-    for doc in docs_imagens: doc["_colecao"] = "imagens"
-    for doc in docs_videos: doc["_colecao"] = "videos"
-    for doc in docs_podcasts: doc["_colecao"] = "podcasts"
-    for doc in docs_sites: doc["_colecao"] = "sites"
-    for doc in docs_mapas: doc["_colecao"] = "mapas"
-    for doc in docs_legislacao: doc["_colecao"] = "legislacao"
-    for doc in docs_pontos: doc["_colecao"] = "pontos_de_interesse"
-    for doc in docs_relatorios: doc["_colecao"] = "relatorios"
-    for doc in docs_organizacoes: doc["_colecao"] = "organizacoes"
-    for doc in docs_projetos: doc["_colecao"] = "projetos"
-    for doc in docs_pesquisas: doc["_colecao"] = "pesquisas"
+# Query do MongoDB para os filtros. A palavra-chave é buscada no índice de texto
+# ou, no modo "prefixo", como início dos termos normalizados (sem acento).
+def montar_query(tipos, temas, texto, modo_busca):
+    query = {}
 
-    arquivos_resultado = (
-        docs_publicacoes + docs_imagens + docs_videos + docs_podcasts +
-        docs_sites + docs_mapas + docs_legislacao + docs_pontos + docs_relatorios + 
-        docs_organizacoes + docs_projetos + docs_pesquisas
-    )
+    if tipos:
+        query["tipo"] = {"$in": tipos}
 
+    if temas:
+        query["tema"] = {"$in": temas}
 
-    return arquivos_resultado
+    if modo_busca == "prefixo":
+        query.update(filtro_prefixo(texto))
 
+    return query, texto if modo_busca == "textual" else None
 
 
+# Os cards são carregados em páginas de TAMANHO_PAGINA, usando como cursor
+# a chave (data_upload, _id) do último card já carregado. Na busca textual,
+# a ordem é por relevância e o cursor é (_relevancia, _id).
+def carregar_mais_arquivos():
+    with fase("consulta"):
+        carregados = st.session_state.biblioteca_arquivos
+        tipos, temas, texto = st.session_state.biblioteca_filtros
+        modo_busca = st.session_state.biblioteca_modo_busca
+        apos = chave_paginacao(carregados[-1], por_relevancia=modo_busca == "textual") if carregados else None
 
-# Consulta inicial (sem filtros)
-arquivos = buscar_arquivos()
+        if indice:
+            carregados.extend(indice.buscar(tipos, temas, texto, limite=TAMANHO_PAGINA, apos=apos))
+            return
 
-# ------------------ 3. SE CLICAR EM FILTRAR → APLICA FILTROS ------------------ #
-if filtrar:
-    query = {}
+        query, texto_busca = montar_query(tipos, temas, texto, modo_busca)
 
-    if tipo_midia_selecionada:
-        query["tipo"] = {"$in": tipo_midia_selecionada}
+        # Lê a versão de novo: este callback roda antes da próxima execução da página
+        carregados.extend(snapshot.obter(
+            ler_versao(),
+            repr(("arquivos", query, texto_busca, apos)),
+            lambda: consultar_arquivos(query, limite=TAMANHO_PAGINA, apos=apos, para_card=True, texto=texto_busca),
+            copiar=False
+        ))
 
-    if temas_selecionados:
-        query["tema"] = {"$in": temas_selecionados}
 
-    if busca_texto.strip():
-        texto = busca_texto.strip()
-        query["$or"] = [
-            {"titulo": {"$regex": texto, "$options": "i"}},
-            {"descricao": {"$regex": texto, "$options": "i"}},
-            {"tema": {"$regex": texto, "$options": "i"}},
-            {"autor": {"$regex": texto, "$options": "i"}},
-            {"organizacao": {"$regex": texto, "$options": "i"}}
-        ]
+# Reinicia a listagem com uma nova consulta. Nos callbacks, a versão é lida
+# de novo (`versao_consulta`), porque eles rodam antes da próxima execução
+def iniciar_consulta(tipos=None, temas=None, texto=None, versao_consulta=None):
+    versao_consulta = versao if versao_consulta is None else versao_consulta
+    st.session_state.biblioteca_filtros = (tipos, temas, texto)
+    st.session_state.biblioteca_versao = versao_consulta
 
-    arquivos = buscar_arquivos(query)
+    with fase("contagem"):
+        if indice:
+            # No índice em memória e no snapshot Parquet, a palavra-chave é buscada nos termos normalizados
+            modo_busca = "prefixo" if texto else None
+            total = indice.contar(tipos, temas, texto)
 
+        else:
+            modo_busca = "textual" if texto else None
+            query, texto_busca = montar_query(tipos, temas, texto, modo_busca)
+            total = snapshot.obter(versao_consulta, repr(("total", query, texto_busca)), lambda: consultar_total(query, texto_busca), copiar=False)
 
-# ------------------ 4. TRATAR RESULTADOS ------------------ #
+            # Sem resultado na busca textual (que só encontra palavras inteiras), tenta
+            # os termos digitados como prefixo dos termos normalizados, sem acento:
+            # "babac" ou "BABACU" encontram "Babaçu"
+            if texto and total == 0:
+                modo_busca = "prefixo"
+                query, texto_busca = montar_query(tipos, temas, texto, modo_busca)
+                total = snapshot.obter(versao_consulta, repr(("total", query, texto_busca)), lambda: consultar_total(query), copiar=False)
 
+    st.session_state.biblioteca_modo_busca = modo_busca
+    st.session_state.biblioteca_total = total
+    st.session_state.biblioteca_arquivos = []
+    carregar_mais_arquivos()
 
 
+# Consulta inicial (sem filtros)
+if "biblioteca_filtros" not in st.session_state:
+    iniciar_consulta()
 
-if arquivos:
-    # Ordenação e limpeza de campos
-    arquivos.sort(key=lambda x: x.get("data_upload", None), reverse=True)
+# O catálogo mudou desde a última consulta desta sessão: refaz com os mesmos filtros
+elif st.session_state.biblioteca_versao != versao:
+    iniciar_consulta(*st.session_state.biblioteca_filtros)
 
+# ------------------ 3. FILTROS ------------------ #
+# Aplicados no callback aplicar_filtros, antes desta execução
 
-    for item in arquivos:  # Para cada dicionário (item) dentro da lista 'arquivos'
-        if isinstance(item.get("tema"), list):  # Verifica se o valor da chave "tema" é uma lista
-            item["tema"] = ", ".join(item["tema"])  # Concatena os elementos da lista em uma string separada por vírgulas
-        if isinstance(item.get("organizacao"), list):  # Verifica se o valor da chave "organizacao" é uma lista
-            item["organizacao"] = ", ".join(item["organizacao"])  # Concatena os elementos da lista em uma string separada por vírgulas
+arquivos = st.session_state.biblioteca_arquivos
+total_arquivos = st.session_state.biblioteca_total
 
 
-    # Contagem de documentos
-    st.subheader(f"{len(arquivos)} documento" if len(arquivos) == 1 else f"{len(arquivos)} documentos")
-    st.write("")
+# ------------------ 4. TRATAR RESULTADOS ------------------ #
+
 
-    # Container horizontal para os cards
-    with st.container(border=False, horizontal=True, width='stretch'):
-        for arq in arquivos:
-
-
-            with st.container(border=True, width=280, height=500, key=arq.get("_id", None)):
-
-                # ??????????????????????
-                # st.write(arq)
-
-                tipo = arq.get("tipo", "Tipo não informado")
-                icon = TIPOS_MIDIA_ICONE.get(tipo, "")
-                titulo = arq.get("titulo", "Sem título")
-                descricao = arq.get("descricao", "Sem descrição")
-                autor = arq.get("autor", "Autor desconhecido")
-                tema = arq.get("tema", "")
-                organizacao = arq.get("organizacao", "")
-                link = arq.get("link", "#")
-                thumb_link = arq.get("thumb_link", None)
-
-                st.write(f":material/{icon}: {tipo}")
-
-
-
-                # Mostrar miniatura -------------------------
-
-                # Renderiza icone balance
-                if tipo == "Legislação":
-                    st.markdown("""
-                        <link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">
-                        <div style="text-align:center; margin: 40px 0;">
-                            <span class="material-icons" style="font-size: 100px; color: #777;">
-                                balance
-                            </span>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                # Renderiza icone assignment
-                if tipo == "Projeto":
-                    st.markdown("""
-                        <link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">
-                        <div style="text-align:center; margin: 40px 0;">
-                            <span class="material-icons" style="font-size: 100px; color: #777;">
-                                assignment
-                            </span>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                # Renderiza icone assignment
-                if tipo == "Pesquisa":
-                    st.markdown("""
-                        <link href="https://fonts.googleapis.com/icon?family=Material+Icons" rel="stylesheet">
-                        <div style="text-align:center; margin: 40px 0;">
-                            <span class="material-icons" style="font-size: 100px; color: #777;">
-                                query_stats
-                            </span>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                if tipo == "Organização":
-
-                    # Renderiza logotipo
-                    logotipo_link = arq.get("logotipo", None)
-
-                    if logotipo_link and "drive.google.com" in logotipo_link:
-                                file_id = None
-                                if "/d/" in logotipo_link:
-                                    file_id = logotipo_link.split("/d/")[1].split("/")[0]
-                                elif "id=" in logotipo_link:
-                                    import re
-                                    m = re.search(r"id=([a-zA-Z0-9_-]+)", logotipo_link)
-                                    if m:
-                                        file_id = m.group(1)
-
-                                if file_id:
-                                    direct_url = f"https://drive.google.com/thumbnail?sz=w280&id={file_id}"
-                                    st.image(direct_url, width=280)
-                                else:
-                                    st.warning("Não foi possível extrair o ID do logotipo.")
-
-
-                # Renderiza miniatura
-                if thumb_link:
-
-                    # ?????????????????????/
-                    # st.write(thumb_link)
-                
-                    try:
-                        # --- Caso seja Google Drive ---
-                        if "drive.google.com" in thumb_link:
-                            file_id = None
-                            # extrair ID de /d/ID/
-                            if "/d/" in thumb_link:
-                                file_id = thumb_link.split("/d/")[1].split("/")[0]
-                            # extrair ID de ?id=ID
-                            elif "id=" in thumb_link:
-                                import re
-                                m = re.search(r"id=([a-zA-Z0-9_-]+)", thumb_link)
-                                if m:
-                                    file_id = m.group(1)
-
-                            if file_id:
-                                direct_url = f"https://drive.google.com/thumbnail?sz=w280&id={file_id}"
-                                st.image(direct_url, width=280)
-                            else:
-                                st.warning("ID do arquivo Drive não pôde ser extraído")
-
-                        # --- Caso seja YouTube ---
-                        elif "img.youtube.com" in thumb_link:
-                            st.image(thumb_link, width=280)
-
-                        # --- Outros links (opcional) ---
-                        else:
-                            st.image(thumb_link, width=280)
-
-                    except Exception as e:
-                        st.warning(f"Erro ao exibir miniatura: {e}")
-
-
-                # ---------------------------------------------
-
-
-                # texto
-                st.markdown(f"<h5 style='margin-bottom: 0.5rem'>{titulo}</h5>", unsafe_allow_html=True)
-                sigla_container = st.container()
-                st.write(descricao)
-                autor_container = st.container()
-                
-                if organizacao and organizacao.strip():
-                    st.write(f"**Organização:** {organizacao}")
-                
-                if tema and tema.strip():
-                    st.write(f"**Tema:** {tema}")
-                
-                # Se for organização ou projeto, não tem autor
-                if tipo != "Organização" and tipo != "Projeto":
-                    autor_container.write(f"**Autor:** {autor}")
-
-                if tipo == "Organização":
-                    # Mostra a sigla
-                    sigla = arq.get("sigla", None)
-                    sigla_container.write(f"**Sigla:** {sigla}")
-                    
-                    # Websites
-                    st.write(f"**Websites:** {arq.get('websites', 'N/A')}")
-
-                    # Link para a pasta com vários arquivos
-                    subfolder_id = arq.get("subfolder_id", "")
-                    link = f"https://drive.google.com/drive/folders/{subfolder_id}"
-
-                if tipo == "Pesquisa":
-
-                    # Link para a pasta com vários arquivos
-                    subfolder_id = arq.get("subfolder_id", "")
-                    link = f"https://drive.google.com/drive/folders/{subfolder_id}"
-                    st.link_button("Ver detalhes", url=link, type="primary")
-
-
-                else:
-                    st.link_button("Ver detalhes", url=link, type="primary")
 
 
+if arquivos:
+    # Os documentos já vêm ordenados e com tema e organização como texto
+    # (projeção do card em catalogo.py), sem tratamento por documento aqui
+
+    # Contagem de documentos
+    st.subheader(f"{total_arquivos} documento" if total_arquivos == 1 else f"{total_arquivos} documentos")
+    st.write("")
+
+    # Grade de cards em um único bloco HTML. O HTML de cada documento é
+    # montado uma vez e compartilhado entre as sessões (ver cards.py)
+    cache_cards = cards_catalogo()
+    miniaturas = cache_miniaturas()
+
+    def card(arq):
+        # As URLs das miniaturas são lidas a cada exibição: o cache local
+        # registra o uso de cada uma, e o card só é refeito quando a sua
+        # miniatura passa do link do Drive para o endereço local
+        imagens = imagens_card(arq, miniaturas)
+        return cache_cards.obter(versao, chave_card(arq, imagens), partial(html_card, arq, imagens))
+
+    with fase("cards"):
+        st.html(html_grade(card(arq) for arq in arquivos))
+
+
+    # Carrega a próxima página de cards
+    if len(arquivos) < total_arquivos:
+        st.write("")
+        st.button(
+            f"Carregar mais ({len(arquivos)} de {total_arquivos})",
+            icon=":material/expand_more:",
+            on_click=carregar_mais_arquivos,
+            width=300
+        )
 
 
 
@@ -2,7 +2,6 @@
 import os
 import re
 import time
-import json
 import tempfile
 from datetime import datetime, UTC
 from zoneinfo import ZoneInfo
@@ -11,20 +10,35 @@ import pandas as pd
 from bson import ObjectId
 
 
-import pypdfium2 as pdfium
-
 
 # ------------------ Bibliotecas de terceiros ------------------ #
 import streamlit as st
-from pymongo import MongoClient
 from PIL import Image
 from pdf2image import convert_from_path
 from email.mime.text import MIMEText  
 import smtplib  
-
-# Google Drive API
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
+from pymongo.errors import DuplicateKeyError
+
+# Módulos do projeto
+from catalogo import (
+    TEMAS_BABACU,
+    atualizar_documento,
+    buscar_arquivos,
+    excluir_documento,
+    inserir_documento,
+    versao_catalogo
+)
+from funcoes_auxiliares import (
+    COLLATION_EMAIL,
+    cache_miniaturas,
+    conectar_mongo_dialogos_babacu,
+    estatisticas_pool_mongo,
+    monitor_comandos,
+    snapshot_catalogo,
+    verificar_saude_mongo
+)
+from funcoes_drive import authenticate_drive, enviar_arquivo_drive, enviar_miniatura_drive, gerar_previa
+from rastreamento import fase, rastreamento_arquivo, rastreamento_ativo, resumo_fases
 
 
 
@@ -33,8 +47,8 @@ from pydrive2.drive import GoogleDrive
 # Configurações do MongoDB
 # --------------------------------------------------------------
 
-client = MongoClient(st.secrets.mongo.string_conexao_mongo)
-db = client[st.secrets.mongo.bd_dialogos]
+# Conexão compartilhada (pool único para todas as páginas)
+db = conectar_mongo_dialogos_babacu()
 
 # Carregando cada coleção
 publicacoes = db["publicacoes"]
@@ -63,43 +77,10 @@ pesquisas = db["pesquisas"]
 # --------------------------------------------------------------
 # Funções auxiliares
 # --------------------------------------------------------------
-def buscar_arquivos(query={}):
-    docs_publicacoes = list(publicacoes.find(query))
-    docs_imagens = list(imagens.find(query))
-    docs_videos = list(videos.find(query))
-    docs_podcasts = list(podcasts.find(query))
-    docs_sites = list(sites.find(query))
-    docs_mapas = list(mapas.find(query))
-    docs_legislacao = list(legislacao.find(query))
-    docs_pontos = list(pontos_interesse.find(query))
-    docs_relatorios = list(relatorios.find(query))
-    docs_organizacoes = list(organizacoes.find(query))
-    docs_projetos = list(projetos.find(query))
-    docs_pesquisas = list(pesquisas.find(query))
-
-    for doc in docs_publicacoes: doc["_colecao"] = "publicacoes"
-    for doc in docs_imagens: doc["_colecao"] = "imagens"
-    for doc in docs_videos: doc["_colecao"] = "videos"
-    for doc in docs_podcasts: doc["_colecao"] = "podcasts"
-    for doc in docs_sites: doc["_colecao"] = "sites"
-    for doc in docs_mapas: doc["_colecao"] = "mapas"
-    for doc in docs_legislacao: doc["_colecao"] = "legislacao"
-    for doc in docs_pontos: doc["_colecao"] = "pontos_interesse"
-    for doc in docs_relatorios: doc["_colecao"] = "relatorios"
-    for doc in docs_organizacoes: doc["_colecao"] = "organizacoes"
-    for doc in docs_projetos: doc["_colecao"] = "projetos"
-    for doc in docs_pesquisas: doc["_colecao"] = "pesquisas"
-
-    arquivos_resultado = (
-        docs_publicacoes + docs_imagens + docs_videos + docs_podcasts +
-        docs_sites + docs_mapas + docs_legislacao + docs_pontos + docs_relatorios + 
-        docs_organizacoes + docs_projetos + docs_pesquisas
-    )
-
-    return arquivos_resultado
 
-# Todos os arquivos
-arquivos = buscar_arquivos()
+# Todos os arquivos (compartilhados entre as sessões enquanto a versão do catálogo não muda).
+# A lista é a mesma de todas as sessões, sem cópia: os documentos são apenas lidos
+arquivos = snapshot_catalogo().obter(versao_catalogo(db), "todos", lambda: buscar_arquivos(db), copiar=False)
 
 # Mapeia tipos exibidos para as chaves das pastas no secrets
 TIPO_PASTA_MAP = {
@@ -153,46 +134,48 @@ def cadastrar_organizacao():
                     drive = authenticate_drive()
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-                    # Criar subpasta da organização
-                    parent_folder_id = st.secrets["pastas"].get("organizacoes")  # Ajuste conforme sua pasta
-                    subfolder_name = f"{timestamp}_{nome_organizacao.replace(' ', '_')}"
-                    subfolder = drive.CreateFile({
-                        "title": subfolder_name,
-                        "mimeType": "application/vnd.google-apps.folder",
-                        "parents": [{"id": parent_folder_id}]
-                    })
-                    subfolder.Upload()
-                    subfolder_id = subfolder["id"]
-
-                    # Upload do logotipo
-                    logotipo_link = None
-                    if logotipo:
-                        logotipo_path = os.path.join(tempfile.gettempdir(), logotipo.name)
-                        with open(logotipo_path, "wb") as f:
-                            f.write(logotipo.getbuffer())
-                        gfile_logo = drive.CreateFile({
-                            "title": logotipo.name,
-                            "parents": [{"id": subfolder_id}]
+                    with fase("upload no Drive"):
+                        # Criar subpasta da organização
+                        parent_folder_id = st.secrets["pastas"].get("organizacoes")  # Ajuste conforme sua pasta
+                        subfolder_name = f"{timestamp}_{nome_organizacao.replace(' ', '_')}"
+                        subfolder = drive.CreateFile({
+                            "title": subfolder_name,
+                            "mimeType": "application/vnd.google-apps.folder",
+                            "parents": [{"id": parent_folder_id}]
                         })
-                        gfile_logo.SetContentFile(logotipo_path)
-                        gfile_logo.Upload()
-                        logotipo_link = f"https://drive.google.com/file/d/{gfile_logo['id']}/view"
-                        os.remove(logotipo_path)
-
-                    # Upload dos documentos
-                    documentos_links = []
-                    for doc in documentos or []:
-                        doc_path = os.path.join(tempfile.gettempdir(), doc.name)
-                        with open(doc_path, "wb") as f:
-                            f.write(doc.getbuffer())
-                        gfile_doc = drive.CreateFile({
-                            "title": doc.name,
-                            "parents": [{"id": subfolder_id}]
-                        })
-                        gfile_doc.SetContentFile(doc_path)
-                        gfile_doc.Upload()
-                        documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
-                        os.remove(doc_path)
+                        subfolder.Upload()
+                        subfolder_id = subfolder["id"]
+
+                        # Upload do logotipo
+                        logotipo_link, logotipo_previa = None, None
+                        if logotipo:
+                            logotipo_path = os.path.join(tempfile.gettempdir(), logotipo.name)
+                            with open(logotipo_path, "wb") as f:
+                                f.write(logotipo.getbuffer())
+                            gfile_logo = drive.CreateFile({
+                                "title": logotipo.name,
+                                "parents": [{"id": subfolder_id}]
+                            })
+                            gfile_logo.SetContentFile(logotipo_path)
+                            gfile_logo.Upload()
+                            logotipo_link = f"https://drive.google.com/file/d/{gfile_logo['id']}/view"
+                            logotipo_previa = gerar_previa(logotipo_path)
+                            os.remove(logotipo_path)
+
+                        # Upload dos documentos
+                        documentos_links = []
+                        for doc in documentos or []:
+                            doc_path = os.path.join(tempfile.gettempdir(), doc.name)
+                            with open(doc_path, "wb") as f:
+                                f.write(doc.getbuffer())
+                            gfile_doc = drive.CreateFile({
+                                "title": doc.name,
+                                "parents": [{"id": subfolder_id}]
+                            })
+                            gfile_doc.SetContentFile(doc_path)
+                            gfile_doc.Upload()
+                            documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
+                            os.remove(doc_path)
 
                     # Salvar no MongoDB
                     data = {
@@ -203,6 +186,7 @@ def cadastrar_organizacao():
                         "cnpj": CNPJ,
                         "websites": websites,
                         "logotipo": logotipo_link,
+                        "logotipo_previa": logotipo_previa,
                         "documentos": documentos_links,
                         "subfolder_id": subfolder_id,
                         "tipo": "Organização",
@@ -210,7 +194,7 @@ def cadastrar_organizacao():
                         "data_upload": datetime.now()
                     }
 
-                    organizacoes.insert_one(data)
+                    inserir_documento(organizacoes, data)
                     st.success("Organização cadastrada com sucesso!")
                     time.sleep(2)
                     st.rerun()
@@ -219,39 +203,12 @@ def cadastrar_organizacao():
                     st.error(f"Erro ao cadastrar organização: {e}")
 
 
-# Função para autenticar Google Drive usando st.secrets
-def authenticate_drive():
-    service_account_info = dict(st.secrets["drive_api"])
-
-    # Garante que a chave client_user_email existe
-    client_user_email = service_account_info.get("client_user_email")
-    if not client_user_email:
-        raise ValueError("client_user_email está ausente em st.secrets['drive_api'].")
-
-    # Cria arquivo temporário
-    with tempfile.NamedTemporaryFile(mode="w+", delete=False, suffix=".json") as tmp:
-        json.dump(service_account_info, tmp)
-
-        tmp.flush()
-
-        gauth = GoogleAuth()
-        gauth.settings['client_config_backend'] = 'service'
-        gauth.settings['service_config'] = {
-            'client_json_file_path': tmp.name,
-            'client_user_email': client_user_email  # <--- ESSENCIAL
-        }
-
-        gauth.ServiceAuth()
-        drive = GoogleDrive(gauth)
-        return drive
-
-
 # Envia só a thumbnail / miniatura para o drive
 def upload_thumbnail_to_drive(local_path, nome_base, tipo):
     """
     Recebe um UploadedFile (Streamlit), cria thumbnail de 280px de largura 
     com altura proporcional, salva temporariamente e envia ao Google Drive.
-    Retorna o link da miniatura enviada.
+    Retorna (link da miniatura enviada, prévia) ou (None, None) em caso de erro.
     """
     try:
         drive = authenticate_drive()
@@ -269,54 +226,62 @@ def upload_thumbnail_to_drive(local_path, nome_base, tipo):
 
         if not parent_folder_id:
             st.error(f"Pasta do tipo {tipo} não configurada no secrets.")
-            return None
+            return None, None
 
         # 3. Cria subpasta com timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         folder_name = f"{timestamp}_{nome_base}"
 
-        subfolder = drive.CreateFile({
-            'title': folder_name,
-            'mimeType': 'application/vnd.google-apps.folder',
-            'parents': [{'id': parent_folder_id}]
-        })
-        subfolder.Upload()
-        subfolder_id = subfolder['id']
+        with fase("upload no Drive"):
+            subfolder = drive.CreateFile({
+                'title': folder_name,
+                'mimeType': 'application/vnd.google-apps.folder',
+                'parents': [{'id': parent_folder_id}]
+            })
+            subfolder.Upload()
+            subfolder_id = subfolder['id']
 
         # 4. Geração da miniatura (thumb)
         thumb_name = f"miniatura_{nome_base}.png"
         thumb_path = os.path.join(tempfile.gettempdir(), thumb_name)
 
-        # Se for imagem
-        if ext in ['.png', '.jpg', '.jpeg', '.webp']:
-            img = Image.open(temp_input_path)
-            w, h = img.size
-            new_height = int((280 / w) * h)
-            img = img.resize((280, new_height), Image.Resampling.LANCZOS)
-            img.save(thumb_path, "PNG")
-
-        # Se for PDF
-        elif ext == '.pdf':
-            pages = convert_from_path(temp_input_path, dpi=150, first_page=1, last_page=1)
-            if pages:
-                img = pages[0]
+        with fase("miniatura"):
+            # Se for imagem
+            if ext in ['.png', '.jpg', '.jpeg', '.webp']:
+                img = Image.open(temp_input_path)
                 w, h = img.size
                 new_height = int((280 / w) * h)
                 img = img.resize((280, new_height), Image.Resampling.LANCZOS)
                 img.save(thumb_path, "PNG")
-        else:
-            st.error("Formato não suportado para miniatura.")
-            return None
+
+            # Se for PDF
+            elif ext == '.pdf':
+                pages = convert_from_path(temp_input_path, dpi=150, first_page=1, last_page=1)
+                if pages:
+                    img = pages[0]
+                    w, h = img.size
+                    new_height = int((280 / w) * h)
+                    img = img.resize((280, new_height), Image.Resampling.LANCZOS)
+                    img.save(thumb_path, "PNG")
+            else:
+                st.error("Formato não suportado para miniatura.")
+                return None, None
 
         # 5. Upload da thumbnail para o Drive
-        thumb_file = drive.CreateFile({
-            'title': thumb_name,
-            'parents': [{'id': subfolder_id}]
-        })
-        thumb_file.SetContentFile(thumb_path)
-        thumb_file.Upload()
+        with fase("upload no Drive"):
+            thumb_file = drive.CreateFile({
+                'title': thumb_name,
+                'parents': [{'id': subfolder_id}]
+            })
+            thumb_file.SetContentFile(thumb_path)
+            thumb_file.Upload()
 
         thumb_link = f"https://drive.google.com/file/d/{thumb_file['id']}/view"
+        thumb_previa = gerar_previa(thumb_path)
+
+        miniaturas = cache_miniaturas()
+        if miniaturas:
+            miniaturas.guardar_arquivo(thumb_file['id'], thumb_path)
 
         # 6. Limpeza de arquivos temporários
         if os.path.exists(thumb_path):
@@ -324,41 +289,28 @@ def upload_thumbnail_to_drive(local_path, nome_base, tipo):
         if os.path.exists(temp_input_path):
             os.remove(temp_input_path)
 
-        return thumb_link
+        return thumb_link, thumb_previa
 
     except Exception as e:
         st.error(f"Erro ao enviar miniatura: {e}")
-        return None
+        return None, None
 
 
 
 def upload_to_drive(file, filename, tipo):
     if tipo not in TIPO_PASTA_MAP:
-        return None, None
+        return None, None, None
 
     tipo_key = TIPO_PASTA_MAP[tipo]
     parent_folder_id = st.secrets["pastas"].get(tipo_key)
 
     if not parent_folder_id:
         st.error(f"Pasta não configurada no secrets: {tipo_key}")
-        return None, None
+        return None, None, None
 
     drive = authenticate_drive()
 
-    base_name, ext = os.path.splitext(filename)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    folder_name = f"{timestamp}_{base_name}"
-
-    # ------------------------
-    # Cria subpasta no Drive
-    # ------------------------
-    subfolder = drive.CreateFile({
-        'title': folder_name,
-        'mimeType': 'application/vnd.google-apps.folder',
-        'parents': [{'id': parent_folder_id}]
-    })
-    subfolder.Upload()
-    subfolder_id = subfolder['id']
+    base_name = os.path.splitext(filename)[0]
 
     # ------------------------
     # Salva arquivo local temporário
@@ -368,63 +320,13 @@ def upload_to_drive(file, filename, tipo):
         f.write(file.getbuffer())
 
     # ------------------------
-    # Upload do arquivo original
-    # ------------------------
-    gfile = drive.CreateFile({
-        'title': filename,
-        'parents': [{'id': subfolder_id}]
-    })
-    gfile.SetContentFile(temp_path)
-    gfile.Upload()
-    file_link = f"https://drive.google.com/file/d/{gfile['id']}/view"
-
-    # ------------------------
-    # Geração da miniatura
+    # Upload do arquivo original (em uma subpasta própria) e da miniatura
     # ------------------------
-    thumb_link = None
+    subfolder_id, file_link = enviar_arquivo_drive(drive, temp_path, filename, parent_folder_id)
 
+    thumb_link, thumb_previa = None, None
     try:
-        thumb_name = f"miniatura_{base_name}.png"
-        thumb_path = os.path.join(tempfile.gettempdir(), thumb_name)
-
-        # 📸 IMAGEM
-        if ext.lower() in [".png", ".jpg", ".jpeg", ".webp"]:
-            img = Image.open(temp_path)
-            img = img.convert("RGB")
-            w, h = img.size
-            new_height = int((280 / w) * h)
-            img = img.resize((280, new_height), Image.Resampling.LANCZOS)
-            img.save(thumb_path, "PNG")
-
-        # 📄 PDF (pypdfium2)
-        elif ext.lower() == ".pdf":
-            pdf = pdfium.PdfDocument(temp_path)
-            if len(pdf) == 0:
-                raise Exception("PDF sem páginas")
-
-            page = pdf[0]
-            bitmap = page.render(scale=1.2, rotation=0)
-            img = bitmap.to_pil()
-            img = img.convert("RGB")
-
-            w, h = img.size
-            new_height = int((280 / w) * h)
-            img = img.resize((280, new_height), Image.Resampling.LANCZOS)
-            img.save(thumb_path, "PNG")
-
-        # ------------------------
-        # Upload da miniatura
-        # ------------------------
-        if os.path.exists(thumb_path):
-            thumb_file = drive.CreateFile({
-                'title': thumb_name,
-                'parents': [{'id': subfolder_id}]
-            })
-            thumb_file.SetContentFile(thumb_path)
-            thumb_file.Upload()
-            thumb_link = f"https://drive.google.com/file/d/{thumb_file['id']}/view"
-            os.remove(thumb_path)
-
+        thumb_link, thumb_previa = enviar_miniatura_drive(drive, temp_path, base_name, subfolder_id, cache_miniaturas())
     except Exception as e:
         st.warning(f"Miniatura não criada: {e}")
 
@@ -433,7 +335,7 @@ def upload_to_drive(file, filename, tipo):
     # ------------------------
     os.remove(temp_path)
 
-    return file_link, thumb_link
+    return file_link, thumb_link, thumb_previa
 
 
 
@@ -552,20 +454,6 @@ TIPOS_MIDIA = [
     "Projeto",
     "Pesquisa"
 ]
-# Temas
-TEMAS_BABACU = [
-    "Meio Ambiente",
-    "Educação",
-    "Saúde",
-    "Produção e Agricultura",
-    "Economia e Comercialização",
-    "Cultura e Tradição",
-    "Tecnologia e Inovação",
-    "Legislação e Políticas Públicas",
-    "Sustentabilidade",
-    "Comunidades e Povos Tradicionais",
-    "Gastronomia"
-]
 
 
 
@@ -581,11 +469,12 @@ st.logo("images/logo dialogos do babacu.png", size="large")
 st.header("Gerenciamento")
 
 
-tab_acervo, tab_pessoas = st.tabs(["Acervo", "Pessoas"])
+tab_acervo, tab_pessoas, tab_sistema = st.tabs(["Acervo", "Pessoas", "Sistema"])
 
 
 # ACERVO
-with tab_acervo:
+# A fase "formulário" inclui, nas execuções de envio, o upload e a gravação (medidos também separadamente)
+with tab_acervo, fase("formulário"):
 
     # Escolha da ação
     st.write('')
@@ -655,49 +544,51 @@ with tab_acervo:
                         st.error(f"Pasta para tipo '{tipo_doc}' não configurada no secrets.")
                         return
 
-                    # Criar subpasta da organização
-                    subfolder_name = f"{timestamp}_{nome_organizacao.replace(' ', '_')}"
-                    subfolder = drive.CreateFile({
-                        "title": subfolder_name,
-                        "mimeType": "application/vnd.google-apps.folder",
-                        "parents": [{"id": parent_folder_id}]
-                    })
-                    subfolder.Upload()
-                    subfolder_id = subfolder["id"]
-
-                    # --- Upload do logotipo ---
-                    logotipo_link = None
-                    if logotipo:
-                        logotipo_name = logotipo.name
-                        logotipo_path = os.path.join(tempfile.gettempdir(), logotipo_name)
-                        with open(logotipo_path, "wb") as f:
-                            f.write(logotipo.getbuffer())
-                        
-                        gfile_logo = drive.CreateFile({
-                            "title": logotipo_name,
-                            "parents": [{"id": subfolder_id}]
+                    with fase("upload no Drive"):
+                        # Criar subpasta da organização
+                        subfolder_name = f"{timestamp}_{nome_organizacao.replace(' ', '_')}"
+                        subfolder = drive.CreateFile({
+                            "title": subfolder_name,
+                            "mimeType": "application/vnd.google-apps.folder",
+                            "parents": [{"id": parent_folder_id}]
                         })
-                        gfile_logo.SetContentFile(logotipo_path)
-                        gfile_logo.Upload()
-                        logotipo_link = f"https://drive.google.com/file/d/{gfile_logo['id']}/view"
-                        os.remove(logotipo_path)
-
-                    # --- Upload dos documentos ---
-                    documentos_links = []
-                    for doc in documentos or []:
-                        doc_name = doc.name
-                        doc_path = os.path.join(tempfile.gettempdir(), doc_name)
-                        with open(doc_path, "wb") as f:
-                            f.write(doc.getbuffer())
+                        subfolder.Upload()
+                        subfolder_id = subfolder["id"]
+
+                        # --- Upload do logotipo ---
+                        logotipo_link, logotipo_previa = None, None
+                        if logotipo:
+                            logotipo_name = logotipo.name
+                            logotipo_path = os.path.join(tempfile.gettempdir(), logotipo_name)
+                            with open(logotipo_path, "wb") as f:
+                                f.write(logotipo.getbuffer())
                         
-                        gfile_doc = drive.CreateFile({
-                            "title": doc_name,
-                            "parents": [{"id": subfolder_id}]
-                        })
-                        gfile_doc.SetContentFile(doc_path)
-                        gfile_doc.Upload()
-                        documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
-                        os.remove(doc_path)
+                            gfile_logo = drive.CreateFile({
+                                "title": logotipo_name,
+                                "parents": [{"id": subfolder_id}]
+                            })
+                            gfile_logo.SetContentFile(logotipo_path)
+                            gfile_logo.Upload()
+                            logotipo_link = f"https://drive.google.com/file/d/{gfile_logo['id']}/view"
+                            logotipo_previa = gerar_previa(logotipo_path)
+                            os.remove(logotipo_path)
+
+                        # --- Upload dos documentos ---
+                        documentos_links = []
+                        for doc in documentos or []:
+                            doc_name = doc.name
+                            doc_path = os.path.join(tempfile.gettempdir(), doc_name)
+                            with open(doc_path, "wb") as f:
+                                f.write(doc.getbuffer())
+                        
+                            gfile_doc = drive.CreateFile({
+                                "title": doc_name,
+                                "parents": [{"id": subfolder_id}]
+                            })
+                            gfile_doc.SetContentFile(doc_path)
+                            gfile_doc.Upload()
+                            documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
+                            os.remove(doc_path)
 
                     # --- Salvar no MongoDB ---
                     data = {    
@@ -707,6 +598,7 @@ with tab_acervo:
                         "cnpj": CNPJ,
                         "sigla": sigla,
                         "logotipo": logotipo_link,
+                        "logotipo_previa": logotipo_previa,
                         "documentos": documentos_links,
                         "tipo": tipo_doc,
                         "websites": websites,
@@ -715,7 +607,7 @@ with tab_acervo:
                         "data_upload": datetime.now()
                     }
 
-                    organizacoes.insert_one(data)
+                    inserir_documento(organizacoes, data)
                     st.success("Organização cadastrada com sucesso!")
 
                 except Exception as e:
@@ -789,7 +681,7 @@ with tab_acervo:
                 titulo_com_extensao = f"{titulo.strip()}{extensao}"
 
                 # Envia o arquivo ao Google Drive e retorna o ID do arquivo
-                file_link, thumb_link = upload_to_drive(arquivo, titulo_com_extensao, tipo)
+                file_link, thumb_link, thumb_previa = upload_to_drive(arquivo, titulo_com_extensao, tipo)
 
                 # Prepara o dicionário com os dados para salvar no MongoDB
                 data = {
@@ -803,12 +695,13 @@ with tab_acervo:
                     "enviado_por": st.session_state["nome"],
                     "link": file_link,
                     "thumb_link": thumb_link,
+                    "thumb_previa": thumb_previa,
                     "data_upload": datetime.now()
 
                 }
 
                 # Insere o documento na coleção `publicacoes`
-                publicacoes.insert_one(data)
+                inserir_documento(publicacoes, data)
 
                 # Mostra mensagem de sucesso
                 st.success("Documento cadastrado com sucesso!")
@@ -897,7 +790,7 @@ with tab_acervo:
                         titulo_com_extensao = f"{titulo.strip()}{extensao}"
 
                         # Envia o arquivo ao Google Drive e retorna o ID do arquivo
-                        file_link, thumb_link = upload_to_drive(arquivo, titulo_com_extensao, tipo_doc)
+                        file_link, thumb_link, thumb_previa = upload_to_drive(arquivo, titulo_com_extensao, tipo_doc)
 
                         # Prepara o dicionário com os dados para salvar no MongoDB
                         data = {
@@ -915,12 +808,13 @@ with tab_acervo:
                             "enviado_por": st.session_state["nome"],
                             "link": file_link,
                             "thumb_link": thumb_link,
+                            "thumb_previa": thumb_previa,
                             "data_upload": datetime.now()
 
                         }
 
                         # Insere o documento na coleção `imagens`
-                        imagens.insert_one(data)
+                        inserir_documento(imagens, data)
 
                         # Mostra mensagem de sucesso
                         st.success("Documento enviado com sucesso!")
@@ -1008,7 +902,7 @@ with tab_acervo:
                         titulo_com_extensao = f"{titulo.strip()}{extensao}"
 
                         # Envia o arquivo ao Google Drive e retorna o ID do arquivo
-                        file_link, thumb_link = upload_to_drive(arquivo, titulo_com_extensao, tipo_doc)
+                        file_link, thumb_link, thumb_previa = upload_to_drive(arquivo, titulo_com_extensao, tipo_doc)
 
                         # Prepara o dicionário com os dados para salvar no MongoDB
                         data = {     
@@ -1021,13 +915,14 @@ with tab_acervo:
                             "tipo": tipo_doc,
                             "link": file_link,
                             "thumb_link": thumb_link,
+                            "thumb_previa": thumb_previa,
                             "enviado_por": st.session_state["nome"],
                             "data_upload": datetime.now()
 
                         }
 
                         # Insere o documento na coleção
-                        relatorios.insert_one(data)   
+                        inserir_documento(relatorios, data)   
 
                         # Mostra mensagem de sucesso
                         st.success("Documento enviado com sucesso!")
@@ -1163,7 +1058,7 @@ with tab_acervo:
                         }
 
                         # Insere o documento na coleção
-                        videos.insert_one(data)
+                        inserir_documento(videos, data)
 
                         # Mostra mensagem de sucesso
                         st.success("Documento enviado com sucesso!")
@@ -1243,9 +1138,9 @@ with tab_acervo:
             with st.spinner("Enviando ..."):
                 
                 # Envia screenshot ao Google Drive
-                thumb_link = None
+                thumb_link, thumb_previa = None, None
                 if thumb:
-                    thumb_link = upload_thumbnail_to_drive(
+                    thumb_link, thumb_previa = upload_thumbnail_to_drive(
                         local_path=thumb,
                         nome_base=titulo,
                         tipo=tipo_doc
@@ -1260,12 +1155,13 @@ with tab_acervo:
                     "organizacao": organizacao,
                     "link": link_podcast,
                     "thumb_link": thumb_link,
+                    "thumb_previa": thumb_previa,
                     "tipo": tipo_doc,
                     "enviado_por": st.session_state["nome"],
                     "ano_publicacao": ano_publicacao,
                     "data_upload": datetime.now()
                 }
-                podcasts.insert_one(data)
+                inserir_documento(podcasts, data)
                 st.success("Podcast cadastrado com sucesso!")
 
 
@@ -1323,9 +1219,9 @@ with tab_acervo:
                 # thumb_local = gerar_thumbnail_pagina(link_site, titulo)
 
                 # Envia screenshot ao Google Drive
-                thumb_link = None
+                thumb_link, thumb_previa = None, None
                 if thumb_local:
-                    thumb_link = upload_thumbnail_to_drive(
+                    thumb_link, thumb_previa = upload_thumbnail_to_drive(
                         local_path=thumb_local,
                         nome_base=titulo,
                         tipo=tipo_doc
@@ -1342,11 +1238,12 @@ with tab_acervo:
                     "tipo": tipo_doc,
                     "link": link_site,
                     "thumb_link": thumb_link,
+                    "thumb_previa": thumb_previa,
                     "enviado_por": st.session_state["nome"],
                     "data_upload": datetime.now()
                 }
 
-                sites.insert_one(data)
+                inserir_documento(sites, data)
                 st.success("Site cadastrado com sucesso!")
 
 
@@ -1429,7 +1326,7 @@ with tab_acervo:
                         titulo_com_extensao = f"{titulo.strip()}{extensao}"
 
                         # Envia o arquivo ao Google Drive e retorna o ID do arquivo
-                        file_link, thumb_link = upload_to_drive(arquivo, titulo_com_extensao, tipo_doc)
+                        file_link, thumb_link, thumb_previa = upload_to_drive(arquivo, titulo_com_extensao, tipo_doc)
 
                         # Prepara o dicionário com os dados para salvar no MongoDB
                         data = {     #!!!!
@@ -1441,6 +1338,7 @@ with tab_acervo:
                             "organizacao": organizacao,
                             "tipo": tipo_doc,
                             "thumb_link": thumb_link,
+                            "thumb_previa": thumb_previa,
                             "link": file_link,
                             "enviado_por": st.session_state["nome"],
                             "data_upload": datetime.now()
@@ -1448,7 +1346,7 @@ with tab_acervo:
                         }
 
                         # Insere o documento na coleção
-                        mapas.insert_one(data)   #!!!!
+                        inserir_documento(mapas, data)   #!!!!
 
                         # Mostra mensagem de sucesso
                         st.success("Documento enviado com sucesso!")
@@ -1534,7 +1432,7 @@ with tab_acervo:
                         }
 
                         # Insere o documento na coleção
-                        legislacao.insert_one(data) 
+                        inserir_documento(legislacao, data) 
 
                         # Mostra mensagem de sucesso
                         st.success("Documento enviado com sucesso!")
@@ -1621,9 +1519,9 @@ with tab_acervo:
                 latitude, longitude = extrair_lat_long_google_maps(link_google_maps)
 
                 # Envia screenshot ao Google Drive
-                thumb_link = None
+                thumb_link, thumb_previa = None, None
                 if thumb_local:
-                    thumb_link = upload_thumbnail_to_drive(
+                    thumb_link, thumb_previa = upload_thumbnail_to_drive(
                         local_path=thumb_local,
                         nome_base=titulo,
                         tipo=tipo_doc
@@ -1641,12 +1539,13 @@ with tab_acervo:
                     "tipo": tipo_doc,
                     "link": link_google_maps,
                     "thumb_link": thumb_link,
+                    "thumb_previa": thumb_previa,
                     "enviado_por": st.session_state["nome"],
                     "data_upload": datetime.now()
                 }
 
                 # Insere o documento na coleção
-                pontos_interesse.insert_one(data)   
+                inserir_documento(pontos_interesse, data)   
 
                 # Mostra mensagem de sucesso
                 st.success("Ponto de interesse enviado com sucesso!")
@@ -1724,32 +1623,33 @@ with tab_acervo:
                         st.error(f"Pasta para tipo '{tipo_doc}' não configurada no secrets.")
                         return
 
-                    # Criar subpasta do projeto
-                    subfolder_name = f"{timestamp}_{nome_projeto.replace(' ', '_')}"
-                    subfolder = drive.CreateFile({
-                        "title": subfolder_name,
-                        "mimeType": "application/vnd.google-apps.folder",
-                        "parents": [{"id": parent_folder_id}]
-                    })
-                    subfolder.Upload()
-                    subfolder_id = subfolder["id"]
-
-                    # --- Upload dos documentos ---
-                    documentos_links = []
-                    for doc in documentos or []:
-                        doc_name = doc.name
-                        doc_path = os.path.join(tempfile.gettempdir(), doc_name)
-                        with open(doc_path, "wb") as f:
-                            f.write(doc.getbuffer())
-                        
-                        gfile_doc = drive.CreateFile({
-                            "title": doc_name,
-                            "parents": [{"id": subfolder_id}]
+                    with fase("upload no Drive"):
+                        # Criar subpasta do projeto
+                        subfolder_name = f"{timestamp}_{nome_projeto.replace(' ', '_')}"
+                        subfolder = drive.CreateFile({
+                            "title": subfolder_name,
+                            "mimeType": "application/vnd.google-apps.folder",
+                            "parents": [{"id": parent_folder_id}]
                         })
-                        gfile_doc.SetContentFile(doc_path)
-                        gfile_doc.Upload()
-                        documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
-                        os.remove(doc_path)
+                        subfolder.Upload()
+                        subfolder_id = subfolder["id"]
+
+                        # --- Upload dos documentos ---
+                        documentos_links = []
+                        for doc in documentos or []:
+                            doc_name = doc.name
+                            doc_path = os.path.join(tempfile.gettempdir(), doc_name)
+                            with open(doc_path, "wb") as f:
+                                f.write(doc.getbuffer())
+                        
+                            gfile_doc = drive.CreateFile({
+                                "title": doc_name,
+                                "parents": [{"id": subfolder_id}]
+                            })
+                            gfile_doc.SetContentFile(doc_path)
+                            gfile_doc.Upload()
+                            documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
+                            os.remove(doc_path)
 
                     # --- Salvar no MongoDB ---
                     data = {    
@@ -1769,7 +1669,7 @@ with tab_acervo:
                         "data_upload": datetime.now()
                     }
 
-                    projetos.insert_one(data)
+                    inserir_documento(projetos, data)
                     st.success("Projeto cadastrado com sucesso!")
 
                 except Exception as e:
@@ -1840,33 +1740,34 @@ with tab_acervo:
                         st.error(f"Pasta para tipo '{tipo_doc}' não configurada no secrets.")
                         return
 
-                    # Criar subpasta do projeto
-                    subfolder_name = f"{timestamp}_{nome_pesquisa.replace(' ', '_')}"
-                    subfolder = drive.CreateFile({
-                        "title": subfolder_name,
-                        "mimeType": "application/vnd.google-apps.folder",
-                        "parents": [{"id": parent_folder_id}]
-                    })
-                    subfolder.Upload()
-                    subfolder_id = subfolder["id"]
-
-
-                    # --- Upload dos documentos ---
-                    documentos_links = []
-                    for doc in documentos or []:
-                        doc_name = doc.name
-                        doc_path = os.path.join(tempfile.gettempdir(), doc_name)
-                        with open(doc_path, "wb") as f:
-                            f.write(doc.getbuffer())
-                        
-                        gfile_doc = drive.CreateFile({
-                            "title": doc_name,
-                            "parents": [{"id": subfolder_id}]
+                    with fase("upload no Drive"):
+                        # Criar subpasta do projeto
+                        subfolder_name = f"{timestamp}_{nome_pesquisa.replace(' ', '_')}"
+                        subfolder = drive.CreateFile({
+                            "title": subfolder_name,
+                            "mimeType": "application/vnd.google-apps.folder",
+                            "parents": [{"id": parent_folder_id}]
                         })
-                        gfile_doc.SetContentFile(doc_path)
-                        gfile_doc.Upload()
-                        documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
-                        os.remove(doc_path)
+                        subfolder.Upload()
+                        subfolder_id = subfolder["id"]
+
+
+                        # --- Upload dos documentos ---
+                        documentos_links = []
+                        for doc in documentos or []:
+                            doc_name = doc.name
+                            doc_path = os.path.join(tempfile.gettempdir(), doc_name)
+                            with open(doc_path, "wb") as f:
+                                f.write(doc.getbuffer())
+                        
+                            gfile_doc = drive.CreateFile({
+                                "title": doc_name,
+                                "parents": [{"id": subfolder_id}]
+                            })
+                            gfile_doc.SetContentFile(doc_path)
+                            gfile_doc.Upload()
+                            documentos_links.append(f"https://drive.google.com/file/d/{gfile_doc['id']}/view")
+                            os.remove(doc_path)
 
                     # --- Salvar no MongoDB ---
                     data = {    
@@ -1883,7 +1784,7 @@ with tab_acervo:
                         "data_upload": datetime.now()
                     }
 
-                    pesquisas.insert_one(data)
+                    inserir_documento(pesquisas, data)
                     st.success("Pesquisa cadastrada com sucesso!")
 
                 except Exception as e:
@@ -2053,10 +1954,10 @@ with tab_acervo:
                     }
 
                     # Atualiza o documento no MongoDB usando _id
-                    resultado = organizacoes.update_one(
+                    resultado = atualizar_documento(
+                        organizacoes,
                         {"_id": ObjectId(documento_escolhido["_id"])},  # filtro pelo ID original
-                        {"$set": data_atualizada},
-                        upsert=False  # não cria novo documento, apenas atualiza
+                        data_atualizada  # não cria novo documento, apenas atualiza
                     )
 
                     if resultado.modified_count > 0:
@@ -2145,10 +2046,10 @@ with tab_acervo:
                         }
 
                         # Atualiza o documento no MongoDB usando _id
-                        resultado = publicacoes.update_one(
+                        resultado = atualizar_documento(
+                            publicacoes,
                             {"_id": ObjectId(documento_escolhido["_id"])},
-                            {"$set": data_atualizada},
-                            upsert=False
+                            data_atualizada
                         )
 
                         if resultado.modified_count > 0:
@@ -2260,7 +2161,7 @@ with tab_acervo:
 
 
                             if colecao is not None:
-                                resultado = colecao.delete_one({"_id": ObjectId(documento_escolhido["_id"])})
+                                resultado = excluir_documento(colecao, {"_id": ObjectId(documento_escolhido["_id"])})
                                 if resultado.deleted_count > 0:
                                     st.success(f"Documento '{titulo_escolhido}' excluído com sucesso!")
                                     time.sleep(2)
@@ -2303,10 +2204,20 @@ def convidar_pessoa():
 
         if st.form_submit_button("Enviar convite", type="primary", icon=":material/mail:"):
 
-            pessoas.insert_one({"e_mail": email_invite,
-                                "nome_completo": nome_completo,
-                                "permissao": permissao,
-                                "status": status})
+            # O índice único de e_mail não diferencia maiúsculas de minúsculas (COLLATION_EMAIL)
+            if pessoas.find_one({"e_mail": email_invite}, {"_id": 1}, collation=COLLATION_EMAIL):
+                st.error(f"Já existe uma pessoa cadastrada com o e-mail {email_invite}.")
+                return
+
+            try:
+                pessoas.insert_one({"e_mail": email_invite,
+                                    "nome_completo": nome_completo,
+                                    "permissao": permissao,
+                                    "status": status})
+            except DuplicateKeyError:
+                # Convite enviado ao mesmo tempo por outra sessão
+                st.error(f"Já existe uma pessoa cadastrada com o e-mail {email_invite}.")
+                return
             
             # Enviar o email
             enviar_convite(email_invite)
@@ -2379,12 +2290,15 @@ def editar_pessoa():
         # st.write(pessoa_sel)
 
         # Usa valores do DataFrame se existirem, senão coloca padrão
+        id_atual = pessoa_sel.get("_id")
         nome_atual = pessoa_sel.get("Nome")
         email_atual = pessoa_sel.get("E-mail") or ""
         status_atual = pessoa_sel.get("Status") or ""
         permissao_atual = pessoa_sel.get("Permissão") or ""
     else:
         # Se não achar no DataFrame
+        id_atual = None
+        nome_atual = ""
         email_atual = ""
         status_atual = "ativo"
         permissao_atual = "Visitante"
@@ -2407,16 +2321,31 @@ def editar_pessoa():
         )
 
         if st.form_submit_button("Salvar", type="primary", icon=":material/save:"):
-            pessoas.update_one(
-                {"e_mail": email_atual},  # filtro com e-mail original
-                {"$set": {
-                    "nome_completo": nome,
-                    "e_mail": email,
-                    "status": status,
-                    "permissao": permissao
-                }},
-                upsert=True
-            )
+
+            if id_atual is None:
+                st.error("Pessoa não encontrada.")
+                return
+
+            # O índice único de e_mail não diferencia maiúsculas de minúsculas (COLLATION_EMAIL)
+            if pessoas.find_one({"e_mail": email, "_id": {"$ne": id_atual}}, {"_id": 1}, collation=COLLATION_EMAIL):
+                st.error(f"Já existe uma pessoa cadastrada com o e-mail {email}.")
+                return
+
+            try:
+                pessoas.update_one(
+                    {"_id": id_atual},
+                    {"$set": {
+                        "nome_completo": nome,
+                        "e_mail": email,
+                        "status": status,
+                        "permissao": permissao
+                    }}
+                )
+            except DuplicateKeyError:
+                # E-mail gravado ao mesmo tempo por outra sessão
+                st.error(f"Já existe uma pessoa cadastrada com o e-mail {email}.")
+                return
+
             st.success("Dados atualizados com sucesso!")
             time.sleep(3)
             st.rerun()
@@ -2498,4 +2427,150 @@ with tab_pessoas:
 
 
     elif st.session_state.permissao == "Visitante" or st.session_state.permissao == "Editor":
-        st.write("Gerenciamento de pessoas disponível apenas para administradores.")
\ No newline at end of file
+        st.write("Gerenciamento de pessoas disponível apenas para administradores.")
+
+
+
+# #####################################################################################
+# SISTEMA
+# #####################################################################################
+
+
+with tab_sistema:
+    st.write('')
+
+    # TELA SOMENTE PARA ADMINISTRADOR
+    if st.session_state.permissao == "Administrador":
+
+        # Saúde da conexão ------------------------------
+        st.write("**Conexão com o banco de dados**")
+
+        saude = verificar_saude_mongo()
+        if saude["ok"]:
+            st.success(f"MongoDB respondendo ({saude['latencia_ms']} ms)")
+        else:
+            st.error(f"MongoDB indisponível: {saude['erro']}")
+
+        # Contadores do pool ------------------------------
+        estatisticas = estatisticas_pool_mongo()
+
+        with st.container(horizontal=True):
+            st.metric("Conexões abertas", estatisticas["conexoes_abertas"], border=True)
+            st.metric("Conexões em uso", estatisticas["conexoes_em_uso"], border=True)
+            st.metric("Tamanho do pool (mín / máx)", f"{estatisticas['min_pool_size']} / {estatisticas['max_pool_size']}", border=True)
+
+        st.dataframe(
+            pd.DataFrame([estatisticas]).rename(columns={
+                "conexoes_criadas": "Criadas",
+                "conexoes_fechadas": "Fechadas",
+                "checkouts": "Checkouts",
+                "falhas_checkout": "Falhas de checkout",
+                "pools_limpos": "Pools limpos"
+            })[["Criadas", "Fechadas", "Checkouts", "Falhas de checkout", "Pools limpos"]],
+            hide_index=True
+        )
+
+        # Comandos por execução das páginas ------------------------------
+        st.write('')
+        st.write("**Comandos enviados ao MongoDB por execução das páginas**")
+
+        monitor = monitor_comandos()
+        execucoes = monitor.execucoes()
+
+        if not execucoes:
+            st.caption("Nenhuma execução registrada.")
+
+        else:
+            # Uma linha por execução (a mais recente primeiro)
+            st.dataframe(
+                pd.DataFrame([{
+                    "Início": execucao["inicio"].strftime("%d/%m/%Y %H:%M:%S"),
+                    "Página": execucao["pagina"] or "Login",
+                    "Sessão": (execucao["sessao"] or "-")[:8],
+                    "Comandos": len(execucao["comandos"]) + execucao["descartados"],
+                    "Tempo total (ms)": round(sum(c["duracao_ms"] for c in execucao["comandos"]), 1),
+                    "Documentos": sum(c["documentos"] or 0 for c in execucao["comandos"]),
+                } for execucao in execucoes]),
+                hide_index=True
+            )
+
+            execucao = st.selectbox(
+                "Detalhar execução",
+                execucoes,
+                format_func=lambda e: f"{e['inicio'].strftime('%H:%M:%S')} · {e['pagina'] or 'Login'} · {len(e['comandos'])} comando(s)"
+            )
+
+            if execucao["comandos"]:
+                df_comandos = pd.DataFrame(execucao["comandos"])
+
+                # Quantidade e tempo por comando e coleção: repetições ficam evidentes
+                st.dataframe(
+                    df_comandos.fillna({"colecao": "-"})
+                    .groupby(["comando", "colecao"], as_index=False)
+                    .agg(quantidade=("comando", "size"), tempo_total_ms=("duracao_ms", "sum"))
+                    .sort_values("quantidade", ascending=False)
+                    .rename(columns={"comando": "Comando", "colecao": "Coleção", "quantidade": "Quantidade", "tempo_total_ms": "Tempo total (ms)"}),
+                    hide_index=True
+                )
+
+                st.dataframe(
+                    df_comandos[["inicio", "pagina", "comando", "colecao", "duracao_ms", "documentos", "ok", "erro"]]
+                    .rename(columns={
+                        "inicio": "Início",
+                        "pagina": "Página",
+                        "comando": "Comando",
+                        "colecao": "Coleção",
+                        "duracao_ms": "Duração (ms)",
+                        "documentos": "Documentos",
+                        "ok": "OK",
+                        "erro": "Erro"
+                    }),
+                    hide_index=True
+                )
+
+            if execucao["descartados"]:
+                st.caption(f"{execucao['descartados']} comando(s) além do limite foram apenas contados.")
+
+            st.download_button(
+                "Exportar JSON",
+                data=monitor.exportar_json(),
+                file_name=f"comandos_mongo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                icon=":material/download:"
+            )
+
+        # Tempo das fases das páginas (BABACU_RASTREAMENTO) ------------------------------
+        if rastreamento_ativo():
+            st.write('')
+            st.write("**Tempo das fases das páginas neste processo**")
+
+            fases = resumo_fases()
+            if fases:
+                st.dataframe(
+                    pd.DataFrame(fases).rename(columns={
+                        "pagina": "Página",
+                        "fase": "Fase",
+                        "quantidade": "Medições",
+                        "p50_ms": "p50 (ms)",
+                        "p95_ms": "p95 (ms)",
+                        "p99_ms": "p99 (ms)",
+                        "max_ms": "Máximo (ms)"
+                    }),
+                    hide_index=True
+                )
+            st.caption(f"Medições gravadas em {rastreamento_arquivo()}.")
+
+        # Cache local de miniaturas (st.secrets["miniaturas"]) ------------------------------
+        miniaturas = cache_miniaturas()
+        if miniaturas:
+            st.write('')
+            st.write("**Cache local de miniaturas**")
+
+            estatisticas = miniaturas.estatisticas()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Miniaturas", estatisticas["miniaturas"])
+            col2.metric("Tamanho", f"{estatisticas['tamanho_mb']} / {estatisticas['tamanho_maximo_mb']} MB")
+            col3.metric("Downloads pendentes", estatisticas["downloads_pendentes"])
+
+    else:
+        st.write("Informações do sistema disponíveis apenas para administradores.")
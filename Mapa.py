@@ -1,6 +1,5 @@
 
 import streamlit as st
-from pymongo import MongoClient
 import pandas as pd
 
 
@@ -11,20 +10,36 @@ import tempfile
 import json
 import os
 
+from catalogo import versao_catalogo
+from funcoes_auxiliares import catalogo_parquet, conectar_mongo_dialogos_babacu, snapshot_catalogo
+from rastreamento import fase
+
 
 
 # --------------------------------------------------------------
 # Configurações do MongoDB
 # --------------------------------------------------------------
 
-client = MongoClient(st.secrets.mongo.string_conexao_mongo)
-db = client[st.secrets.mongo.bd_dialogos]
+# Conexão compartilhada (pool único para todas as páginas)
+db = conectar_mongo_dialogos_babacu()
 
 # Carregando cada coleção
 
 pontos = db["pontos_interesse"]
 
-df_pontos = pd.DataFrame(list(pontos.find()))
+# Snapshot Parquet do catálogo (None se desativado)
+parquet = catalogo_parquet()
+
+# Pontos lidos do snapshot Parquet ou do MongoDB (compartilhados entre as
+# sessões enquanto a versão do catálogo não muda). A lista compartilhada não é
+# copiada: o DataFrame montado a partir dela é da sessão
+with fase("carga"):
+    if parquet:
+        df_pontos = parquet.pontos_interesse()
+    else:
+        df_pontos = pd.DataFrame(
+            snapshot_catalogo().obter(versao_catalogo(db), "pontos_interesse", lambda: list(pontos.find()), copiar=False)
+        )
 
 
 # --------------------------------------------------------------
@@ -41,8 +56,9 @@ st.logo("images/logo dialogos do babacu.png", size="large")
 # --------------------------------------------------------------
 
 # Converter as colunas latitude e longitude para str
-df_pontos['latitude'] = df_pontos['latitude'].astype(float)
-df_pontos['longitude'] = df_pontos['longitude'].astype(float)
+with fase("transformação"):
+    df_pontos['latitude'] = df_pontos['latitude'].astype(float)
+    df_pontos['longitude'] = df_pontos['longitude'].astype(float)
 
 
 
@@ -55,4 +71,5 @@ df_pontos['longitude'] = df_pontos['longitude'].astype(float)
 
 st.header("Mapa dos Pontos de Interesse")
 st.write('')
-st.map(df_pontos, latitude="latitude", longitude="longitude", size=200)
+with fase("mapa"):
+    st.map(df_pontos, latitude="latitude", longitude="longitude", size=200)
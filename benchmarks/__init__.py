@@ -0,0 +1,7 @@
+# --------------------------------------------------------------
+# Benchmarks das leituras do catálogo
+#
+#   gerar_catalogo.py -> preenche um banco local com documentos sintéticos
+#   cenarios.py       -> consultas medidas (Biblioteca, filtros, temas e Mapa)
+#   __main__.py       -> python -m benchmarks: gera, mede e grava o JSON de resultados
+# --------------------------------------------------------------
@@ -0,0 +1,92 @@
+# --------------------------------------------------------------
+# Benchmarks das leituras do catálogo
+#
+# Uso (com um mongod local; o banco indicado é apagado e recriado):
+#   python -m benchmarks                                  -> 1k, 10k e 100k documentos
+#   python -m benchmarks --tamanhos 1000 10000 --repeticoes 50
+#   python -m benchmarks --cenarios busca_textual temas --saida resultados.json
+#   python -m benchmarks --sem-gerar --tamanhos 10000     -> mede o banco como está
+#
+# Os resultados vão para benchmarks/resultados/benchmark_<data>.json (ou
+# --saida): ambiente (versões do Python, PyMongo e MongoDB, semente, fase do
+# acervo) e uma linha por tamanho e cenário, com p50, p95, p99, média,
+# mínimo e máximo em milissegundos.
+# --------------------------------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+import pymongo
+from pymongo import MongoClient
+
+from benchmarks.cenarios import AQUECIMENTO_PADRAO, CENARIOS, REPETICOES_PADRAO, executar_cenarios
+from benchmarks.gerar_catalogo import SEMENTE_PADRAO, popular_catalogo
+from catalogo import fase_acervo
+
+
+URI_PADRAO = "mongodb://localhost:27017"
+
+# Banco próprio dos benchmarks: nunca o banco da aplicação, porque é apagado a cada tamanho
+BANCO_PADRAO = "babacu_benchmark"
+
+TAMANHOS_PADRAO = [1000, 10000, 100000]
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+
+def ambiente(db, semente):
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "pymongo": pymongo.version,
+        "mongodb": db.client.server_info()["version"],
+        "semente": semente,
+        "fase_acervo": fase_acervo(db),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks das leituras do catálogo")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO, help="Quantidades de documentos")
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), help="Cenários medidos (padrão: todos)")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--aquecimento", type=int, default=AQUECIMENTO_PADRAO)
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--sem-gerar", action="store_true", help="Não apaga nem gera o catálogo (um único tamanho)")
+    parser.add_argument("--saida", help="Arquivo JSON de resultados")
+    parser.add_argument("--uri", default=URI_PADRAO, help="String de conexão do MongoDB local")
+    parser.add_argument("--banco", default=BANCO_PADRAO, help="Banco usado (apagado e recriado)")
+    args = parser.parse_args(argv)
+
+    db = MongoClient(args.uri)[args.banco]
+    resultados = []
+
+    for tamanho in args.tamanhos:
+        if not args.sem_gerar:
+            print(f"Gerando {tamanho} documentos em {args.banco}...", file=sys.stderr)
+            popular_catalogo(db, tamanho, args.semente)
+
+        for resultado in executar_cenarios(db, args.cenarios, args.repeticoes, args.aquecimento):
+            resultados.append({"tamanho": tamanho, **resultado})
+            print(
+                f"{tamanho:>7} {resultado['cenario']:<28} p50 {resultado['p50_ms']:>9} ms  "
+                f"p95 {resultado['p95_ms']:>9} ms  p99 {resultado['p99_ms']:>9} ms",
+                file=sys.stderr
+            )
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump({"ambiente": ambiente(db, args.semente), "resultados": resultados}, arquivo, ensure_ascii=False, indent=2)
+
+    print(f"Resultados gravados em {saida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+# --------------------------------------------------------------
+# Teste de carga com sessões simultâneas (streamlit.testing AppTest)
+#
+# Uso (com um mongod local; o banco indicado é apagado e recriado):
+#   python -m benchmarks.carga                               -> 1, 5, 10 e 25 sessões
+#   python -m benchmarks.carga --sessoes 10 50 --ciclos 5 --documentos 10000
+#   python -m benchmarks.carga --opcao max_pool_size=50 --opcao leitura_parquet=true
+#
+# Cada sessão é um AppTest do login.py rodando em uma thread, todas no mesmo
+# processo, como as sessões de um servidor Streamlit: compartilham o
+# MongoClient, o SnapshotCatalogo e os demais st.cache_resource. As sessões
+# de visitante fazem login, abrem a Biblioteca, filtram, carregam mais cards e
+# abrem o Mapa; as de editor abrem o Gerenciamento, escolhem o tipo de mídia e
+# cadastram uma publicação (arquivo e miniatura enviados a um Drive falso, em
+# memória, com latência configurável) e voltam à Biblioteca.
+#
+# O AppTest não preenche st.file_uploader, então o cadastro usa as mesmas
+# funções chamadas pelo formulário (enviar_arquivo_drive,
+# enviar_miniatura_drive e inserir_documento) dentro da sessão do editor.
+#
+# Para cada quantidade de sessões, o resultado traz a vazão (execuções de
+# página por segundo), os percentis de latência por passo, as conexões
+# abertas no MongoDB (pool do app e serverStatus) e a memória residente do
+# processo. Os resultados vão para benchmarks/resultados/carga_<data>.json.
+# --------------------------------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import bcrypt
+import pymongo
+import streamlit as st
+from PIL import Image
+from pymongo import MongoClient
+from streamlit.runtime import Runtime
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+
+import funcoes_drive
+from benchmarks.__main__ import DIRETORIO_RESULTADOS, URI_PADRAO
+from benchmarks.gerar_catalogo import SEMENTE_PADRAO, popular_catalogo
+from catalogo import COLECOES_CATALOGO, TEMAS_BABACU, inserir_documento
+from funcoes_auxiliares import conectar_mongo_dialogos_babacu, monitor_pool_conexoes
+from rastreamento import percentis
+
+
+# Banco próprio do teste de carga (apagado a cada execução)
+BANCO_CARGA = "babacu_carga"
+
+SESSOES_PADRAO = [1, 5, 10, 25]
+
+# Vezes que cada sessão repete o seu fluxo
+CICLOS_PADRAO = 3
+
+DOCUMENTOS_PADRAO = 10000
+
+# Parte das sessões que são de editores
+PROPORCAO_EDITORES = 0.2
+
+# Latência simulada de cada envio ao Drive falso (segundos)
+LATENCIA_DRIVE_PADRAO = 0.2
+
+# Tempo máximo de uma execução de página no AppTest (segundos)
+TIMEOUT_EXECUCAO = 120
+
+# Intervalo da amostragem de conexões e memória (segundos)
+INTERVALO_AMOSTRAGEM = 0.5
+
+SENHA_CARGA = "carga123"
+
+USUARIOS_CARGA = [
+    {"nome_completo": "Visitante da carga", "e_mail": "visitante@carga.local", "permissao": "Visitante"},
+    {"nome_completo": "Editor da carga", "e_mail": "editor@carga.local", "permissao": "Editor"},
+]
+
+DIRETORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------ Drive falso ------------------ #
+
+class ArquivoDriveFalso(dict):
+    """
+    Arquivo do DriveFalso, com os métodos do GoogleDriveFile usados pelo app.
+    """
+
+    def __init__(self, drive, metadados):
+        super().__init__(metadados)
+        self._drive = drive
+
+    def SetContentFile(self, caminho):
+        self._tamanho = os.path.getsize(caminho)
+
+    def Upload(self):
+        time.sleep(self._drive.latencia)
+        self["id"] = uuid.uuid4().hex
+        self._drive.registrar(self)
+
+
+class DriveFalso:
+    """
+    Substitui o GoogleDrive autenticado: guarda os metadados em memória e
+    espera `latencia` segundos a cada envio.
+    """
+
+    def __init__(self, latencia=LATENCIA_DRIVE_PADRAO):
+        self.latencia = latencia
+        self.arquivos = {}
+        self._trava = threading.Lock()
+
+    def CreateFile(self, metadados):
+        return ArquivoDriveFalso(self, metadados)
+
+    def registrar(self, arquivo):
+        with self._trava:
+            self.arquivos[arquivo["id"]] = dict(arquivo)
+
+
+# ------------------ Preparação ------------------ #
+
+def preparar_banco(db, documentos, semente):
+    """
+    Gera o catálogo sintético e cria os usuários da carga (com a mesma senha).
+    """
+    popular_catalogo(db, documentos, semente)
+    senha = bcrypt.hashpw(SENHA_CARGA.encode("utf-8"), bcrypt.gensalt())
+    db["pessoas"].delete_many({"e_mail": {"$in": [u["e_mail"] for u in USUARIOS_CARGA]}})
+    db["pessoas"].insert_many([{**usuario, "senha": senha, "status": "ativo"} for usuario in USUARIOS_CARGA])
+
+
+def configurar_streamlit(uri, banco, opcoes_mongo, drive):
+    """
+    Prepara o processo para rodar várias sessões AppTest ao mesmo tempo.
+    """
+    # Os segredos são definidos uma vez, para todas as sessões (o AppTest troca
+    # st.secrets a cada execução quando recebe segredos próprios)
+    segredos = Secrets()
+    segredos._secrets = {
+        "mongo": {"string_conexao_mongo": uri, "bd_dialogos": banco, **opcoes_mongo},
+        "drive_folder": {"id": "pasta_carga"},
+        "drive_api": {"client_user_email": "carga@carga.local"},
+        "pastas": {nome_colecao: f"pasta_{nome_colecao}" for nome_colecao in COLECOES_CATALOGO},
+    }
+    st.secrets = segredos
+
+    # Cada execução do AppTest cria um Runtime falso e o apaga ao terminar. Com
+    # sessões simultâneas, uma execução apagaria o Runtime de outra ainda em
+    # andamento, então as execuções passam a usar um Runtime comum quando não há outro.
+    runtime_comum = MagicMock(spec=Runtime)
+    runtime_comum.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    Runtime.instance = classmethod(lambda cls: cls._instance or runtime_comum)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    funcoes_drive.authenticate_drive = lambda: drive
+
+
+# ------------------ Medidas do processo ------------------ #
+
+def memoria_residente_mb():
+    """
+    Memória residente atual do processo (Linux), ou o pico, em MB.
+    """
+    try:
+        with open("/proc/self/status", encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmRSS:"):
+                    return round(int(linha.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def conexoes_servidor(cliente_admin):
+    try:
+        return cliente_admin.admin.command("serverStatus")["connections"]["current"]
+    except pymongo.errors.PyMongoError:
+        return None
+
+
+class Amostrador:
+    """
+    Registra, em segundo plano, o máximo de conexões abertas (pool do app e
+    servidor) e de memória residente enquanto as sessões rodam.
+    """
+
+    def __init__(self, cliente_admin):
+        self.cliente_admin = cliente_admin
+        self.maximos = {"conexoes_pool": 0, "conexoes_servidor": None, "rss_mb": 0}
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name="amostrador-carga", daemon=True)
+
+    def _amostrar(self):
+        while True:
+            self.maximos["conexoes_pool"] = max(self.maximos["conexoes_pool"], monitor_pool_conexoes().contadores()["conexoes_abertas"])
+            self.maximos["rss_mb"] = max(self.maximos["rss_mb"], memoria_residente_mb())
+            servidor = conexoes_servidor(self.cliente_admin)
+            if servidor is not None:
+                self.maximos["conexoes_servidor"] = max(self.maximos["conexoes_servidor"] or 0, servidor)
+            if self._parar.wait(INTERVALO_AMOSTRAGEM):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self._parar.set()
+        self._thread.join()
+        return False
+
+
+# ------------------ Fluxos das sessões ------------------ #
+
+class Sessao:
+    """
+    Uma sessão do app (AppTest do login.py) e as durações de cada passo.
+    """
+
+    def __init__(self, usuario, aleatorio):
+        self.usuario = usuario
+        self.aleatorio = aleatorio
+        self.app = AppTest.from_file(os.path.join(DIRETORIO_APP, "login.py"), default_timeout=TIMEOUT_EXECUCAO)
+        self.passos = []
+
+    def _botao(self, rotulo):
+        return next(botao for botao in self.app.button if botao.label.startswith(rotulo))
+
+    def passo(self, nome, acao):
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            acao()
+            if self.app.exception:
+                erro = self.app.exception[0].message
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        self.passos.append({"passo": nome, "duracao_ms": (time.perf_counter() - inicio) * 1000, "erro": erro})
+        return erro is None
+
+    def login(self):
+        def entrar():
+            self.app.run()
+            self.app.text_input[0].input(self.usuario["e_mail"])
+            self.app.text_input[1].input(SENHA_CARGA)
+            self._botao("Entrar").click().run()
+        return self.passo("login", entrar)
+
+    def biblioteca(self):
+        return self.passo("biblioteca", lambda: self.app.switch_page("Biblioteca.py").run())
+
+    def filtrar(self):
+        def aplicar():
+            self.app.button_group[0].set_value(self.aleatorio.sample(["Publicação", "Imagem", "Vídeo", "Relatório", "Mapa"], 2))
+            self.app.button_group[1].set_value(self.aleatorio.sample(TEMAS_BABACU, 1))
+            self.app.text_input[0].input(self.aleatorio.choice(["", "", "babaçu", "quebradeiras", "azeite"]))
+            self._botao("Filtrar").click().run()
+        return self.passo("filtro", aplicar)
+
+    def carregar_mais(self):
+        def carregar():
+            # Sem mais páginas para os filtros sorteados, só executa a página de novo
+            if any(botao.label.startswith("Carregar mais") for botao in self.app.button):
+                self._botao("Carregar mais").click().run()
+            else:
+                self.app.run()
+        return self.passo("carregar_mais", carregar)
+
+    def mapa(self):
+        return self.passo("mapa", lambda: self.app.switch_page("Mapa.py").run())
+
+    def gerenciamento(self):
+        def abrir():
+            self.app.switch_page("Gerenciamento.py").run()
+            self.app.button_group[0].set_value(":material/menu_book: Publicação").run()
+        return self.passo("gerenciamento", abrir)
+
+    def cadastrar(self):
+        def enviar():
+            titulo = f"Publicação da carga {uuid.uuid4().hex[:8]}"
+            with tempfile.TemporaryDirectory() as diretorio:
+                caminho = os.path.join(diretorio, f"{titulo}.png")
+                Image.new("RGB", (1200, 1600), (200, 170, 120)).save(caminho)
+
+                drive = funcoes_drive.authenticate_drive()
+                subfolder_id, file_link = funcoes_drive.enviar_arquivo_drive(
+                    drive, caminho, os.path.basename(caminho), funcoes_drive.pasta_do_tipo("Publicação")
+                )
+                thumb_link, thumb_previa = funcoes_drive.enviar_miniatura_drive(drive, caminho, titulo, subfolder_id)
+
+            # Mesmo pool de conexões das páginas
+            inserir_documento(conectar_mongo_dialogos_babacu()["publicacoes"], {
+                "titulo": titulo,
+                "descricao": "Documento cadastrado pelo teste de carga.",
+                "ano_publicacao": datetime.now().year,
+                "tema": self.aleatorio.sample(TEMAS_BABACU, 2),
+                "autor": self.usuario["nome_completo"],
+                "organizacao": ["ISPN"],
+                "tipo": "Publicação",
+                "enviado_por": self.usuario["nome_completo"],
+                "link": file_link,
+                "thumb_link": thumb_link,
+                "thumb_previa": thumb_previa,
+                "data_upload": datetime.now()
+            })
+        return self.passo("cadastro", enviar)
+
+    def executar(self, ciclos):
+        if not self.login():
+            return
+        for _ in range(ciclos):
+            if self.usuario["permissao"] == "Editor":
+                self.gerenciamento()
+                self.cadastrar()
+                self.biblioteca()
+            else:
+                self.biblioteca()
+                self.filtrar()
+                self.carregar_mais()
+                self.mapa()
+
+
+# ------------------ Execução ------------------ #
+
+def rodar_sessoes(quantidade, ciclos, proporcao_editores, semente, cliente_admin):
+    """
+    Roda `quantidade` sessões ao mesmo tempo, cada uma em uma thread, e
+    resume as durações dos passos, a vazão, as conexões e a memória.
+    """
+    editores = round(quantidade * proporcao_editores)
+    sessoes = [
+        Sessao(USUARIOS_CARGA[1] if indice < editores else USUARIOS_CARGA[0], random.Random(semente + indice))
+        for indice in range(quantidade)
+    ]
+    threads = [threading.Thread(target=sessao.executar, args=(ciclos,), name=f"sessao-carga-{indice}") for indice, sessao in enumerate(sessoes)]
+
+    with Amostrador(cliente_admin) as amostrador:
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+    passos = [passo for sessao in sessoes for passo in sessao.passos]
+    por_passo = {}
+    for passo in passos:
+        por_passo.setdefault(passo["passo"], []).append(passo)
+
+    erros = [passo["erro"] for passo in passos if passo["erro"]]
+    return {
+        "sessoes": quantidade,
+        "editores": editores,
+        "duracao_s": round(duracao, 2),
+        "passos": len(passos),
+        "vazao_passos_por_s": round(len(passos) / duracao, 2),
+        "erros": len(erros),
+        "exemplos_erros": sorted(set(erros))[:5],
+        "latencia": percentis([passo["duracao_ms"] for passo in passos]) if passos else None,
+        "latencia_por_passo": {
+            nome: {**percentis([p["duracao_ms"] for p in itens]), "erros": sum(1 for p in itens if p["erro"])}
+            for nome, itens in por_passo.items()
+        },
+        "conexoes_pool_max": amostrador.maximos["conexoes_pool"],
+        "conexoes_servidor_max": amostrador.maximos["conexoes_servidor"],
+        "rss_mb_max": amostrador.maximos["rss_mb"],
+    }
+
+
+def opcao_mongo(texto):
+    """
+    "chave=valor" de --opcao: números e true/false são convertidos.
+    """
+    chave, _, valor = texto.partition("=")
+    if valor.lower() in ("true", "false"):
+        return chave, valor.lower() == "true"
+    try:
+        return chave, int(valor)
+    except ValueError:
+        return chave, valor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas do app")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=SESSOES_PADRAO, help="Quantidades de sessões simultâneas")
+    parser.add_argument("--ciclos", type=int, default=CICLOS_PADRAO, help="Repetições do fluxo por sessão")
+    parser.add_argument("--documentos", type=int, default=DOCUMENTOS_PADRAO, help="Tamanho do catálogo gerado")
+    parser.add_argument("--editores", type=float, default=PROPORCAO_EDITORES, help="Parte das sessões que são de editores")
+    parser.add_argument("--latencia-drive", type=float, default=LATENCIA_DRIVE_PADRAO, help="Segundos por envio ao Drive falso")
+    parser.add_argument("--opcao", type=opcao_mongo, action="append", default=[], help='Opção de st.secrets["mongo"], como max_pool_size=50')
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--saida", help="Arquivo JSON de resultados")
+    parser.add_argument("--uri", default=URI_PADRAO, help="String de conexão do MongoDB local")
+    parser.add_argument("--banco", default=BANCO_CARGA, help="Banco usado (apagado e recriado)")
+    args = parser.parse_args(argv)
+
+    # As páginas usam caminhos relativos à pasta do app (imagens do logo)
+    os.chdir(DIRETORIO_APP)
+
+    cliente_admin = MongoClient(args.uri)
+    print(f"Gerando {args.documentos} documentos em {args.banco}...", file=sys.stderr)
+    preparar_banco(cliente_admin[args.banco], args.documentos, args.semente)
+
+    drive = DriveFalso(args.latencia_drive)
+    opcoes_mongo = dict(args.opcao)
+    configurar_streamlit(args.uri, args.banco, opcoes_mongo, drive)
+
+    resultados = []
+    for quantidade in args.sessoes:
+        resultado = rodar_sessoes(quantidade, args.ciclos, args.editores, args.semente, cliente_admin)
+        resultados.append(resultado)
+        latencia = resultado["latencia"] or {}
+        print(
+            f"{quantidade:>4} sessões: {resultado['vazao_passos_por_s']:>7} passos/s  "
+            f"p50 {latencia.get('p50_ms')} ms  p95 {latencia.get('p95_ms')} ms  p99 {latencia.get('p99_ms')} ms  "
+            f"erros {resultado['erros']}  conexões {resultado['conexoes_pool_max']}/{resultado['conexoes_servidor_max']}  "
+            f"RSS {resultado['rss_mb_max']} MB",
+            file=sys.stderr
+        )
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"carga_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "ambiente": {
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "pymongo": pymongo.version,
+                "mongodb": cliente_admin.server_info()["version"],
+                "documentos": args.documentos,
+                "ciclos": args.ciclos,
+                "proporcao_editores": args.editores,
+                "latencia_drive_s": args.latencia_drive,
+                "opcoes_mongo": opcoes_mongo,
+                "semente": args.semente,
+            },
+            "resultados": resultados,
+            "arquivos_drive_falso": len(drive.arquivos),
+        }, arquivo, ensure_ascii=False, indent=2)
+
+    print(f"Resultados gravados em {saida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
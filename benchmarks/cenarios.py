@@ -0,0 +1,98 @@
+# --------------------------------------------------------------
+# Cenários medidos nos benchmarks
+#
+# Cada cenário reproduz uma leitura feita pelas páginas, direto no banco (sem
+# o SnapshotCatalogo nem o índice em memória, que esconderiam o custo da
+# consulta): a primeira página e a página seguinte da Biblioteca, os filtros
+# por tipo, tema e palavra-chave, as contagens do formulário, a descoberta de
+# temas e o DataFrame do Mapa.
+# --------------------------------------------------------------
+
+import time
+
+import pandas as pd
+
+from catalogo import (
+    TAMANHO_PAGINA,
+    TEMAS_BABACU,
+    buscar_arquivos,
+    chave_paginacao,
+    contar_arquivos,
+    contar_facetas,
+    filtro_prefixo,
+    listar_temas
+)
+from rastreamento import percentis
+
+
+# Execuções descartadas antes das medidas (conexões e cache do servidor)
+AQUECIMENTO_PADRAO = 2
+
+REPETICOES_PADRAO = 20
+
+
+def _primeira_pagina(db, query=None, texto=None):
+    return buscar_arquivos(db, query, limite=TAMANHO_PAGINA, para_card=True, texto=texto)
+
+
+def cenario_segunda_pagina(db):
+    # O cursor da segunda página é calculado uma vez, fora da medida
+    apos = chave_paginacao(_primeira_pagina(db)[-1])
+    return lambda: buscar_arquivos(db, limite=TAMANHO_PAGINA, apos=apos, para_card=True)
+
+
+def cenario_mapa(db):
+    def montar():
+        df_pontos = pd.DataFrame(list(db["pontos_interesse"].find()))
+        df_pontos["latitude"] = df_pontos["latitude"].astype(float)
+        df_pontos["longitude"] = df_pontos["longitude"].astype(float)
+        return df_pontos
+    return montar
+
+
+# Nome do cenário -> função que recebe o banco e devolve a chamada medida
+CENARIOS = {
+    "biblioteca_primeira_pagina": lambda db: lambda: _primeira_pagina(db),
+    "biblioteca_segunda_pagina": cenario_segunda_pagina,
+    "biblioteca_total": lambda db: lambda: contar_arquivos(db),
+    "gerenciamento_todos": lambda db: lambda: buscar_arquivos(db),
+    "filtro_tipo": lambda db: lambda: _primeira_pagina(db, {"tipo": {"$in": ["Publicação", "Vídeo"]}}),
+    "filtro_tema": lambda db: lambda: _primeira_pagina(db, {"tema": {"$in": TEMAS_BABACU[:2]}}),
+    "filtro_tipo_e_tema": lambda db: lambda: _primeira_pagina(db, {"tipo": {"$in": ["Relatório"]}, "tema": {"$in": ["Saúde"]}}),
+    "busca_textual": lambda db: lambda: _primeira_pagina(db, texto="quebradeiras azeite"),
+    "busca_prefixo": lambda db: lambda: _primeira_pagina(db, filtro_prefixo("babac mesoc")),
+    "contagem_busca_textual": lambda db: lambda: contar_arquivos(db, texto="quebradeiras azeite"),
+    "facetas": lambda db: lambda: contar_facetas(db),
+    "facetas_busca_textual": lambda db: lambda: contar_facetas(db, texto="cooperativas"),
+    "temas": lambda db: lambda: listar_temas(db),
+    "mapa_dataframe": cenario_mapa,
+}
+
+
+def medir_cenario(chamada, repeticoes=REPETICOES_PADRAO, aquecimento=AQUECIMENTO_PADRAO):
+    """
+    Executa a chamada `aquecimento` vezes sem medir e `repeticoes` vezes
+    medindo. Retorna os percentis das durações (ms) e a média.
+    """
+    for _ in range(aquecimento):
+        chamada()
+
+    duracoes = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        chamada()
+        duracoes.append((time.perf_counter() - inicio) * 1000)
+
+    return {**percentis(duracoes), "media_ms": round(sum(duracoes) / len(duracoes), 2), "min_ms": round(min(duracoes), 2)}
+
+
+def executar_cenarios(db, nomes=None, repeticoes=REPETICOES_PADRAO, aquecimento=AQUECIMENTO_PADRAO):
+    """
+    Mede os cenários escolhidos (todos, por padrão) no banco.
+    Retorna [{"cenario": nome, "quantidade": n, "p50_ms": ..., ...}].
+    """
+    resultados = []
+    for nome in nomes or CENARIOS:
+        chamada = CENARIOS[nome](db)
+        resultados.append({"cenario": nome, **medir_cenario(chamada, repeticoes, aquecimento)})
+    return resultados
@@ -0,0 +1,301 @@
+# --------------------------------------------------------------
+# Catálogo sintético para os benchmarks
+#
+# Gera documentos parecidos com os cadastrados pelo Gerenciamento, nas 12
+# coleções do acervo, com temas de TEMAS_BABACU e textos em português. A
+# mesma semente gera sempre os mesmos documentos (inclusive os _id), então
+# resultados de execuções diferentes são comparáveis.
+#
+# Os documentos são gravados com catalogo.inserir_documentos, que calcula os
+# termos de busca e atualiza as facetas e a versão do catálogo, e os índices
+# são os das migrações (migracoes.aplicar_migracoes).
+# --------------------------------------------------------------
+
+import random
+import string
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from catalogo import (
+    COLECAO_ACERVO,
+    COLECAO_FACETAS,
+    COLECAO_METADADOS,
+    COLECOES_CATALOGO,
+    TEMAS_BABACU,
+    inserir_documentos
+)
+from migracoes import aplicar_migracoes
+
+
+SEMENTE_PADRAO = 42
+
+# Documentos gravados por vez
+TAMANHO_LOTE = 1000
+
+# Parte do acervo em cada coleção (as publicações e imagens são a maioria)
+PESOS_COLECOES = {
+    "publicacoes": 25,
+    "imagens": 18,
+    "videos": 8,
+    "podcasts": 5,
+    "sites": 5,
+    "mapas": 5,
+    "legislacao": 6,
+    "pontos_interesse": 8,
+    "relatorios": 8,
+    "organizacoes": 4,
+    "projetos": 4,
+    "pesquisas": 4,
+}
+
+TIPO_POR_COLECAO = {
+    "publicacoes": "Publicação",
+    "imagens": "Imagem",
+    "videos": "Vídeo",
+    "podcasts": "Podcast",
+    "sites": "Site",
+    "mapas": "Mapa",
+    "legislacao": "Legislação",
+    "pontos_interesse": "Ponto de interesse",
+    "relatorios": "Relatório",
+    "organizacoes": "Organização",
+    "projetos": "Projeto",
+    "pesquisas": "Pesquisa",
+}
+
+# Período das datas de envio
+INICIO_UPLOADS = datetime(2019, 1, 1)
+FIM_UPLOADS = datetime(2025, 12, 31)
+
+# Parte dos documentos sem data_upload (cadastros antigos), que vão para o fim da listagem
+PROPORCAO_SEM_DATA = 0.02
+
+# Região dos babaçuais (Maranhão, Piauí, Tocantins e Pará)
+LATITUDES = (-8.5, -2.0)
+LONGITUDES = (-49.0, -41.5)
+
+
+# ------------------ Vocabulário ------------------ #
+
+ASSUNTOS = [
+    "Quebradeiras de coco babaçu", "Extrativismo do babaçu", "Azeite de babaçu",
+    "Mesocarpo de babaçu", "Carvão de casca de coco", "Babaçu livre",
+    "Cooperativas agroextrativistas", "Territórios tradicionais", "Sementes crioulas",
+    "Agroecologia nos babaçuais", "Mulheres extrativistas", "Comercialização solidária",
+    "Cadeia produtiva do babaçu", "Palmeiras e quintais produtivos", "Óleo e sabonete artesanal",
+]
+
+COMPLEMENTOS = [
+    "no Maranhão", "no Médio Mearim", "no Bico do Papagaio", "no Piauí", "no Tocantins",
+    "na Baixada Maranhense", "no sudeste do Pará", "em comunidades quilombolas",
+    "em assentamentos rurais", "na Amazônia Legal", "no Cerrado", "entre 2010 e 2020",
+]
+
+FORMATOS_TITULO = [
+    "{assunto} {complemento}",
+    "{assunto}: experiências {complemento}",
+    "Guia prático: {assunto_minusculo}",
+    "Diagnóstico de {assunto_minusculo} {complemento}",
+    "Memórias de {assunto_minusculo}",
+    "{assunto} e {assunto_2_minusculo}",
+]
+
+FRASES = [
+    "O documento reúne relatos de famílias que vivem da coleta e da quebra do coco.",
+    "Apresenta dados de produção, renda e organização das comunidades extrativistas.",
+    "Discute o acesso livre aos babaçuais e os conflitos com a expansão das cercas.",
+    "Descreve técnicas tradicionais de beneficiamento do azeite e do mesocarpo.",
+    "Traz recomendações para políticas públicas de apoio à sociobiodiversidade.",
+    "Registra oficinas de formação realizadas com jovens e mulheres quebradeiras.",
+    "Mostra a importância da palmeira para a alimentação e a cultura regional.",
+    "Analisa canais de comercialização e o papel das cooperativas locais.",
+    "Compara a situação das áreas de babaçu em diferentes municípios da região.",
+    "Inclui mapas participativos elaborados pelas próprias comunidades.",
+    "Relata a experiência de produção de carvão ecológico a partir da casca.",
+    "Aborda saúde, educação do campo e segurança alimentar nas comunidades.",
+]
+
+NOMES = [
+    "Maria", "Ana", "Raimunda", "Francisca", "Antônia", "José", "João", "Luiza",
+    "Dora", "Helena", "Cláudia", "Pedro", "Marcos", "Rosa", "Tereza", "Paulo",
+]
+
+SOBRENOMES = [
+    "Silva", "Souza", "Santos", "Oliveira", "Pereira", "Costa", "Rodrigues", "Almeida",
+    "Nascimento", "Lima", "Araújo", "Ferreira", "Carvalho", "Gomes", "Martins", "Rocha",
+]
+
+ORGANIZACOES = [
+    ("Movimento Interestadual das Quebradeiras de Coco Babaçu", "MIQCB"),
+    ("Associação em Áreas de Assentamento no Estado do Maranhão", "ASSEMA"),
+    ("Instituto Sociedade, População e Natureza", "ISPN"),
+    ("Cooperativa de Pequenos Produtores Agroextrativistas de Lago do Junco", "COPPALJ"),
+    ("Rede de Sementes do Cerrado", "RSC"),
+    ("Associação das Mulheres Trabalhadoras Rurais", "AMTR"),
+    ("Cooperativa Interestadual das Mulheres Quebradeiras de Coco", "CIMQCB"),
+    ("Fórum Carajás", "FC"),
+    ("Centro de Agricultura Alternativa do Norte de Minas", "CAA"),
+    ("Empresa Brasileira de Pesquisa Agropecuária", "Embrapa"),
+]
+
+FONTES_RECURSOS = ["Fundo Amazônia", "PPP-ECOS", "Fundo Casa", "Recursos próprios", "Cooperação internacional"]
+
+
+# ------------------ Geração ------------------ #
+
+def _id_drive(aleatorio):
+    return "".join(aleatorio.choices(string.ascii_letters + string.digits + "-_", k=33))
+
+
+def _pessoa(aleatorio):
+    return f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}"
+
+
+def _titulo(aleatorio):
+    assunto, assunto_2 = aleatorio.sample(ASSUNTOS, 2)
+    return aleatorio.choice(FORMATOS_TITULO).format(
+        assunto=assunto,
+        assunto_minusculo=assunto[0].lower() + assunto[1:],
+        assunto_2_minusculo=assunto_2[0].lower() + assunto_2[1:],
+        complemento=aleatorio.choice(COMPLEMENTOS)
+    )
+
+
+def _temas(aleatorio):
+    temas = aleatorio.sample(TEMAS_BABACU, aleatorio.randint(1, 3))
+    if aleatorio.random() < 0.05:
+        temas.append("Outro")
+    return temas
+
+
+def _data_upload(aleatorio):
+    if aleatorio.random() < PROPORCAO_SEM_DATA:
+        return None
+    segundos = int((FIM_UPLOADS - INICIO_UPLOADS).total_seconds())
+    return INICIO_UPLOADS + timedelta(seconds=aleatorio.randrange(segundos))
+
+
+def gerar_documento(aleatorio, nome_colecao):
+    """
+    Um documento da coleção, com os campos gravados pelo formulário do tipo.
+    """
+    tipo = TIPO_POR_COLECAO[nome_colecao]
+    doc = {
+        "_id": ObjectId(bytes(aleatorio.getrandbits(8) for _ in range(12))),
+        "titulo": _titulo(aleatorio),
+        "descricao": " ".join(aleatorio.sample(FRASES, aleatorio.randint(2, 5))),
+        "tema": _temas(aleatorio),
+        "tipo": tipo,
+        "enviado_por": _pessoa(aleatorio),
+    }
+
+    data_upload = _data_upload(aleatorio)
+    if data_upload:
+        doc["data_upload"] = data_upload
+
+    if nome_colecao not in ("organizacoes", "projetos"):
+        doc["autor"] = ", ".join(_pessoa(aleatorio) for _ in range(aleatorio.randint(1, 3)))
+
+    if nome_colecao != "organizacoes":
+        doc["organizacao"] = [sigla for _, sigla in aleatorio.sample(ORGANIZACOES, aleatorio.randint(1, 2))]
+
+    if nome_colecao in ("publicacoes", "relatorios", "pesquisas", "legislacao"):
+        doc["ano_publicacao"] = aleatorio.randint(1985, 2025)
+
+    if nome_colecao in ("publicacoes", "imagens", "relatorios", "mapas"):
+        doc["link"] = f"https://drive.google.com/file/d/{_id_drive(aleatorio)}/view"
+        doc["thumb_link"] = f"https://drive.google.com/file/d/{_id_drive(aleatorio)}/view"
+
+    elif nome_colecao == "videos":
+        video_id = "".join(aleatorio.choices(string.ascii_letters + string.digits, k=11))
+        doc["link"] = f"https://www.youtube.com/watch?v={video_id}"
+        doc["thumb_link"] = f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg"
+
+    elif nome_colecao in ("podcasts", "sites", "legislacao"):
+        doc["link"] = f"https://www.exemplo.org.br/{nome_colecao}/{aleatorio.randrange(10**6)}"
+        if nome_colecao != "legislacao":
+            doc["thumb_link"] = f"https://drive.google.com/file/d/{_id_drive(aleatorio)}/view"
+
+    elif nome_colecao == "pontos_interesse":
+        # Gravadas como texto, como saem do link do Google Maps no formulário
+        latitude = round(aleatorio.uniform(*LATITUDES), 6)
+        longitude = round(aleatorio.uniform(*LONGITUDES), 6)
+        doc["latitude"] = str(latitude)
+        doc["longitude"] = str(longitude)
+        doc["link"] = f"https://www.google.com/maps/@{latitude},{longitude},15z"
+        doc["thumb_link"] = f"https://drive.google.com/file/d/{_id_drive(aleatorio)}/view"
+
+    elif nome_colecao == "organizacoes":
+        nome, sigla = aleatorio.choice(ORGANIZACOES)
+        doc["titulo"] = f"{nome} ({aleatorio.randrange(1000)})"
+        doc["sigla"] = sigla
+        doc["cnpj"] = f"{aleatorio.randrange(10**14):014d}"
+        doc["websites"] = f"https://www.{sigla.lower()}.org.br"
+        doc["logotipo"] = f"https://drive.google.com/file/d/{_id_drive(aleatorio)}/view"
+        doc["subfolder_id"] = _id_drive(aleatorio)
+        doc["documentos"] = []
+
+    elif nome_colecao == "projetos":
+        inicio = datetime(aleatorio.randint(2010, 2024), aleatorio.randint(1, 12), 1)
+        doc["objetivo"] = aleatorio.choice(FRASES)
+        doc["fonte_recursos"] = aleatorio.choice(FONTES_RECURSOS)
+        doc["data_inicio"] = inicio
+        doc["data_fim"] = inicio + timedelta(days=aleatorio.randint(180, 1460))
+        doc["website"] = f"https://www.exemplo.org.br/projetos/{aleatorio.randrange(10**6)}"
+        doc["subfolder_id"] = _id_drive(aleatorio)
+        doc["documentos"] = []
+
+    if nome_colecao == "pesquisas":
+        doc["subfolder_id"] = _id_drive(aleatorio)
+        doc["documentos"] = []
+
+    return doc
+
+
+def quantidades_por_colecao(quantidade):
+    """
+    Divide `quantidade` entre as coleções segundo PESOS_COLECOES (a sobra do
+    arredondamento fica com as publicações).
+    """
+    total_pesos = sum(PESOS_COLECOES.values())
+    quantidades = {nome: quantidade * peso // total_pesos for nome, peso in PESOS_COLECOES.items()}
+    quantidades["publicacoes"] += quantidade - sum(quantidades.values())
+    return quantidades
+
+
+def gerar_documentos(quantidade, semente=SEMENTE_PADRAO):
+    """
+    Gera {colecao: [documentos]} com `quantidade` documentos no total.
+    """
+    aleatorio = random.Random(semente)
+    return {
+        nome_colecao: [gerar_documento(aleatorio, nome_colecao) for _ in range(quantidade_colecao)]
+        for nome_colecao, quantidade_colecao in quantidades_por_colecao(quantidade).items()
+    }
+
+
+def limpar_catalogo(db):
+    """
+    Remove as coleções do acervo, as facetas e os metadados do catálogo.
+    """
+    for nome_colecao in COLECOES_CATALOGO + [COLECAO_ACERVO, COLECAO_FACETAS, COLECAO_METADADOS]:
+        db.drop_collection(nome_colecao)
+
+
+def popular_catalogo(db, quantidade, semente=SEMENTE_PADRAO, tamanho_lote=TAMANHO_LOTE):
+    """
+    Apaga o catálogo do banco, cria os índices e grava `quantidade`
+    documentos sintéticos. Retorna {colecao: quantidade gravada}.
+    """
+    limpar_catalogo(db)
+    _, erros = aplicar_migracoes(db)
+    if erros:
+        raise RuntimeError("Falha ao criar os índices: " + "; ".join(erros))
+
+    gravados = {}
+    for nome_colecao, documentos in gerar_documentos(quantidade, semente).items():
+        for inicio in range(0, len(documentos), tamanho_lote):
+            inserir_documentos(db[nome_colecao], documentos[inicio:inicio + tamanho_lote])
+        gravados[nome_colecao] = len(documentos)
+    return gravados
@@ -0,0 +1,182 @@
+# --------------------------------------------------------------
+# Cards da Biblioteca em HTML
+#
+# A grade de cards é enviada ao navegador como um único bloco HTML/CSS
+# (st.html), em vez de um container com vários elementos do Streamlit por
+# card. O HTML de cada documento é montado uma vez e guardado em um
+# SnapshotCatalogo próprio (cards_catalogo, em funcoes_auxiliares.py),
+# compartilhado entre as sessões enquanto a versão do catálogo não muda.
+#
+# Com o cache local de miniaturas ativo (miniaturas.py), as imagens do Drive
+# já baixadas são servidas pelo próprio Streamlit. As URLs das imagens fazem
+# parte da chave de cada card (chave_card): quando a miniatura de um documento
+# chega ao disco, só o card dele é refeito.
+#
+# As miniaturas são carregadas só quando o card se aproxima da área visível
+# (loading="lazy"). Até lá, o card mostra a prévia de 16px gravada no envio
+# (thumb_previa/logotipo_previa), embutida no próprio HTML como data URI:
+# a primeira pintura da grade não depende de nenhuma requisição de imagem.
+#
+# Os textos dos documentos são escapados: marcação digitada no cadastro
+# aparece como texto, não como HTML.
+# --------------------------------------------------------------
+
+from html import escape
+
+
+# Largura e altura dos cards, as mesmas dos containers usados antes
+LARGURA_CARD = 280
+ALTURA_CARD = 500
+
+# Ícone (Material Symbols) de cada tipo de mídia
+TIPOS_MIDIA_ICONE = {
+    "Publicação": "menu_book",
+    "Imagem": "add_a_photo",
+    "Relatório": "assignment",
+    "Vídeo": "videocam",
+    "Podcast": "podcasts",
+    "Site": "language",
+    "Mapa": "map",
+    "Legislação": "balance",
+    "Ponto de interesse": "location_on",
+    "Organização": "things_to_do",
+    "Projeto": "assignment",
+    "Pesquisa": "query_stats"
+}
+
+# Tipos sem miniatura, representados por um ícone grande
+TIPOS_COM_ICONE_GRANDE = ["Legislação", "Projeto", "Pesquisa"]
+
+# Tipos cujo "Ver detalhes" abre a pasta do documento no Drive
+TIPOS_COM_PASTA = ["Organização", "Pesquisa"]
+
+# O Streamlit já carrega a fonte Material Symbols Rounded para os ícones
+# :material/...:, então os cards não precisam de <link> para a fonte.
+CSS_GRADE = f"""
+<style>
+.grade-cards {{ display: flex; flex-wrap: wrap; gap: 1rem; }}
+.card-doc {{
+    box-sizing: border-box; width: {LARGURA_CARD}px; height: {ALTURA_CARD}px; overflow-y: auto;
+    border: 1px solid rgba(49, 51, 63, 0.2); border-radius: 0.5rem; padding: 1rem;
+    display: flex; flex-direction: column; gap: 0.5rem; font-size: 0.95rem;
+}}
+.card-doc p {{ margin: 0; }}
+.card-doc h5 {{ margin: 0 0 0.5rem 0; padding: 0; }}
+.card-doc .icone {{ font-family: "Material Symbols Rounded"; font-size: 1.25rem; vertical-align: -0.25rem; }}
+.card-doc .icone-grande {{ font-family: "Material Symbols Rounded"; font-size: 100px; color: #777; text-align: center; margin: 40px 0; }}
+.card-doc img {{ width: 100%; border-radius: 0.25rem; }}
+.card-doc .miniatura {{ position: relative; overflow: hidden; border-radius: 0.25rem; }}
+.card-doc .miniatura .previa {{ display: block; filter: blur(6px); transform: scale(1.05); }}
+.card-doc .miniatura img:not(.previa) {{ position: absolute; inset: 0; height: 100%; object-fit: cover; }}
+.card-doc .ver-detalhes {{
+    align-self: flex-start; margin-top: 0.25rem; padding: 0.25rem 0.75rem; border-radius: 0.5rem;
+    background: #ff4b4b; color: white !important; text-decoration: none;
+}}
+</style>
+"""
+
+
+def url_miniatura(arq, campo_id, campo_url, miniaturas=None):
+    """
+    URL da imagem exibida no card, lida dos campos gravados junto com o
+    documento (ver catalogo.campos_miniatura): a cópia local em `miniaturas`
+    (CacheMiniaturas), se houver, ou a URL gravada. None se não houver imagem.
+    """
+    return (miniaturas and miniaturas.url(arq.get(campo_id))) or arq.get(campo_url)
+
+
+def html_imagem(url, previa=None):
+    """
+    <img> da miniatura, com carregamento sob demanda. Com a prévia, ela ocupa
+    o espaço da imagem (mesma proporção), desfocada, até a miniatura cobri-la.
+    """
+    imagem = f'<img src="{escape(url)}" alt="" loading="lazy" decoding="async">'
+    if not (previa and previa.startswith("data:image/")):
+        return imagem
+    return f'<div class="miniatura"><img class="previa" src="{escape(previa)}" alt="">{imagem}</div>'
+
+
+def _texto(valor):
+    # tema e organizacao podem vir como lista ou já unidos em texto
+    if isinstance(valor, list):
+        return ", ".join(str(item) for item in valor if item)
+    return str(valor) if valor is not None else ""
+
+
+def _campo(rotulo, valor):
+    return f"<p><strong>{rotulo}:</strong> {escape(valor)}</p>"
+
+
+def imagens_card(arq, miniaturas=None):
+    """
+    (url, prévia) das imagens do card: o logotipo, nas organizações, e a
+    miniatura do documento. `miniaturas` é o cache local de miniaturas, se
+    estiver ativo.
+    """
+    imagens = [(url_miniatura(arq, "logotipo_file_id", "logotipo_url", miniaturas), arq.get("logotipo_previa"))] if arq.get("tipo") == "Organização" else []
+    imagens.append((url_miniatura(arq, "thumb_file_id", "thumb_url", miniaturas), arq.get("thumb_previa")))
+    return imagens
+
+
+def chave_card(arq, imagens):
+    """
+    Chave do card no cache de HTML: o documento e as URLs das suas imagens.
+    Quando uma miniatura chega ao cache local, só o card dela muda de chave.
+    """
+    return (str(arq.get("_id")), *(url for url, _ in imagens))
+
+
+def html_card(arq, imagens=None):
+    """
+    HTML do card de um documento, com o mesmo conteúdo e a mesma ordem dos
+    cards montados antes com elementos do Streamlit. `imagens` vem de
+    imagens_card (por padrão, sem o cache local de miniaturas).
+    """
+    tipo = arq.get("tipo", "Tipo não informado")
+    titulo = arq.get("titulo", "Sem título")
+    descricao = arq.get("descricao", "Sem descrição")
+    autor = arq.get("autor", "Autor desconhecido")
+    tema = _texto(arq.get("tema", ""))
+    organizacao = _texto(arq.get("organizacao", ""))
+    link = arq.get("link", "#")
+
+    partes = [f'<p><span class="icone">{TIPOS_MIDIA_ICONE.get(tipo, "")}</span> {escape(tipo)}</p>']
+
+    # Miniatura: ícone grande, logotipo da organização e/ou miniatura do documento
+    if tipo in TIPOS_COM_ICONE_GRANDE:
+        partes.append(f'<div class="icone-grande">{TIPOS_MIDIA_ICONE[tipo]}</div>')
+
+    if imagens is None:
+        imagens = imagens_card(arq)
+    partes.extend(html_imagem(url, previa) for url, previa in imagens if url)
+
+    # Texto
+    partes.append(f"<h5>{escape(titulo)}</h5>")
+    if tipo == "Organização":
+        partes.append(_campo("Sigla", _texto(arq.get("sigla"))))
+    partes.append(f"<p>{escape(_texto(descricao))}</p>")
+
+    # Organização e projeto não têm autor
+    if tipo not in ("Organização", "Projeto"):
+        partes.append(_campo("Autor", _texto(autor)))
+    if organizacao.strip():
+        partes.append(_campo("Organização", organizacao))
+    if tema.strip():
+        partes.append(_campo("Tema", tema))
+    if tipo == "Organização":
+        partes.append(_campo("Websites", _texto(arq.get("websites", "N/A"))))
+
+    # Link para a pasta com vários arquivos
+    if tipo in TIPOS_COM_PASTA:
+        link = f"https://drive.google.com/drive/folders/{arq.get('subfolder_id', '')}"
+
+    partes.append(f'<a class="ver-detalhes" href="{escape(link or "#")}" target="_blank" rel="noopener">Ver detalhes</a>')
+
+    return f'<div class="card-doc">{"".join(partes)}</div>'
+
+
+def html_grade(cards):
+    """
+    Um único bloco HTML com o CSS e todos os cards.
+    """
+    return f'{CSS_GRADE}<div class="grade-cards">{"".join(cards)}</div>'
@@ -0,0 +1,793 @@
+# --------------------------------------------------------------
+# Consultas ao catálogo (acervo) da biblioteca
+# --------------------------------------------------------------
+
+import copy
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import ReplaceOne, UpdateOne
+
+from rastreamento import medir
+
+
+# Coleções que compõem o acervo. A primeira é a base do pipeline,
+# as demais entram com $unionWith.
+COLECOES_CATALOGO = [
+    "publicacoes",
+    "imagens",
+    "videos",
+    "podcasts",
+    "sites",
+    "mapas",
+    "legislacao",
+    "pontos_interesse",
+    "relatorios",
+    "organizacoes",
+    "projetos",
+    "pesquisas"
+]
+
+
+# Tipo de mídia armazenado em cada coleção
+COLECAO_POR_TIPO = {
+    "Publicação": "publicacoes",
+    "Imagem": "imagens",
+    "Vídeo": "videos",
+    "Podcast": "podcasts",
+    "Site": "sites",
+    "Mapa": "mapas",
+    "Legislação": "legislacao",
+    "Ponto de interesse": "pontos_interesse",
+    "Relatório": "relatorios",
+    "Organização": "organizacoes",
+    "Projeto": "projetos",
+    "Pesquisa": "pesquisas"
+}
+
+
+# Coleção única do acervo, com os documentos de todas as coleções acima e o
+# campo `_colecao` com a coleção de origem. A consolidação é feita em fases,
+# registradas em `metadados` e trocadas com `python migracoes.py acervo-fase`:
+#   legado        -> leitura e escrita apenas nas 12 coleções
+#   escrita_dupla -> cada escrita nas coleções também é copiada para o acervo
+#   acervo        -> as consultas leem o acervo; a escrita dupla continua,
+#                    para que a volta à fase anterior não perca dados
+COLECAO_ACERVO = "acervo"
+FASE_LEGADO = "legado"
+FASE_ESCRITA_DUPLA = "escrita_dupla"
+FASE_ACERVO = "acervo"
+FASES_ACERVO = [FASE_LEGADO, FASE_ESCRITA_DUPLA, FASE_ACERVO]
+
+
+# Temas do acervo oferecidos nos formulários de cadastro (além de "Outro")
+TEMAS_BABACU = [
+    "Meio Ambiente",
+    "Educação",
+    "Saúde",
+    "Produção e Agricultura",
+    "Economia e Comercialização",
+    "Cultura e Tradição",
+    "Tecnologia e Inovação",
+    "Legislação e Políticas Públicas",
+    "Sustentabilidade",
+    "Comunidades e Povos Tradicionais",
+    "Gastronomia"
+]
+
+
+# Quantidade de cards carregados por vez na Biblioteca
+TAMANHO_PAGINA = 24
+
+# Número máximo de caracteres da descrição exibida em um card
+TAMANHO_DESCRICAO_CARD = 300
+
+
+# ------------------ Projeções dos cards ------------------ #
+
+# Campos lidos por todos os cards da Biblioteca (data_upload é a chave da paginação).
+# A miniatura é lida pelos campos derivados (thumb_url e thumb_file_id), não pelo thumb_link,
+# e thumb_previa é a prévia (LQIP) gravada no envio, exibida até a miniatura carregar.
+CAMPOS_CARD = ["tipo", "titulo", "autor", "tema", "organizacao", "link", "thumb_file_id", "thumb_url", "thumb_previa", "data_upload"]
+
+# Campos extras lidos apenas pelos cards de alguns tipos
+CAMPOS_CARD_POR_TIPO = {
+    "Organização": ["logotipo_file_id", "logotipo_url", "logotipo_previa", "sigla", "websites", "subfolder_id"],
+    "Pesquisa": ["subfolder_id"]
+}
+
+
+def descricao_truncada(tamanho):
+    """
+    Expressão de agregação que corta a descrição em `tamanho` caracteres
+    (contando caracteres Unicode, não bytes) e acrescenta reticências.
+    """
+    return {"$cond": [
+        {"$ne": [{"$type": "$descricao"}, "string"]},
+        "$descricao",
+        {"$cond": [
+            {"$gt": [{"$strLenCP": "$descricao"}, tamanho]},
+            {"$concat": [{"$substrCP": ["$descricao", 0, tamanho]}, "…"]},
+            "$descricao"
+        ]}
+    ]}
+
+
+# Campos de lista exibidos nos cards como texto, com os itens separados por vírgula
+CAMPOS_LISTA_CARD = ["tema", "organizacao"]
+SEPARADOR_LISTA = ", "
+
+
+def lista_unida(campo):
+    """
+    Expressão de agregação que une os itens (textos não vazios) de um campo de
+    lista em um único texto ($reduce/$concat). Valores que não são listas são
+    mantidos como estão.
+    """
+    itens = {"$filter": {
+        "input": f"${campo}",
+        "cond": {"$and": [{"$eq": [{"$type": "$$this"}, "string"]}, {"$ne": ["$$this", ""]}]}
+    }}
+    return {"$cond": [
+        {"$isArray": f"${campo}"},
+        {"$reduce": {
+            "input": itens,
+            "initialValue": "",
+            "in": {"$cond": [
+                {"$eq": ["$$value", ""]},
+                "$$this",
+                {"$concat": ["$$value", SEPARADOR_LISTA, "$$this"]}
+            ]}
+        }},
+        f"${campo}"
+    ]}
+
+
+def unir_lista(valor):
+    """
+    O mesmo texto de lista_unida, para documentos lidos fora do banco.
+    """
+    if isinstance(valor, list):
+        return SEPARADOR_LISTA.join(item for item in valor if isinstance(item, str) and item)
+    return valor
+
+
+def projecao_card(tipo):
+    """
+    Projeção com apenas os campos que o card do tipo informado exibe, já no
+    formato exibido (descrição cortada, tema e organização como texto).
+    """
+    projecao = {campo: 1 for campo in CAMPOS_CARD + CAMPOS_CARD_POR_TIPO.get(tipo, [])}
+    projecao["descricao"] = descricao_truncada(TAMANHO_DESCRICAO_CARD)
+    projecao.update({campo: lista_unida(campo) for campo in CAMPOS_LISTA_CARD})
+    return projecao
+
+
+# Projeção de cada coleção, montada a partir do tipo que ela armazena
+PROJECOES_CARD = {colecao: projecao_card(tipo) for tipo, colecao in COLECAO_POR_TIPO.items()}
+
+# No acervo consolidado, os campos extras de todos os tipos e a coleção de origem
+PROJECOES_CARD[COLECAO_ACERVO] = {
+    **projecao_card(None),
+    **{campo: 1 for campos in CAMPOS_CARD_POR_TIPO.values() for campo in campos},
+    "_colecao": 1
+}
+
+
+# ------------------ Chaves de busca normalizadas ------------------ #
+
+# Campos cujo texto entra na busca por palavra-chave
+CAMPOS_BUSCA = ["titulo", "descricao", "tema", "autor", "organizacao"]
+
+# Campo com os termos normalizados, calculado na escrita de cada documento
+CAMPO_TOKENS_BUSCA = "busca_tokens"
+
+
+def normalizar_texto(texto):
+    """
+    Remove acentos e converte para minúsculas: "BABAÇU" -> "babacu".
+    """
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.casefold()
+
+
+def separar_termos(texto):
+    return re.findall(r"\w+", normalizar_texto(texto))
+
+
+def tokens_busca(doc):
+    """
+    Lista ordenada e sem repetições dos termos normalizados dos campos de busca.
+    """
+    tokens = set()
+    for campo in CAMPOS_BUSCA:
+        valor = doc.get(campo)
+        for item in valor if isinstance(valor, list) else [valor]:
+            if isinstance(item, str):
+                tokens.update(separar_termos(item))
+    return sorted(tokens)
+
+
+def filtro_prefixo(texto):
+    """
+    Filtro que exige que cada termo digitado seja início de algum termo do
+    documento. A regex é ancorada e sem opções, então o índice de busca_tokens
+    é percorrido só no intervalo do prefixo.
+    """
+    termos = separar_termos(texto)
+    if not termos:
+        return {}
+    return {"$and": [{CAMPO_TOKENS_BUSCA: {"$regex": f"^{re.escape(termo)}"}} for termo in termos]}
+
+
+# ------------------ Miniaturas ------------------ #
+
+# Campos de imagem -> (ID do arquivo no Drive, URL exibida no card), calculados
+# na escrita de cada documento para que a Biblioteca não precise interpretar links
+CAMPOS_MINIATURA = {
+    "thumb_link": ("thumb_file_id", "thumb_url"),
+    "logotipo": ("logotipo_file_id", "logotipo_url")
+}
+
+# Largura das miniaturas pedidas ao Drive, a mesma dos cards
+LARGURA_MINIATURA = 280
+
+
+def url_drive_miniatura(file_id, largura=LARGURA_MINIATURA):
+    return f"https://drive.google.com/thumbnail?sz=w{largura}&id={file_id}"
+
+
+def id_arquivo_drive(link):
+    """
+    ID do arquivo em links do Drive (/d/<id>/ ou ?id=<id>), ou None.
+    """
+    if not isinstance(link, str) or "drive.google.com" not in link:
+        return None
+    if "/d/" in link:
+        return link.split("/d/")[1].split("/")[0] or None
+    encontrado = re.search(r"id=([a-zA-Z0-9_-]+)", link)
+    return encontrado.group(1) if encontrado else None
+
+
+def campos_miniatura(doc):
+    """
+    Campos derivados dos links de imagem presentes em `doc`: o ID do arquivo no
+    Drive (None para links de fora do Drive) e a URL exibida no card (a
+    miniatura do Drive ou o próprio link, como as miniaturas do YouTube).
+    """
+    campos = {}
+    for campo, (campo_id, campo_url) in CAMPOS_MINIATURA.items():
+        if campo not in doc:
+            continue
+        link = doc[campo] if isinstance(doc[campo], str) and doc[campo] else None
+        file_id = id_arquivo_drive(link)
+        campos[campo_id] = file_id
+        campos[campo_url] = url_drive_miniatura(file_id) if file_id else link
+    return campos
+
+
+def campos_derivados(doc):
+    """
+    Campos calculados na escrita: os termos de busca e os campos das miniaturas.
+    """
+    return {CAMPO_TOKENS_BUSCA: tokens_busca(doc), **campos_miniatura(doc)}
+
+
+# ------------------ Facetas materializadas ------------------ #
+
+# Coleção com os temas disponíveis e a quantidade de documentos de cada um.
+# É mantida pelas funções de escrita abaixo e pode ser reconstruída com
+# `python migracoes.py reconstruir-facetas`.
+COLECAO_FACETAS = "facetas"
+
+
+# Expressão de agregação com os temas do documento sempre como lista sem repetições
+LISTA_TEMAS = {"$cond": [{"$isArray": "$tema"}, {"$setUnion": ["$tema", []]}, ["$tema"]]}
+
+
+def temas_do_documento(doc):
+    """
+    Conjunto de temas (não vazios) de um documento; `tema` pode ser lista ou texto.
+    """
+    tema = (doc or {}).get("tema")
+    temas = tema if isinstance(tema, list) else [tema]
+    return {t for t in temas if isinstance(t, str) and t.strip()}
+
+
+def atualizar_facetas(db, temas_removidos=(), temas_adicionados=()):
+    """
+    Ajusta a contagem de documentos por tema na coleção de facetas.
+    """
+    incrementos = {}
+    for tema in temas_removidos:
+        incrementos[tema] = incrementos.get(tema, 0) - 1
+    for tema in temas_adicionados:
+        incrementos[tema] = incrementos.get(tema, 0) + 1
+
+    operacoes = [
+        UpdateOne(
+            {"_id": f"tema:{tema}"},
+            {"$inc": {"quantidade": valor}, "$setOnInsert": {"campo": "tema", "valor": tema}},
+            upsert=True
+        )
+        for tema, valor in incrementos.items() if valor
+    ]
+    if operacoes:
+        db[COLECAO_FACETAS].bulk_write(operacoes, ordered=False)
+
+
+def reconstruir_facetas(db):
+    """
+    Recalcula a contagem de documentos por tema a partir de todo o acervo.
+    Temas que deixaram de existir ficam com quantidade zero.
+    Retorna {tema: quantidade}.
+    """
+    pipeline = [
+        {"$project": {"tema": LISTA_TEMAS}},
+        {"$unwind": "$tema"},
+        {"$match": {"tema": {"$type": "string", "$nin": [""]}}},
+    ]
+
+    colecoes = colecoes_leitura(db)
+    pipeline_completo = unir_colecoes(colecoes, lambda nome_colecao: pipeline)
+    pipeline_completo.append({"$group": {"_id": "$tema", "quantidade": {"$sum": 1}}})
+
+    contagens = {doc["_id"]: doc["quantidade"] for doc in db[colecoes[0]].aggregate(pipeline_completo)}
+
+    operacoes = [
+        UpdateOne(
+            {"_id": f"tema:{tema}"},
+            {"$set": {"campo": "tema", "valor": tema, "quantidade": quantidade}},
+            upsert=True
+        )
+        for tema, quantidade in contagens.items()
+    ]
+    if operacoes:
+        db[COLECAO_FACETAS].bulk_write(operacoes, ordered=False)
+
+    db[COLECAO_FACETAS].update_many(
+        {"campo": "tema", "valor": {"$nin": list(contagens)}},
+        {"$set": {"quantidade": 0}}
+    )
+
+    return contagens
+
+
+def listar_temas(db):
+    """
+    Temas com pelo menos um documento, em ordem alfabética, lidos da coleção
+    de facetas com uma única consulta. Se as facetas ainda não existem, elas
+    são construídas na primeira chamada.
+    """
+    facetas = db[COLECAO_FACETAS]
+    cursor = facetas.find({"campo": "tema", "quantidade": {"$gt": 0}}, {"valor": 1}).sort("valor", 1)
+    temas = [doc["valor"] for doc in cursor]
+
+    if not temas and facetas.count_documents({"campo": "tema"}, limit=1) == 0:
+        temas = sorted(reconstruir_facetas(db))
+
+    return temas
+
+
+# ------------------ Versão do catálogo e snapshot compartilhado ------------------ #
+
+# Coleção com o contador de versão do catálogo, incrementado a cada escrita no acervo
+COLECAO_METADADOS = "metadados"
+
+
+def versao_catalogo(db):
+    return _ler_metadados_catalogo(db).get("versao", 0)
+
+
+def incrementar_versao_catalogo(db):
+    db[COLECAO_METADADOS].update_one(
+        {"_id": "catalogo"},
+        {"$inc": {"versao": 1}, "$set": {"alterado_em": datetime.now()}},
+        upsert=True
+    )
+
+
+class SnapshotCatalogo:
+    """
+    Resultados de consultas ao catálogo compartilhados por todas as sessões do
+    processo. Os resultados valem para uma versão do catálogo: quando a versão
+    lida no banco muda, tudo é descartado e as consultas são refeitas.
+    """
+
+    def __init__(self, max_consultas=256):
+        self.max_consultas = max_consultas
+        self.versao = None
+        self._resultados = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, versao, chave, carregar, copiar=True):
+        """
+        Retorna o resultado guardado para `chave` na `versao` informada ou chama
+        `carregar()` para buscá-lo. Por padrão, retorna uma cópia, para que a
+        sessão possa alterar os documentos sem afetar as demais. Com
+        `copiar=False`, retorna o próprio resultado compartilhado, sem o custo
+        da cópia: quem chama deve tratá-lo como somente leitura.
+        """
+        entregar = copy.deepcopy if copiar else lambda resultado: resultado
+
+        with self._trava:
+            if versao != self.versao:
+                self._resultados.clear()
+                self.versao = versao
+            if chave in self._resultados:
+                self._resultados.move_to_end(chave)
+                return entregar(self._resultados[chave])
+
+        resultado = carregar()
+
+        with self._trava:
+            # Só guarda se nenhuma escrita mudou a versão durante a consulta
+            if versao == self.versao:
+                self._resultados[chave] = resultado
+                while len(self._resultados) > self.max_consultas:
+                    self._resultados.popitem(last=False)
+
+        return entregar(resultado)
+
+
+# ------------------ Consolidação na coleção acervo ------------------ #
+
+# A fase fica no mesmo documento que a versão do catálogo. Como leituras e
+# escritas consultam a fase o tempo todo, cada processo reaproveita o valor
+# lido por INTERVALO_FASE_ACERVO segundos; cada leitura da versão o renova.
+INTERVALO_FASE_ACERVO = 5
+
+# Nome do banco -> (fase, momento da leitura)
+_fases_lidas = {}
+
+
+def fase_dos_metadados(doc):
+    return (doc or {}).get("fase_acervo", FASE_LEGADO)
+
+
+def _ler_metadados_catalogo(db):
+    doc = db[COLECAO_METADADOS].find_one({"_id": "catalogo"}, {"versao": 1, "fase_acervo": 1}) or {}
+    _fases_lidas[db.name] = (fase_dos_metadados(doc), time.monotonic())
+    return doc
+
+
+def fase_acervo(db):
+    fase, lida_em = _fases_lidas.get(db.name, (None, None))
+    if lida_em is None or time.monotonic() - lida_em > INTERVALO_FASE_ACERVO:
+        fase = fase_dos_metadados(_ler_metadados_catalogo(db))
+    return fase
+
+
+def definir_fase_acervo(db, fase):
+    """
+    Troca a fase da consolidação. A versão do catálogo é incrementada na
+    mesma escrita, para que os snapshots lidos da fonte anterior sejam
+    descartados. Os outros processos percebem a troca em até
+    INTERVALO_FASE_ACERVO segundos.
+    """
+    if fase not in FASES_ACERVO:
+        raise ValueError(f"Fase desconhecida: {fase}")
+    db[COLECAO_METADADOS].update_one(
+        {"_id": "catalogo"},
+        {"$inc": {"versao": 1}, "$set": {"fase_acervo": fase, "alterado_em": datetime.now()}},
+        upsert=True
+    )
+    _fases_lidas.pop(db.name, None)
+
+
+def colecoes_da_fase(fase):
+    """
+    Coleções lidas pelas consultas do catálogo: o acervo, depois da troca,
+    ou as 12 coleções de origem.
+    """
+    return [COLECAO_ACERVO] if fase == FASE_ACERVO else COLECOES_CATALOGO
+
+
+def colecoes_leitura(db):
+    return colecoes_da_fase(fase_acervo(db))
+
+
+def documento_acervo(doc, nome_colecao):
+    """
+    Cópia de um documento de `nome_colecao` no formato do acervo (mesmo _id).
+    """
+    return {**doc, "_colecao": nome_colecao}
+
+
+def espelhar_no_acervo(colecao, id_doc):
+    """
+    Copia para o acervo o estado atual de um documento da coleção de origem,
+    ou o remove do acervo se ele não existe mais. Como copia o documento
+    inteiro, o resultado não depende da ordem das escritas.
+    """
+    acervo = colecao.database[COLECAO_ACERVO]
+    doc = colecao.find_one({"_id": id_doc})
+    if doc is None:
+        acervo.delete_one({"_id": id_doc})
+    else:
+        acervo.replace_one({"_id": id_doc}, documento_acervo(doc, colecao.name), upsert=True)
+
+
+def escrita_dupla_ativa(db):
+    return fase_acervo(db) != FASE_LEGADO
+
+
+# ------------------ Escrita no acervo ------------------ #
+
+@medir("gravação no Mongo")
+def inserir_documento(colecao, data):
+    """
+    Insere um documento no acervo com os campos derivados (termos de busca e
+    miniaturas), atualiza as facetas e a versão do catálogo.
+    """
+    data = {**data, **campos_derivados(data)}
+    resultado = colecao.insert_one(data)
+    if escrita_dupla_ativa(colecao.database):
+        espelhar_no_acervo(colecao, resultado.inserted_id)
+    atualizar_facetas(colecao.database, temas_adicionados=temas_do_documento(data))
+    incrementar_versao_catalogo(colecao.database)
+    return resultado
+
+
+@medir("gravação no Mongo")
+def inserir_documentos(colecao, documentos):
+    """
+    Insere vários documentos de uma vez (insert_many ordenado), com os mesmos
+    campos derivados de inserir_documento. As facetas e a versão do catálogo
+    são atualizadas uma única vez para o lote.
+    """
+    documentos = [{**data, **campos_derivados(data)} for data in documentos]
+    if not documentos:
+        return None
+
+    resultado = colecao.insert_many(documentos, ordered=True)
+
+    if escrita_dupla_ativa(colecao.database):
+        colecao.database[COLECAO_ACERVO].bulk_write([
+            ReplaceOne({"_id": data["_id"]}, documento_acervo(data, colecao.name), upsert=True)
+            for data in documentos
+        ], ordered=False)
+
+    temas = [tema for data in documentos for tema in temas_do_documento(data)]
+    atualizar_facetas(colecao.database, temas_adicionados=temas)
+    incrementar_versao_catalogo(colecao.database)
+    return resultado
+
+
+@medir("gravação no Mongo")
+def atualizar_documento(colecao, filtro, data):
+    """
+    Atualiza um documento do acervo ($set com os campos de primeiro nível de
+    `data`), recalcula os termos de busca e os campos das miniaturas alteradas
+    e ajusta as facetas de tema.
+    """
+    anterior = colecao.find_one(filtro, {campo: 1 for campo in CAMPOS_BUSCA})
+    if anterior is None:
+        return colecao.update_one(filtro, {"$set": data}, upsert=False)
+
+    atualizado = {**anterior, **data}
+    data = {**data, CAMPO_TOKENS_BUSCA: tokens_busca(atualizado), **campos_miniatura(data)}
+
+    # O filtro pode usar um campo alterado pela própria atualização, então a escrita é feita pelo _id
+    resultado = colecao.update_one({"_id": anterior["_id"]}, {"$set": data}, upsert=False)
+
+    if resultado.modified_count:
+        if escrita_dupla_ativa(colecao.database):
+            espelhar_no_acervo(colecao, anterior["_id"])
+        temas_anteriores, temas_atuais = temas_do_documento(anterior), temas_do_documento(atualizado)
+        atualizar_facetas(
+            colecao.database,
+            temas_removidos=temas_anteriores - temas_atuais,
+            temas_adicionados=temas_atuais - temas_anteriores
+        )
+        incrementar_versao_catalogo(colecao.database)
+
+    return resultado
+
+
+@medir("gravação no Mongo")
+def excluir_documento(colecao, filtro):
+    """
+    Exclui um documento do acervo e retira seus temas das facetas.
+    """
+    anterior = colecao.find_one(filtro, {"tema": 1})
+    if anterior is None:
+        return colecao.delete_one(filtro)
+
+    resultado = colecao.delete_one({"_id": anterior["_id"]})
+    if resultado.deleted_count:
+        if escrita_dupla_ativa(colecao.database):
+            espelhar_no_acervo(colecao, anterior["_id"])
+        atualizar_facetas(colecao.database, temas_removidos=temas_do_documento(anterior))
+        incrementar_versao_catalogo(colecao.database)
+    return resultado
+
+
+# Ordenações do catálogo: por data de envio ou, na busca textual, por relevância.
+# Em ambas, _id desempata documentos com o mesmo valor.
+ORDEM_DATA = {"data_upload": -1, "_id": -1}
+ORDEM_RELEVANCIA = {"_relevancia": -1, "_id": -1}
+
+
+def filtro_texto(texto):
+    """
+    Filtro da busca textual, servido pelo índice de texto em português
+    (ver migracoes.py). O stemming faz "babaçu" encontrar "babaçus".
+    """
+    return {"$text": {"$search": texto, "$language": "portuguese"}}
+
+
+def chave_paginacao(doc, por_relevancia=False):
+    """
+    Retorna a chave do documento usada como cursor da paginação por keyset:
+    (data_upload, _id) ou, na busca textual, (_relevancia, _id).
+    """
+    if por_relevancia:
+        return doc["_relevancia"], doc["_id"]
+    return doc.get("data_upload"), doc["_id"]
+
+
+def filtro_apos(apos, por_relevancia=False):
+    """
+    Monta o filtro que seleciona os documentos que vêm depois da chave `apos`
+    na ordenação (data_upload desc, _id desc). Documentos sem data_upload
+    ficam no fim da lista. Na busca textual, a ordenação é (_relevancia desc, _id desc).
+    """
+    valor, id_doc = apos
+    campo = "_relevancia" if por_relevancia else "data_upload"
+
+    if valor is None:
+        return {campo: None, "_id": {"$lt": id_doc}}
+
+    return {"$or": [
+        {campo: {"$lt": valor}},
+        {campo: valor, "_id": {"$lt": id_doc}},
+        {campo: None}
+    ]}
+
+
+def etapas_colecao(nome_colecao, query=None, limite=None, apos=None, para_card=False, texto=None):
+    """
+    Etapas de agregação aplicadas a uma coleção do acervo: filtro, relevância
+    (na busca textual), paginação, ordenação e limite, projeção do card e o
+    campo `_colecao`. Com limite, a coleção contribui no máximo com `limite`
+    documentos já ordenados.
+    """
+    query = query or {}
+    ordem = ORDEM_RELEVANCIA if texto else ORDEM_DATA
+
+    if texto:
+        query = {**query, **filtro_texto(texto)}
+
+    # Na ordenação por data, o filtro de paginação entra no $match de cada coleção.
+    # Na busca textual, ele só pode ser aplicado depois que a relevância é calculada.
+    if apos and not texto:
+        query = {"$and": [query, filtro_apos(apos)]}
+
+    etapas = [{"$match": query}]
+    if texto:
+        etapas.append({"$addFields": {"_relevancia": {"$meta": "textScore"}}})
+        if apos:
+            etapas.append({"$match": filtro_apos(apos, por_relevancia=True)})
+    if limite:
+        etapas += [{"$sort": ordem}, {"$limit": limite}]
+    if para_card:
+        projecao = PROJECOES_CARD[nome_colecao]
+        etapas.append({"$project": {**projecao, "_relevancia": 1} if texto else projecao})
+    # No acervo consolidado, `_colecao` já vem gravado em cada documento
+    if nome_colecao != COLECAO_ACERVO:
+        etapas.append({"$addFields": {"_colecao": nome_colecao}})
+    return etapas
+
+
+def unir_colecoes(colecoes, etapas):
+    """
+    Pipeline sobre a primeira coleção com as demais juntadas por $unionWith,
+    aplicando `etapas(nome_colecao)` a cada uma. Com uma só coleção (o acervo
+    consolidado), é apenas o pipeline dela.
+    """
+    colecao_base, *outras_colecoes = colecoes
+
+    pipeline = etapas(colecao_base)
+    for nome_colecao in outras_colecoes:
+        pipeline.append({"$unionWith": {"coll": nome_colecao, "pipeline": etapas(nome_colecao)}})
+    return pipeline
+
+
+def montar_pipeline_catalogo(query=None, limite=None, apos=None, para_card=False, texto=None,
+                             colecoes=COLECOES_CATALOGO):
+    """
+    Monta um único pipeline de agregação sobre `publicacoes` que junta as
+    outras 11 coleções com $unionWith (ou, com `colecoes=[COLECAO_ACERVO]`,
+    sobre o acervo consolidado). Cada documento recebe o campo
+    `_colecao` no servidor, e a ordenação e o limite também são feitos no banco.
+    Com `apos`, retorna apenas os documentos seguintes a essa chave de paginação.
+    Com `para_card`, cada coleção retorna só os campos exibidos nos cards.
+    Com `texto`, faz a busca textual e ordena os resultados por relevância
+    (campo `_relevancia`).
+    """
+    def etapas(nome_colecao):
+        return etapas_colecao(nome_colecao, query, limite, apos, para_card, texto)
+
+    pipeline = unir_colecoes(colecoes, etapas)
+
+    # Mais recentes (ou mais relevantes) primeiro
+    pipeline.append({"$sort": ORDEM_RELEVANCIA if texto else ORDEM_DATA})
+
+    if limite:
+        pipeline.append({"$limit": limite})
+
+    return pipeline
+
+
+def buscar_arquivos(db, query=None, limite=None, apos=None, para_card=False, texto=None):
+    """
+    Retorna os documentos de todas as coleções do acervo que atendem à query,
+    em uma única ida ao banco.
+    """
+    colecoes = colecoes_leitura(db)
+    pipeline = montar_pipeline_catalogo(query, limite, apos, para_card, texto, colecoes)
+    cursor = db[colecoes[0]].aggregate(pipeline, allowDiskUse=True)
+    return list(cursor)
+
+
+def contar_arquivos(db, query=None, texto=None):
+    """
+    Conta os documentos do acervo que atendem à query, sem trazê-los do banco.
+    """
+    query = query or {}
+    if texto:
+        query = {**query, **filtro_texto(texto)}
+
+    colecoes = colecoes_leitura(db)
+
+    pipeline = unir_colecoes(colecoes, lambda nome_colecao: [{"$match": query}])
+    pipeline.append({"$count": "total"})
+
+    resultado = list(db[colecoes[0]].aggregate(pipeline))
+    return resultado[0]["total"] if resultado else 0
+
+
+# Quantidade de documentos por tipo e por tema (os temas já como lista, ver LISTA_TEMAS)
+ETAPA_FACETAS = {"$facet": {
+    "tipo": [
+        {"$group": {"_id": "$tipo", "quantidade": {"$sum": 1}}}
+    ],
+    "tema": [
+        {"$unwind": "$tema"},
+        {"$group": {"_id": "$tema", "quantidade": {"$sum": 1}}}
+    ]
+}}
+
+
+def contar_facetas(db, query=None, texto=None):
+    """
+    Conta, em uma única agregação com $facet sobre todo o acervo, quantos
+    documentos que atendem à query (e à busca textual, se houver) existem
+    para cada tipo e para cada tema.
+    Retorna {"tipo": {tipo: quantidade}, "tema": {tema: quantidade}}.
+    """
+    query = query or {}
+    if texto:
+        query = {**query, **filtro_texto(texto)}
+
+    etapas = [
+        {"$match": query},
+        {"$project": {"_id": 0, "tipo": 1, "tema": LISTA_TEMAS}}
+    ]
+
+    colecoes = colecoes_leitura(db)
+
+    pipeline = unir_colecoes(colecoes, lambda nome_colecao: list(etapas))
+    pipeline.append(ETAPA_FACETAS)
+
+    resultado = next(db[colecoes[0]].aggregate(pipeline), {"tipo": [], "tema": []})
+    return {
+        campo: {item["_id"]: item["quantidade"] for item in resultado[campo] if item["_id"]}
+        for campo in ("tipo", "tema")
+    }
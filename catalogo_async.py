@@ -0,0 +1,168 @@
+# --------------------------------------------------------------
+# Consultas ao catálogo em paralelo, com o cliente assíncrono do PyMongo
+#
+# Em vez de um único pipeline com $unionWith (em que o servidor percorre as
+# coleções uma depois da outra), cada coleção do acervo recebe a sua própria
+# consulta e as 12 rodam ao mesmo tempo com asyncio.gather. Depois da troca
+# para a coleção acervo, há uma só consulta. O tempo de uma
+# página passa a ser o da consulta mais lenta, e não a soma de todas.
+# Os resultados são juntados aqui, com a mesma ordem e o mesmo limite da
+# consulta com $unionWith.
+# --------------------------------------------------------------
+
+import asyncio
+import threading
+import time
+
+from pymongo import AsyncMongoClient
+
+from catalogo import (
+    COLECAO_METADADOS,
+    ETAPA_FACETAS,
+    INTERVALO_FASE_ACERVO,
+    LISTA_TEMAS,
+    colecoes_da_fase,
+    etapas_colecao,
+    fase_dos_metadados,
+    filtro_texto
+)
+
+
+# Tempo máximo de cada consulta a uma coleção (segundos)
+TIMEOUT_CONSULTA_PADRAO = 5
+
+
+def ordem_documento(doc, por_relevancia=False):
+    """
+    Chave de ordenação equivalente a ORDEM_DATA / ORDEM_RELEVANCIA, para uso
+    com reverse=True: documentos sem data_upload ficam no fim, como no banco.
+    """
+    if por_relevancia:
+        return doc["_relevancia"], doc["_id"]
+    data_upload = doc.get("data_upload")
+    return data_upload is not None, data_upload or 0, doc["_id"]
+
+
+class ConsultasCatalogoAsync:
+    """
+    Executa as consultas do catálogo com um AsyncMongoClient, em um event loop
+    próprio que roda em uma thread em segundo plano. Os métodos públicos são
+    síncronos, têm a mesma assinatura das funções de catalogo.py (sem o `db`)
+    e podem ser chamados por qualquer sessão do Streamlit.
+    """
+
+    def __init__(self, uri, banco, timeout_consulta=TIMEOUT_CONSULTA_PADRAO, **opcoes_cliente):
+        self.timeout_consulta = timeout_consulta
+        # Fase do acervo e momento da leitura, como em catalogo.fase_acervo
+        self._fase = None
+        self._fase_lida_em = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="catalogo-async", daemon=True).start()
+
+        # O cliente é criado dentro do event loop em que será usado
+        self.db = self._executar(self._conectar(uri, banco, opcoes_cliente))
+
+    async def _conectar(self, uri, banco, opcoes_cliente):
+        cliente = AsyncMongoClient(uri, **opcoes_cliente)
+        await cliente.admin.command("ping")
+        return cliente[banco]
+
+    def _executar(self, corrotina):
+        return asyncio.run_coroutine_threadsafe(corrotina, self._loop).result()
+
+    @property
+    def _max_time_ms(self):
+        # O servidor também interrompe a consulta, para não continuar trabalhando
+        # depois que o cliente desistiu dela
+        return int(self.timeout_consulta * 1000)
+
+    async def _colecoes_leitura(self):
+        if self._fase_lida_em is None or time.monotonic() - self._fase_lida_em > INTERVALO_FASE_ACERVO:
+            doc = await self.db[COLECAO_METADADOS].find_one({"_id": "catalogo"}, {"fase_acervo": 1})
+            self._fase, self._fase_lida_em = fase_dos_metadados(doc), time.monotonic()
+        return colecoes_da_fase(self._fase)
+
+    async def _em_paralelo(self, consulta):
+        """
+        Executa `consulta(colecao)` em todas as coleções lidas pelo catálogo ao
+        mesmo tempo, cada uma com o timeout configurado, e retorna os resultados
+        na ordem dessas coleções. Se uma coleção não responde a tempo, as
+        demais são canceladas e o erro é repassado: um resultado parcial
+        mudaria a paginação e as contagens sem nenhum aviso.
+        """
+        async def com_timeout(nome_colecao):
+            try:
+                return await asyncio.wait_for(consulta(self.db[nome_colecao]), self.timeout_consulta)
+            except TimeoutError:
+                raise TimeoutError(
+                    f"A consulta à coleção {nome_colecao} excedeu {self.timeout_consulta} s"
+                ) from None
+
+        tarefas = [asyncio.ensure_future(com_timeout(nome_colecao)) for nome_colecao in await self._colecoes_leitura()]
+        try:
+            return await asyncio.gather(*tarefas)
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+
+    # ------------------ Consultas ------------------ #
+
+    async def _buscar_arquivos(self, query=None, limite=None, apos=None, para_card=False, texto=None):
+        async def consulta(colecao):
+            etapas = etapas_colecao(colecao.name, query, limite, apos, para_card, texto)
+            cursor = await colecao.aggregate(etapas, allowDiskUse=True, maxTimeMS=self._max_time_ms)
+            return await cursor.to_list()
+
+        por_colecao = await self._em_paralelo(consulta)
+
+        # Cada coleção já vem ordenada e limitada; falta o corte sobre o conjunto
+        arquivos = [doc for docs in por_colecao for doc in docs]
+        arquivos.sort(key=lambda doc: ordem_documento(doc, por_relevancia=bool(texto)), reverse=True)
+        return arquivos[:limite] if limite else arquivos
+
+    async def _contar_arquivos(self, query=None, texto=None):
+        query = query or {}
+        if texto:
+            query = {**query, **filtro_texto(texto)}
+
+        async def consulta(colecao):
+            return await colecao.count_documents(query, maxTimeMS=self._max_time_ms)
+
+        return sum(await self._em_paralelo(consulta))
+
+    async def _contar_facetas(self, query=None, texto=None):
+        query = query or {}
+        if texto:
+            query = {**query, **filtro_texto(texto)}
+
+        pipeline = [
+            {"$match": query},
+            {"$project": {"_id": 0, "tipo": 1, "tema": LISTA_TEMAS}},
+            ETAPA_FACETAS
+        ]
+
+        async def consulta(colecao):
+            cursor = await colecao.aggregate(pipeline, maxTimeMS=self._max_time_ms)
+            return await cursor.to_list()
+
+        facetas = {"tipo": {}, "tema": {}}
+        for resultado in await self._em_paralelo(consulta):
+            for campo in facetas:
+                for item in resultado[0][campo] if resultado else []:
+                    if item["_id"]:
+                        facetas[campo][item["_id"]] = facetas[campo].get(item["_id"], 0) + item["quantidade"]
+        return facetas
+
+    # ------------------ Interface síncrona ------------------ #
+
+    def buscar_arquivos(self, query=None, limite=None, apos=None, para_card=False, texto=None):
+        """
+        Mesmo resultado de catalogo.buscar_arquivos, com uma consulta por coleção em paralelo.
+        """
+        return self._executar(self._buscar_arquivos(query, limite, apos, para_card, texto))
+
+    def contar_arquivos(self, query=None, texto=None):
+        return self._executar(self._contar_arquivos(query, texto))
+
+    def contar_facetas(self, query=None, texto=None):
+        return self._executar(self._contar_facetas(query, texto))
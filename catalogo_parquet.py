@@ -0,0 +1,232 @@
+# --------------------------------------------------------------
+# Leitura do catálogo a partir de um snapshot Parquet
+#
+# Uma thread em segundo plano verifica a versão do catálogo a cada intervalo
+# e, quando ela muda, exporta o acervo para um arquivo Parquet (ver
+# exportar_acervo.py) e o carrega como uma pyarrow.Table. A Biblioteca e o
+# Mapa filtram, ordenam e contam com os kernels de pyarrow.compute, sem
+# consultar o MongoDB a cada execução da página.
+#
+# O MongoDB continua sendo a fonte dos dados: as escritas do Gerenciamento
+# vão para o banco e aparecem aqui na próxima atualização do snapshot.
+# --------------------------------------------------------------
+
+import logging
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+from catalogo import (
+    CAMPO_TOKENS_BUSCA,
+    CAMPOS_LISTA_CARD,
+    SEPARADOR_LISTA,
+    TAMANHO_DESCRICAO_CARD,
+    separar_termos,
+    versao_catalogo
+)
+from exportar_acervo import ESQUEMA_PARQUET, exportar
+
+
+logger = logging.getLogger(__name__)
+
+# Intervalo padrão entre as verificações da versão do catálogo (segundos)
+INTERVALO_ATUALIZACAO_PADRAO = 60
+
+# Colunas carregadas em memória (o documento completo fica só no arquivo)
+COLUNAS_LEITURA = [campo.name for campo in ESQUEMA_PARQUET if campo.name != "documento"]
+
+# Colunas auxiliares, que não são devolvidas nos documentos
+COLUNAS_INTERNAS = ["_busca", CAMPO_TOKENS_BUSCA]
+
+
+def preparar_tabela(tabela):
+    """
+    Ordena a tabela como a consulta ao banco (data_upload desc, _id desc, sem
+    data_upload no fim), corta a descrição no tamanho do card e cria a coluna
+    `_busca`, com os termos normalizados separados por espaço.
+    """
+    tabela = tabela.sort_by(
+        [("data_upload", "descending"), ("_id", "descending")],
+        null_placement="at_end"
+    )
+
+    descricao = tabela["descricao"]
+    truncada = pc.if_else(
+        pc.greater(pc.utf8_length(descricao), TAMANHO_DESCRICAO_CARD),
+        pc.binary_join_element_wise(pc.utf8_slice_codeunits(descricao, 0, TAMANHO_DESCRICAO_CARD), "…", ""),
+        descricao
+    )
+    tabela = tabela.set_column(tabela.schema.get_field_index("descricao"), "descricao", truncada)
+
+    return tabela.append_column("_busca", pc.binary_join(tabela[CAMPO_TOKENS_BUSCA], " "))
+
+
+def para_documentos(tabela):
+    """
+    Converte as linhas em dicionários no formato lido do MongoDB: _id como
+    ObjectId (ou texto, nos documentos com outro tipo de _id) e sem os
+    campos vazios.
+    """
+    documentos = []
+    for linha in tabela.drop_columns(COLUNAS_INTERNAS).to_pylist():
+        doc = {campo: valor for campo, valor in linha.items() if valor is not None and valor != []}
+        if ObjectId.is_valid(doc["_id"]):
+            doc["_id"] = ObjectId(doc["_id"])
+        documentos.append(doc)
+    return documentos
+
+
+class CatalogoParquet:
+    """
+    Snapshot do catálogo em uma pyarrow.Table, com a mesma interface de
+    leitura do IndiceCatalogo (observador_catalogo.py): contar, buscar,
+    contar_facetas, temas, versao e ativo.
+    """
+
+    def __init__(self, db, caminho, intervalo=INTERVALO_ATUALIZACAO_PADRAO):
+        self.db = db
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.versao = None
+        self.ativo = False
+        self._tabela = None
+        self._trava = threading.Lock()
+        self.parar = threading.Event()
+
+    # ------------------ Atualização ------------------ #
+
+    def atualizar(self):
+        """
+        Exporta e recarrega o snapshot se a versão do catálogo mudou.
+        Retorna True se o snapshot foi recarregado.
+        """
+        versao = versao_catalogo(self.db)
+        if versao == self.versao:
+            return False
+
+        exportar(self.db, self.caminho, "parquet")
+        tabela = preparar_tabela(pq.read_table(self.caminho, columns=COLUNAS_LEITURA))
+
+        with self._trava:
+            self._tabela = tabela
+            self.versao = versao
+            self.ativo = True
+        return True
+
+    def iniciar(self):
+        """
+        Carrega o primeiro snapshot e inicia a thread de atualização.
+        """
+        self.atualizar()
+        threading.Thread(target=self._atualizar_periodicamente, name="catalogo-parquet", daemon=True).start()
+
+    def _atualizar_periodicamente(self):
+        while not self.parar.wait(self.intervalo):
+            try:
+                self.atualizar()
+            except Exception:
+                # Mantém o snapshot anterior até a próxima tentativa
+                logger.exception("Erro ao atualizar o snapshot Parquet do catálogo")
+
+    # ------------------ Leitura ------------------ #
+
+    def _filtrar(self, tipos=None, temas=None, texto=None, apos=None):
+        with self._trava:
+            tabela = self._tabela
+
+        mascara = pa.array(np.ones(tabela.num_rows, dtype=bool))
+
+        if tipos:
+            mascara = pc.and_(mascara, pc.is_in(tabela["tipo"], value_set=pa.array(tipos)))
+
+        if temas:
+            # Linhas com pelo menos um dos temas: posições dos temas encontrados na lista achatada
+            coluna_tema = tabela["tema"]
+            encontrados = pc.is_in(pc.list_flatten(coluna_tema), value_set=pa.array(temas))
+            linhas = pc.filter(pc.list_parent_indices(coluna_tema), encontrados).to_numpy()
+            com_tema = np.zeros(tabela.num_rows, dtype=bool)
+            com_tema[linhas] = True
+            mascara = pc.and_(mascara, pa.array(com_tema))
+
+        # Cada termo digitado deve aparecer em algum ponto dos termos normalizados
+        for termo in separar_termos(texto) if texto else []:
+            mascara = pc.and_(mascara, pc.match_substring(tabela["_busca"], termo))
+
+        if apos:
+            mascara = pc.and_(mascara, self._depois_de(tabela, apos))
+
+        return tabela.filter(mascara)
+
+    @staticmethod
+    def _depois_de(tabela, apos):
+        """
+        Linhas que vêm depois da chave (data_upload, _id) na ordenação, com a
+        mesma regra de catalogo.filtro_apos.
+        """
+        data_upload, id_doc = apos
+        coluna_data, coluna_id = tabela["data_upload"], tabela["_id"]
+        id_anterior = pc.less(coluna_id, str(id_doc))
+
+        if data_upload is None:
+            return pc.and_(pc.is_null(coluna_data), id_anterior)
+
+        data_upload = pa.scalar(data_upload, type=coluna_data.type)
+        return pc.or_kleene(
+            pc.or_kleene(pc.less(coluna_data, data_upload), pc.and_kleene(pc.equal(coluna_data, data_upload), id_anterior)),
+            pc.is_null(coluna_data)
+        ).fill_null(False)
+
+    def contar(self, tipos=None, temas=None, texto=None):
+        return self._filtrar(tipos, temas, texto).num_rows
+
+    def buscar(self, tipos=None, temas=None, texto=None, limite=None, apos=None):
+        # A tabela já está na ordem da listagem, e o filtro a preserva
+        tabela = self._filtrar(tipos, temas, texto, apos)
+        if limite:
+            tabela = tabela.slice(0, limite)
+
+        # Tema e organização como texto, no formato da projeção do card
+        for campo in CAMPOS_LISTA_CARD:
+            tabela = tabela.set_column(
+                tabela.schema.get_field_index(campo), campo, pc.binary_join(tabela[campo], SEPARADOR_LISTA)
+            )
+        return para_documentos(tabela)
+
+    def contar_facetas(self, texto=None):
+        tabela = self._filtrar(texto=texto)
+        facetas = {}
+        for campo, valores in (("tipo", tabela["tipo"]), ("tema", pc.list_flatten(tabela["tema"]))):
+            contagem = pc.value_counts(valores)
+            facetas[campo] = {
+                valor: quantidade
+                for valor, quantidade in zip(contagem.field("values").to_pylist(), contagem.field("counts").to_pylist())
+                if valor
+            }
+        return facetas
+
+    def temas(self):
+        with self._trava:
+            tabela = self._tabela
+        temas = pc.unique(pc.list_flatten(tabela["tema"])).to_pylist()
+        return sorted(tema for tema in temas if tema and tema.strip())
+
+    def pontos_interesse(self):
+        """
+        Pontos de interesse para o Mapa, como um DataFrame do pandas.
+        """
+        with self._trava:
+            tabela = self._tabela
+        pontos = tabela.filter(pc.equal(tabela["_colecao"], "pontos_interesse"))
+        return pontos.drop_columns(COLUNAS_INTERNAS).to_pandas()
+
+
+def caminho_padrao(diretorio):
+    """
+    Um arquivo por processo, para que dois processos não exportem sobre o mesmo arquivo.
+    """
+    return os.path.join(diretorio, f"catalogo_{os.getpid()}.parquet")
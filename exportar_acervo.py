@@ -0,0 +1,309 @@
+# --------------------------------------------------------------
+# Exportação do acervo para JSONL (gzip) ou Parquet
+#
+# Uso:
+#   python exportar_acervo.py --destino backups/                  -> JSONL compactado com gzip
+#   python exportar_acervo.py --destino backups/ --formato parquet
+#   python exportar_acervo.py --destino backups/ --incremental    -> só os documentos novos
+#
+# Os documentos são lidos das 12 coleções com cursores de batch_size limitado
+# e gravados lote a lote, então o uso de memória não depende do tamanho do
+# acervo. Cada execução gera um arquivo, acervo_<data>.jsonl.gz ou
+# acervo_<data>.parquet, com o campo `_colecao` indicando a coleção de origem.
+#
+# Na exportação incremental, só entram os documentos com data_upload maior que
+# o da última exportação do mesmo formato (registrado em exportacao.json, no
+# destino). Os formulários de edição do Gerenciamento gravam um novo
+# data_upload, então documentos editados também entram na exportação
+# incremental seguinte. Exclusões não aparecem em exportações incrementais:
+# só uma exportação completa reflete os documentos removidos.
+#
+# Opções: --uri e --banco (por padrão, os dados de .streamlit/secrets.toml)
+# --------------------------------------------------------------
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import json_util
+
+from catalogo import CAMPO_TOKENS_BUSCA, COLECOES_CATALOGO, campos_miniatura, tokens_busca
+from funcoes_auxiliares import conectar_mongo_cli
+
+
+# Documentos lidos do banco e gravados por vez
+TAMANHO_LOTE = 1000
+
+# Arquivo, no destino, com a maior data_upload exportada de cada coleção
+ARQUIVO_ESTADO = "exportacao.json"
+
+FORMATOS = ["jsonl", "parquet"]
+
+
+# ------------------ Esquema do Parquet ------------------ #
+
+# Os campos exibidos e filtrados na Biblioteca e no Mapa têm colunas próprias,
+# com tipo fixo (tema e organizacao sempre como lista). O documento completo
+# vai em `documento`, como JSON estendido, para que nenhum campo se perca.
+ESQUEMA_PARQUET = pa.schema([
+    ("_id", pa.string()),
+    ("_colecao", pa.string()),
+    ("tipo", pa.string()),
+    ("titulo", pa.string()),
+    ("descricao", pa.string()),
+    ("autor", pa.string()),
+    ("tema", pa.list_(pa.string())),
+    ("organizacao", pa.list_(pa.string())),
+    ("ano_publicacao", pa.int64()),
+    ("link", pa.string()),
+    ("thumb_link", pa.string()),
+    ("thumb_file_id", pa.string()),
+    ("thumb_url", pa.string()),
+    ("thumb_previa", pa.string()),
+    ("data_upload", pa.timestamp("ms")),
+    ("sigla", pa.string()),
+    ("logotipo", pa.string()),
+    ("logotipo_file_id", pa.string()),
+    ("logotipo_url", pa.string()),
+    ("logotipo_previa", pa.string()),
+    ("websites", pa.string()),
+    ("subfolder_id", pa.string()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    (CAMPO_TOKENS_BUSCA, pa.list_(pa.string())),
+    ("documento", pa.string()),
+])
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, list):
+        return ", ".join(str(item) for item in valor if item is not None)
+    return str(valor)
+
+
+def _lista(valor):
+    if valor is None:
+        return []
+    if isinstance(valor, list):
+        return [str(item) for item in valor if item is not None]
+    return [str(valor)]
+
+
+def _inteiro(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decimal(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def linha_parquet(doc, nome_colecao):
+    """
+    Converte um documento do MongoDB em uma linha do ESQUEMA_PARQUET.
+    """
+    data_upload = doc.get("data_upload")
+    # Calculados dos links, como na escrita, também para documentos ainda sem os campos
+    miniaturas = campos_miniatura(doc)
+    return {
+        "_id": str(doc["_id"]),
+        "_colecao": nome_colecao,
+        "tipo": _texto(doc.get("tipo")),
+        "titulo": _texto(doc.get("titulo")),
+        "descricao": _texto(doc.get("descricao")),
+        "autor": _texto(doc.get("autor")),
+        "tema": _lista(doc.get("tema")),
+        "organizacao": _lista(doc.get("organizacao")),
+        "ano_publicacao": _inteiro(doc.get("ano_publicacao")),
+        "link": _texto(doc.get("link")),
+        "thumb_link": _texto(doc.get("thumb_link")),
+        "thumb_file_id": _texto(miniaturas.get("thumb_file_id")),
+        "thumb_url": _texto(miniaturas.get("thumb_url")),
+        "thumb_previa": _texto(doc.get("thumb_previa")),
+        "data_upload": data_upload if isinstance(data_upload, datetime) else None,
+        "sigla": _texto(doc.get("sigla")),
+        "logotipo": _texto(doc.get("logotipo")),
+        "logotipo_file_id": _texto(miniaturas.get("logotipo_file_id")),
+        "logotipo_url": _texto(miniaturas.get("logotipo_url")),
+        "logotipo_previa": _texto(doc.get("logotipo_previa")),
+        "websites": _texto(doc.get("websites")),
+        "subfolder_id": _texto(doc.get("subfolder_id")),
+        "latitude": _decimal(doc.get("latitude")),
+        "longitude": _decimal(doc.get("longitude")),
+        CAMPO_TOKENS_BUSCA: doc.get(CAMPO_TOKENS_BUSCA) or tokens_busca(doc),
+        "documento": json_util.dumps(doc, ensure_ascii=False),
+    }
+
+
+# ------------------ Escritores ------------------ #
+
+class EscritorJsonl:
+    """
+    Um documento por linha, em JSON estendido (preserva ObjectId e datas).
+    """
+    extensao = ".jsonl.gz"
+
+    def __init__(self, caminho):
+        self._arquivo = gzip.open(caminho, "wt", encoding="utf-8")
+
+    def escrever(self, docs, nome_colecao):
+        for doc in docs:
+            self._arquivo.write(json_util.dumps({**doc, "_colecao": nome_colecao}, ensure_ascii=False))
+            self._arquivo.write("\n")
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class EscritorParquet:
+    """
+    Cada lote é gravado como um row group, sem manter o arquivo em memória.
+    """
+    extensao = ".parquet"
+
+    def __init__(self, caminho):
+        self._escritor = pq.ParquetWriter(caminho, ESQUEMA_PARQUET, compression="zstd")
+
+    def escrever(self, docs, nome_colecao):
+        linhas = [linha_parquet(doc, nome_colecao) for doc in docs]
+        self._escritor.write_table(pa.Table.from_pylist(linhas, schema=ESQUEMA_PARQUET))
+
+    def fechar(self):
+        self._escritor.close()
+
+
+ESCRITORES = {"jsonl": EscritorJsonl, "parquet": EscritorParquet}
+
+
+# ------------------ Exportação ------------------ #
+
+def ler_estado(destino):
+    caminho = os.path.join(destino, ARQUIVO_ESTADO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def salvar_estado(destino, estado):
+    caminho = os.path.join(destino, ARQUIVO_ESTADO)
+    with open(f"{caminho}.tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo, ensure_ascii=False, indent=2)
+    os.replace(f"{caminho}.tmp", caminho)
+
+
+def lotes(cursor, tamanho_lote):
+    lote = []
+    for doc in cursor:
+        lote.append(doc)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def exportar(db, caminho, formato="jsonl", tamanho_lote=TAMANHO_LOTE, desde=None):
+    """
+    Grava em `caminho` os documentos das coleções do acervo, no formato
+    escolhido, lendo e gravando no máximo `tamanho_lote` documentos por vez.
+    `desde` ({colecao: datetime ou None}) limita cada coleção aos documentos
+    com data_upload posterior. O arquivo só aparece em `caminho` quando a
+    exportação termina. Retorna {colecao: {"documentos": n, "ultima_data_upload": datetime}}.
+    """
+    desde = desde or {}
+    resumo = {}
+
+    escritor = ESCRITORES[formato](f"{caminho}.tmp")
+    try:
+        for nome_colecao in COLECOES_CATALOGO:
+            filtro = {}
+            if nome_colecao in desde:
+                # Sem data registrada, nenhum documento com data_upload foi exportado ainda
+                marca = desde[nome_colecao]
+                filtro = {"data_upload": {"$gt": marca} if marca else {"$type": "date"}}
+            cursor = db[nome_colecao].find(filtro, batch_size=tamanho_lote)
+
+            quantidade, ultima = 0, desde.get(nome_colecao)
+            for lote in lotes(cursor, tamanho_lote):
+                escritor.escrever(lote, nome_colecao)
+                quantidade += len(lote)
+                datas = [doc["data_upload"] for doc in lote if isinstance(doc.get("data_upload"), datetime)]
+                if datas and (ultima is None or max(datas) > ultima):
+                    ultima = max(datas)
+
+            resumo[nome_colecao] = {"documentos": quantidade, "ultima_data_upload": ultima}
+    except BaseException:
+        escritor.fechar()
+        os.remove(f"{caminho}.tmp")
+        raise
+
+    escritor.fechar()
+    os.replace(f"{caminho}.tmp", caminho)
+    return resumo
+
+
+def exportar_para_destino(db, destino, formato="jsonl", tamanho_lote=TAMANHO_LOTE, incremental=False):
+    """
+    Exporta para um novo arquivo no diretório `destino` e registra, por
+    formato, a maior data_upload exportada de cada coleção (ponto de partida
+    da próxima exportação incremental). Retorna o caminho e o resumo.
+    """
+    os.makedirs(destino, exist_ok=True)
+    estado = ler_estado(destino)
+
+    desde = {}
+    if incremental:
+        desde = {
+            nome_colecao: datetime.fromisoformat(data) if data else None
+            for nome_colecao, data in estado.get(formato, {}).items()
+        }
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    caminho = os.path.join(destino, f"acervo_{timestamp}{ESCRITORES[formato].extensao}")
+    resumo = exportar(db, caminho, formato, tamanho_lote, desde)
+
+    estado[formato] = {
+        nome_colecao: item["ultima_data_upload"].isoformat() if item["ultima_data_upload"] else None
+        for nome_colecao, item in resumo.items()
+    }
+    salvar_estado(destino, estado)
+
+    return caminho, resumo
+
+
+# ------------------ Linha de comando ------------------ #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação do acervo da Biblioteca Diálogos do Babaçu")
+    parser.add_argument("--destino", required=True, help="Diretório onde o arquivo exportado é criado")
+    parser.add_argument("--formato", choices=FORMATOS, default="jsonl")
+    parser.add_argument("--incremental", action="store_true", help="Só os documentos enviados desde a última exportação")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Documentos lidos e gravados por vez")
+    parser.add_argument("--uri", help="String de conexão do MongoDB")
+    parser.add_argument("--banco", help="Nome do banco de dados")
+    args = parser.parse_args(argv)
+
+    db = conectar_mongo_cli(args.uri, args.banco)
+    caminho, resumo = exportar_para_destino(db, args.destino, args.formato, args.lote, args.incremental)
+
+    for nome_colecao, item in resumo.items():
+        print(f"{nome_colecao}: {item['documentos']} documento(s)")
+    print(f"Arquivo gerado: {caminho} ({sum(item['documentos'] for item in resumo.values())} documento(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
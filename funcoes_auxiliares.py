@@ -1,17 +1,434 @@
+import json
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
 import streamlit as st
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.collation import Collation
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from catalogo import SnapshotCatalogo
+from catalogo_async import TIMEOUT_CONSULTA_PADRAO, ConsultasCatalogoAsync
+from miniaturas import TAMANHO_MAXIMO_PADRAO_MB, CacheMiniaturas
+from observador_catalogo import IndiceCatalogo, ObservadorCatalogo
+
+
+# --------------------------------------------------------------
+# Conexão com o MongoDB (um único pool para todas as páginas)
+# --------------------------------------------------------------
+
+# Valores padrão do pool, usados quando não há configuração em st.secrets["mongo"]
+MAX_POOL_SIZE_PADRAO = 20
+MIN_POOL_SIZE_PADRAO = 2
+
+# Cards da Biblioteca com o HTML guardado em memória
+MAX_CARDS_EM_CACHE = 5000
+
+# Comparação de e-mails sem diferenciar maiúsculas de minúsculas.
+# É a mesma collation do índice único de pessoas.e_mail, o que permite usá-lo no login.
+COLLATION_EMAIL = Collation(locale="pt", strength=2)
+
+
+class MonitorPoolConexoes(monitoring.ConnectionPoolListener):
+    """
+    Conta os eventos do pool de conexões do PyMongo. Os contadores são
+    exibidos para administradores na página de Gerenciamento.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._contadores = {
+            "conexoes_abertas": 0,
+            "conexoes_em_uso": 0,
+            "conexoes_criadas": 0,
+            "conexoes_fechadas": 0,
+            "checkouts": 0,
+            "falhas_checkout": 0,
+            "pools_limpos": 0,
+        }
+
+    def _somar(self, **incrementos):
+        with self._trava:
+            for chave, valor in incrementos.items():
+                self._contadores[chave] += valor
+
+    def contadores(self):
+        with self._trava:
+            return dict(self._contadores)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._somar(pools_limpos=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._somar(conexoes_abertas=1, conexoes_criadas=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._somar(conexoes_abertas=-1, conexoes_fechadas=1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._somar(falhas_checkout=1)
+
+    def connection_checked_out(self, event):
+        self._somar(conexoes_em_uso=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._somar(conexoes_em_uso=-1)
+
 
 @st.cache_resource
-def conectar_mongo_dialogos_babacu():
+def monitor_pool_conexoes():
+    return MonitorPoolConexoes()
+
+
+# Quantidade de execuções guardadas pelo monitor de comandos (as mais antigas são descartadas)
+MAX_EXECUCOES_MONITORADAS = 100
+
+# Comandos guardados por execução (os seguintes só são contados)
+MAX_COMANDOS_POR_EXECUCAO = 1000
+
+# Página das execuções sem sessão do Streamlit (threads em segundo plano)
+PAGINA_SEGUNDO_PLANO = "Segundo plano"
+
+
+def documentos_retornados(resposta):
+    """
+    Quantidade de documentos na resposta de um comando: o lote do cursor
+    (find, aggregate, getMore), os valores do distinct ou o `n` de contagens
+    e escritas. None se o comando não retorna documentos.
+    """
+    cursor = resposta.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if isinstance(resposta.get("values"), list):
+        return len(resposta["values"])
+    if isinstance(resposta.get("n"), int):
+        return resposta["n"]
+    return None
+
+
+class MonitorComandos(monitoring.CommandListener):
+    """
+    Registra os comandos enviados ao MongoDB (nome, coleção, duração,
+    documentos retornados e a página que estava sendo executada), agrupados
+    por execução do script do Streamlit. Os registros são exibidos para
+    administradores na página de Gerenciamento.
+
+    Cada execução começa com iniciar_execucao (no início de login.py, que roda
+    em toda execução) e recebe a página em definir_pagina. Os callbacks de
+    widgets rodam antes do script e ficam na execução anterior da sessão, que
+    é a que exibiu o widget.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._execucoes = deque(maxlen=MAX_EXECUCOES_MONITORADAS)
+        self._atuais = {}
+        self._pendentes = {}
+
+    def _nova_execucao(self, sessao, pagina=None):
+        execucao = {
+            "id": uuid.uuid4().hex[:8],
+            "sessao": sessao,
+            "pagina": pagina,
+            "inicio": datetime.now(),
+            "comandos": [],
+            "descartados": 0,
+        }
+        self._execucoes.append(execucao)
+        self._atuais[sessao] = execucao
+
+        # Esquece as sessões cujas execuções já saíram da lista
+        em_uso = {id(e) for e in self._execucoes}
+        self._atuais = {s: e for s, e in self._atuais.items() if id(e) in em_uso}
+        return execucao
+
+    def iniciar_execucao(self, sessao):
+        with self._trava:
+            self._nova_execucao(sessao)
+
+    def definir_pagina(self, sessao, pagina):
+        with self._trava:
+            execucao = self._atuais.get(sessao) or self._nova_execucao(sessao)
+            execucao["pagina"] = pagina
+
+    def _execucao_atual(self):
+        contexto = get_script_run_ctx(suppress_warning=True)
+        sessao = contexto.session_id if contexto else None
+        execucao = self._atuais.get(sessao)
+
+        # Comandos fora de uma sessão vão para execuções de "segundo plano",
+        # trocadas quando enchem
+        if execucao is None or (sessao is None and len(execucao["comandos"]) >= MAX_COMANDOS_POR_EXECUCAO):
+            execucao = self._nova_execucao(sessao, None if sessao else PAGINA_SEGUNDO_PLANO)
+        return execucao
+
+    # ------------------ Eventos do PyMongo ------------------ #
+
+    def started(self, event):
+        # getMore traz o nome da coleção em "collection"; comandos como ping não têm coleção
+        colecao = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+
+        with self._trava:
+            execucao = self._execucao_atual()
+            self._pendentes[(event.request_id, event.connection_id)] = {
+                "execucao": execucao,
+                "comando": event.command_name,
+                "colecao": colecao if isinstance(colecao, str) else None,
+                "pagina": execucao["pagina"],
+                "inicio": datetime.now(),
+            }
+
+    def _concluir(self, event, ok, documentos=None, erro=None):
+        with self._trava:
+            pendente = self._pendentes.pop((event.request_id, event.connection_id), None)
+            if pendente is None:
+                return
+
+            execucao = pendente.pop("execucao")
+            if len(execucao["comandos"]) >= MAX_COMANDOS_POR_EXECUCAO:
+                execucao["descartados"] += 1
+                return
+
+            execucao["comandos"].append({
+                **pendente,
+                "duracao_ms": round(event.duration_micros / 1000, 2),
+                "documentos": documentos,
+                "ok": ok,
+                "erro": erro,
+            })
+
+    def succeeded(self, event):
+        self._concluir(event, ok=True, documentos=documentos_retornados(event.reply))
+
+    def failed(self, event):
+        self._concluir(event, ok=False, erro=str(event.failure.get("errmsg", event.failure)))
+
+    # ------------------ Leitura ------------------ #
+
+    def execucoes(self):
+        """
+        Cópia das execuções registradas, da mais recente para a mais antiga.
+        """
+        with self._trava:
+            return [
+                {**execucao, "comandos": [dict(comando) for comando in execucao["comandos"]]}
+                for execucao in reversed(self._execucoes)
+            ]
+
+    def exportar_json(self):
+        return json.dumps(self.execucoes(), default=str, ensure_ascii=False, indent=2)
+
+
+@st.cache_resource
+def monitor_comandos():
+    return MonitorComandos()
+
+
+def iniciar_execucao_monitorada():
+    """
+    Marca o início de uma execução do script para o monitor de comandos.
+    """
+    contexto = get_script_run_ctx(suppress_warning=True)
+    if contexto:
+        monitor_comandos().iniciar_execucao(contexto.session_id)
+
+
+def definir_pagina_monitorada(pagina):
+    """
+    Informa ao monitor de comandos a página que a execução atual vai rodar.
+    """
+    contexto = get_script_run_ctx(suppress_warning=True)
+    if contexto:
+        monitor_comandos().definir_pagina(contexto.session_id, pagina)
+
+
+@st.cache_resource
+def obter_cliente_mongo():
+    """
+    Cria o MongoClient compartilhado por todo o processo do Streamlit.
+    O tamanho do pool pode ser ajustado em st.secrets["mongo"] com
+    `max_pool_size` e `min_pool_size`.
+    """
+    config_mongo = st.secrets["mongo"]
+
     cliente = MongoClient(
-    st.secrets["mongo"]["string_conexao_mongo"])
-    db_biblioteca = cliente[st.secrets["mongo"]["bd_dialogos"]]                   
+        config_mongo["string_conexao_mongo"],
+        maxPoolSize=int(config_mongo.get("max_pool_size", MAX_POOL_SIZE_PADRAO)),
+        minPoolSize=int(config_mongo.get("min_pool_size", MIN_POOL_SIZE_PADRAO)),
+        event_listeners=[monitor_pool_conexoes(), monitor_comandos()]
+    )
+
+    # Pré-aquecimento: resolve o SRV, faz o handshake TLS e abre a primeira conexão
+    # já na primeira execução do app (login.py), antes de qualquer página consultar o banco.
+    # As demais conexões até minPoolSize são abertas em segundo plano pelo PyMongo.
+    cliente.admin.command("ping")
+
+    return cliente
+
+
+@st.cache_resource
+def conectar_mongo_dialogos_babacu():
+    cliente = obter_cliente_mongo()
+    db_biblioteca = cliente[st.secrets["mongo"]["bd_dialogos"]]
     return db_biblioteca
 
 
+def verificar_saude_mongo():
+    """
+    Faz um ping no servidor e retorna o status e a latência em milissegundos.
+    """
+    inicio = time.perf_counter()
+    try:
+        obter_cliente_mongo().admin.command("ping")
+        return {"ok": True, "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1), "erro": None}
+    except Exception as e:
+        return {"ok": False, "latencia_ms": None, "erro": str(e)}
+
+
+def estatisticas_pool_mongo():
+    """
+    Retorna os contadores do pool junto com os limites configurados.
+    """
+    opcoes_pool = obter_cliente_mongo().options.pool_options
+    estatisticas = monitor_pool_conexoes().contadores()
+    estatisticas["max_pool_size"] = opcoes_pool.max_pool_size
+    estatisticas["min_pool_size"] = opcoes_pool.min_pool_size
+    return estatisticas
+
+
+@st.cache_resource
+def snapshot_catalogo(fonte="mongo"):
+    """
+    Snapshot do catálogo compartilhado por todas as sessões (ver catalogo.SnapshotCatalogo).
+    Há um snapshot por fonte da versão ("mongo", "indice" ou "parquet"): as
+    versões de fontes diferentes não são comparáveis, e um snapshot único
+    seria esvaziado a cada página que lesse a versão de outra fonte.
+    """
+    return SnapshotCatalogo()
+
+
+@st.cache_resource
+def cards_catalogo():
+    """
+    HTML dos cards da Biblioteca por documento, compartilhado por todas as
+    sessões e descartado quando a versão do catálogo muda (ver cards.py).
+    """
+    return SnapshotCatalogo(max_consultas=MAX_CARDS_EM_CACHE)
+
+
+@st.cache_resource
+def cache_miniaturas():
+    """
+    Cache em disco das miniaturas do Drive, servido como arquivo estático
+    (ver miniaturas.py). Só é criado com `cache_local = true` em
+    st.secrets["miniaturas"]; o tamanho do diretório é limitado por
+    `tamanho_maximo_mb`. Retorna None se estiver desativado.
+    """
+    config_miniaturas = st.secrets.get("miniaturas", {})
+    if not config_miniaturas.get("cache_local", False):
+        return None
+
+    return CacheMiniaturas(
+        tamanho_maximo=int(config_miniaturas.get("tamanho_maximo_mb", TAMANHO_MAXIMO_PADRAO_MB)) * 1024 * 1024
+    )
+
+
+@st.cache_resource
+def indice_catalogo():
+    """
+    Índice do catálogo em memória, mantido por um change stream (ver
+    observador_catalogo.py). Só é criado com `observar_alteracoes = true` em
+    st.secrets["mongo"]; retorna None se estiver desativado ou se o servidor
+    não suportar change streams.
+    """
+    if not st.secrets["mongo"].get("observar_alteracoes", False):
+        return None
+
+    indice = IndiceCatalogo()
+    if not ObservadorCatalogo(conectar_mongo_dialogos_babacu(), indice).iniciar():
+        return None
+    return indice
+
+
+@st.cache_resource
+def catalogo_parquet():
+    """
+    Snapshot do catálogo em Parquet, lido com pyarrow (ver catalogo_parquet.py).
+    Só é criado com `leitura_parquet = true` em st.secrets["mongo"]. A versão
+    do catálogo é verificada a cada `intervalo_parquet` segundos, e o arquivo
+    fica em `diretorio_parquet` (por padrão, o diretório temporário).
+    Retorna None se estiver desativado.
+    """
+    config_mongo = st.secrets["mongo"]
+    if not config_mongo.get("leitura_parquet", False):
+        return None
+
+    # Importado aqui: o pyarrow só é carregado com a leitura Parquet ativa
+    # (e catalogo_parquet depende de exportar_acervo, que importa este módulo)
+    from catalogo_parquet import INTERVALO_ATUALIZACAO_PADRAO, CatalogoParquet, caminho_padrao
+
+    catalogo = CatalogoParquet(
+        conectar_mongo_dialogos_babacu(),
+        caminho_padrao(config_mongo.get("diretorio_parquet", tempfile.gettempdir())),
+        intervalo=float(config_mongo.get("intervalo_parquet", INTERVALO_ATUALIZACAO_PADRAO))
+    )
+    catalogo.iniciar()
+    return catalogo
+
+
+@st.cache_resource
+def consultas_catalogo_async():
+    """
+    Consultas do catálogo feitas em paralelo, uma por coleção, com o cliente
+    assíncrono do PyMongo (ver catalogo_async.py). Só é criado com
+    `consultas_paralelas = true` em st.secrets["mongo"]; o tempo máximo de cada
+    consulta pode ser ajustado com `timeout_consulta` (segundos).
+    Retorna None se estiver desativado.
+    """
+    config_mongo = st.secrets["mongo"]
+    if not config_mongo.get("consultas_paralelas", False):
+        return None
+
+    return ConsultasCatalogoAsync(
+        config_mongo["string_conexao_mongo"],
+        config_mongo["bd_dialogos"],
+        timeout_consulta=float(config_mongo.get("timeout_consulta", TIMEOUT_CONSULTA_PADRAO)),
+        maxPoolSize=int(config_mongo.get("max_pool_size", MAX_POOL_SIZE_PADRAO)),
+        minPoolSize=int(config_mongo.get("min_pool_size", MIN_POOL_SIZE_PADRAO))
+    )
+
+
+def conectar_mongo_cli(uri=None, banco=None):
+    """
+    Conexão usada pelos comandos de linha de comando (fora do Streamlit).
+    Sem argumentos, usa os mesmos dados de .streamlit/secrets.toml.
+    """
+    cliente = MongoClient(uri or st.secrets["mongo"]["string_conexao_mongo"])
+    return cliente[banco or st.secrets["mongo"]["bd_dialogos"]]
+
+
 # @st.cache_resource
 # def conectar_mongo_pls():
 #     cliente_2 = MongoClient(
 #     st.secrets["senhas"]["senha_mongo_pls"])
 #     db_pls = cliente_2["db_pls"]
-#     return db_pls
\ No newline at end of file
+#     return db_pls
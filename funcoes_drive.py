@@ -0,0 +1,180 @@
+# --------------------------------------------------------------
+# Envio de arquivos e miniaturas para o Google Drive
+#
+# Usado pela página de Gerenciamento (upload_to_drive) e pela importação em
+# lote (importar_acervo.py). As funções não exibem mensagens: os erros são
+# repassados para quem chama, que decide como mostrá-los.
+# --------------------------------------------------------------
+
+import base64
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import pypdfium2 as pdfium
+import streamlit as st
+from PIL import Image
+from pydrive2.auth import GoogleAuth
+from pydrive2.drive import GoogleDrive
+
+from catalogo import COLECAO_POR_TIPO
+from rastreamento import fase, medir
+
+
+# Largura das miniaturas exibidas nos cards (a altura é proporcional)
+LARGURA_MINIATURA = 280
+
+# Largura da prévia (LQIP) exibida nos cards enquanto a miniatura carrega
+LARGURA_PREVIA = 16
+
+# Extensões com miniatura gerada a partir da própria imagem
+EXTENSOES_IMAGEM = [".png", ".jpg", ".jpeg", ".webp"]
+
+
+# Função para autenticar Google Drive usando st.secrets
+def authenticate_drive():
+    service_account_info = dict(st.secrets["drive_api"])
+
+    # Garante que a chave client_user_email existe
+    client_user_email = service_account_info.get("client_user_email")
+    if not client_user_email:
+        raise ValueError("client_user_email está ausente em st.secrets['drive_api'].")
+
+    # Cria arquivo temporário
+    with tempfile.NamedTemporaryFile(mode="w+", delete=False, suffix=".json") as tmp:
+        json.dump(service_account_info, tmp)
+
+        tmp.flush()
+
+        gauth = GoogleAuth()
+        gauth.settings['client_config_backend'] = 'service'
+        gauth.settings['service_config'] = {
+            'client_json_file_path': tmp.name,
+            'client_user_email': client_user_email  # <--- ESSENCIAL
+        }
+
+        gauth.ServiceAuth()
+        drive = GoogleDrive(gauth)
+        return drive
+
+
+def pasta_do_tipo(tipo):
+    """
+    ID da pasta do Drive configurada em st.secrets["pastas"] para o tipo de
+    mídia (as chaves são os nomes das coleções). None se não houver.
+    """
+    return st.secrets["pastas"].get(COLECAO_POR_TIPO.get(tipo))
+
+
+def link_drive(file_id):
+    return f"https://drive.google.com/file/d/{file_id}/view"
+
+
+@medir("upload no Drive")
+def enviar_arquivo_drive(drive, caminho_local, filename, parent_folder_id):
+    """
+    Cria a subpasta "<timestamp>_<nome>" dentro da pasta do tipo e envia o
+    arquivo local para ela. Retorna (subfolder_id, file_link).
+    """
+    base_name = os.path.splitext(filename)[0]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    folder_name = f"{timestamp}_{base_name}"
+
+    # Cria subpasta no Drive
+    subfolder = drive.CreateFile({
+        'title': folder_name,
+        'mimeType': 'application/vnd.google-apps.folder',
+        'parents': [{'id': parent_folder_id}]
+    })
+    subfolder.Upload()
+    subfolder_id = subfolder['id']
+
+    # Upload do arquivo original
+    gfile = drive.CreateFile({
+        'title': filename,
+        'parents': [{'id': subfolder_id}]
+    })
+    gfile.SetContentFile(caminho_local)
+    gfile.Upload()
+
+    return subfolder_id, link_drive(gfile['id'])
+
+
+@medir("miniatura")
+def gerar_miniatura(caminho_local, caminho_miniatura):
+    """
+    Gera a miniatura PNG de uma imagem ou da primeira página de um PDF.
+    Retorna False se o formato do arquivo não tem miniatura.
+    """
+    ext = os.path.splitext(caminho_local)[1].lower()
+
+    # 📸 IMAGEM
+    if ext in EXTENSOES_IMAGEM:
+        img = Image.open(caminho_local)
+
+    # 📄 PDF (pypdfium2)
+    elif ext == ".pdf":
+        pdf = pdfium.PdfDocument(caminho_local)
+        if len(pdf) == 0:
+            raise Exception("PDF sem páginas")
+
+        page = pdf[0]
+        bitmap = page.render(scale=1.2, rotation=0)
+        img = bitmap.to_pil()
+
+    else:
+        return False
+
+    img = img.convert("RGB")
+    w, h = img.size
+    new_height = int((LARGURA_MINIATURA / w) * h)
+    img = img.resize((LARGURA_MINIATURA, new_height), Image.Resampling.LANCZOS)
+    img.save(caminho_miniatura, "PNG")
+    return True
+
+
+def gerar_previa(caminho_imagem):
+    """
+    Prévia de baixa qualidade de uma imagem: WebP de 16px de largura (altura
+    proporcional) em base64, pronta para o src de um <img>. Fica gravada no
+    documento e é exibida no card até a miniatura carregar.
+    """
+    img = Image.open(caminho_imagem).convert("RGBA")
+    w, h = img.size
+    img = img.resize((LARGURA_PREVIA, max(1, round(LARGURA_PREVIA * h / w))), Image.Resampling.BILINEAR)
+
+    buffer = io.BytesIO()
+    img.save(buffer, "WEBP", quality=50)
+    return f"data:image/webp;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+def enviar_miniatura_drive(drive, caminho_local, base_name, subfolder_id, miniaturas=None):
+    """
+    Gera a miniatura do arquivo local e a envia para a subpasta do documento.
+    Com `miniaturas` (CacheMiniaturas), a miniatura também é guardada no cache
+    local, sem precisar ser baixada do Drive depois.
+    Retorna (link da miniatura, prévia), ou (None, None) se o formato não tem miniatura.
+    """
+    thumb_name = f"miniatura_{base_name}.png"
+    thumb_path = os.path.join(tempfile.gettempdir(), thumb_name)
+
+    try:
+        if not gerar_miniatura(caminho_local, thumb_path):
+            return None, None
+
+        with fase("upload no Drive"):
+            thumb_file = drive.CreateFile({
+                'title': thumb_name,
+                'parents': [{'id': subfolder_id}]
+            })
+            thumb_file.SetContentFile(thumb_path)
+            thumb_file.Upload()
+        if miniaturas:
+            miniaturas.guardar_arquivo(thumb_file['id'], thumb_path)
+        return link_drive(thumb_file['id']), gerar_previa(thumb_path)
+
+    finally:
+        if os.path.exists(thumb_path):
+            os.remove(thumb_path)
@@ -0,0 +1,362 @@
+# --------------------------------------------------------------
+# Importação em lote de documentos para o acervo
+#
+# Uso:
+#   python importar_acervo.py manifesto.csv --tipo Publicação
+#   python importar_acervo.py manifesto.jsonl --lote 200
+#   python importar_acervo.py manifesto.csv --validar   -> só valida, não grava nada
+#
+# Cada registro do manifesto (linha do CSV ou do JSONL) vira um documento.
+# Campos reconhecidos:
+#   tipo e titulo (obrigatórios; o tipo pode vir de --tipo), tema (obrigatório,
+#   um ou mais de TEMAS_BABACU ou "Outro"), descricao, autor, organizacao,
+#   ano_publicacao e arquivo (caminho de um arquivo local, relativo ao
+#   manifesto, enviado ao Google Drive com miniatura, como nos formulários).
+# Os demais campos são gravados como estão. Em texto, tema e organizacao
+# aceitam vários valores separados por ";".
+#
+# O progresso é salvo em <manifesto>.checkpoint.json a cada lote (e a cada
+# arquivo enviado ao Drive). Se a importação for interrompida, basta repetir
+# o mesmo comando para continuar de onde parou.
+#
+# Opções: --uri e --banco (por padrão, os dados de .streamlit/secrets.toml)
+# --------------------------------------------------------------
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+from catalogo import COLECAO_POR_TIPO, TEMAS_BABACU, inserir_documentos
+from funcoes_auxiliares import conectar_mongo_cli
+from funcoes_drive import authenticate_drive, enviar_arquivo_drive, enviar_miniatura_drive, pasta_do_tipo
+
+
+# Quantidade de documentos gravados por lote
+TAMANHO_LOTE = 200
+
+# Formato do checkpoint. Na versão 2, cada envio ao Drive é um dicionário com
+# os campos gravados no documento
+VERSAO_CHECKPOINT = 2
+
+# Campos de cada envio nos checkpoints sem versão, que guardavam listas
+# (de 2, 3 ou 4 itens, conforme a versão do importador)
+CAMPOS_ENVIO_ANTIGOS = {
+    2: ["link", "thumb_link"],
+    3: ["link", "thumb_link", "thumb_previa"],
+    4: ["subfolder_id", "link", "thumb_link", "thumb_previa"]
+}
+
+# Valor de `enviado_por` nos documentos importados
+ENVIADO_POR_PADRAO = "Importação em lote"
+
+# Campos que aceitam vários valores
+CAMPOS_LISTA = ["tema", "organizacao"]
+
+# Temas aceitos, os mesmos dos formulários de cadastro
+TEMAS_VALIDOS = set(TEMAS_BABACU) | {"Outro"}
+
+
+# ------------------ Leitura e validação ------------------ #
+
+def ler_manifesto(caminho):
+    """
+    Lê os registros de um manifesto CSV ou JSONL (pela extensão).
+    Retorna uma lista de (numero, registro), com numero a partir de 1.
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+
+    with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+        if extensao == ".csv":
+            registros = list(csv.DictReader(arquivo))
+        elif extensao in (".jsonl", ".ndjson"):
+            registros = [json.loads(linha) for linha in arquivo if linha.strip()]
+        else:
+            raise ValueError(f"Formato de manifesto não suportado: {extensao} (use .csv ou .jsonl)")
+
+    return list(enumerate(registros, start=1))
+
+
+def normalizar_registro(registro, tipo_padrao=None):
+    """
+    Remove espaços e campos vazios e separa os campos de vários valores.
+    """
+    normalizado = {}
+    for campo, valor in registro.items():
+        if campo is None:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor in ("", None, []):
+            continue
+        if campo in CAMPOS_LISTA and isinstance(valor, str):
+            valor = [item.strip() for item in valor.split(";") if item.strip()]
+        normalizado[campo.strip()] = valor
+
+    if tipo_padrao and "tipo" not in normalizado:
+        normalizado["tipo"] = tipo_padrao
+
+    return normalizado
+
+
+def validar_registro(registro, pasta_manifesto):
+    """
+    Retorna a lista de erros do registro (vazia se ele é válido).
+    """
+    erros = []
+
+    tipo = registro.get("tipo")
+    if tipo not in COLECAO_POR_TIPO:
+        erros.append(f"tipo inválido: {tipo!r}")
+
+    if not isinstance(registro.get("titulo"), str):
+        erros.append("titulo ausente")
+
+    temas = registro.get("tema")
+    if not temas:
+        erros.append("tema ausente")
+    elif not isinstance(temas, list) or any(tema not in TEMAS_VALIDOS for tema in temas):
+        erros.append(f"tema inválido: {temas!r}")
+
+    ano = registro.get("ano_publicacao")
+    if ano is not None:
+        try:
+            if int(ano) > datetime.now().year:
+                erros.append(f"ano_publicacao no futuro: {ano}")
+        except (TypeError, ValueError):
+            erros.append(f"ano_publicacao inválido: {ano!r}")
+
+    arquivo = registro.get("arquivo")
+    if arquivo is not None:
+        if not os.path.isfile(os.path.join(pasta_manifesto, arquivo)):
+            erros.append(f"arquivo não encontrado: {arquivo}")
+        elif tipo in COLECAO_POR_TIPO and not pasta_do_tipo(tipo):
+            erros.append(f"pasta do Drive não configurada para {tipo}")
+
+    return erros
+
+
+# ------------------ Checkpoint ------------------ #
+
+def caminho_checkpoint(caminho_manifesto):
+    return f"{caminho_manifesto}.checkpoint.json"
+
+
+def hash_arquivo(caminho):
+    soma = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            soma.update(bloco)
+    return soma.hexdigest()
+
+
+def ler_checkpoint(caminho_manifesto, hash_manifesto):
+    """
+    Retorna o checkpoint salvo para este manifesto ou um novo.
+    Um checkpoint de outra versão do manifesto é recusado. Os envios de um
+    checkpoint sem versão (gravado por um importador anterior) são convertidos.
+    """
+    caminho = caminho_checkpoint(caminho_manifesto)
+    if not os.path.exists(caminho):
+        return {"versao": VERSAO_CHECKPOINT, "hash_manifesto": hash_manifesto, "concluidos": 0, "envios": {}}
+
+    with open(caminho, encoding="utf-8") as arquivo:
+        checkpoint = json.load(arquivo)
+
+    if checkpoint["hash_manifesto"] != hash_manifesto:
+        raise ValueError(
+            f"O manifesto mudou desde a última execução. Apague {caminho} para recomeçar a importação."
+        )
+
+    versao = checkpoint.get("versao", 1)
+    if versao == 1:
+        envios = {}
+        for numero, envio in checkpoint["envios"].items():
+            if len(envio) not in CAMPOS_ENVIO_ANTIGOS:
+                raise ValueError(f"Envio do registro {numero} em formato desconhecido no checkpoint {caminho}.")
+            envios[numero] = dict(zip(CAMPOS_ENVIO_ANTIGOS[len(envio)], envio))
+        checkpoint = {**checkpoint, "versao": VERSAO_CHECKPOINT, "envios": envios}
+    elif versao != VERSAO_CHECKPOINT:
+        raise ValueError(
+            f"O checkpoint {caminho} foi gravado por uma versão mais nova do importador (formato {versao})."
+        )
+    return checkpoint
+
+
+def salvar_checkpoint(caminho_manifesto, checkpoint):
+    """
+    Grava o checkpoint em um arquivo temporário e o renomeia, para que uma
+    interrupção no meio da escrita não deixe um checkpoint corrompido.
+    """
+    caminho = caminho_checkpoint(caminho_manifesto)
+    with open(f"{caminho}.tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(checkpoint, arquivo, ensure_ascii=False, indent=2)
+    os.replace(f"{caminho}.tmp", caminho)
+
+
+# ------------------ Importação ------------------ #
+
+def enviar_arquivo(drive, registro, pasta_manifesto):
+    """
+    Envia o arquivo local do registro ao Drive, na pasta do tipo, com o mesmo
+    nome usado pelos formulários (título + extensão).
+    Retorna os campos do documento preenchidos pelo envio: subfolder_id,
+    link, thumb_link e thumb_previa.
+    """
+    caminho = os.path.join(pasta_manifesto, registro["arquivo"])
+    extensao = os.path.splitext(caminho)[1]
+    titulo_com_extensao = f"{registro['titulo']}{extensao}"
+
+    subfolder_id, file_link = enviar_arquivo_drive(drive, caminho, titulo_com_extensao, pasta_do_tipo(registro["tipo"]))
+
+    thumb_link, thumb_previa = None, None
+    try:
+        thumb_link, thumb_previa = enviar_miniatura_drive(drive, caminho, registro["titulo"], subfolder_id)
+    except Exception as e:
+        print(f"AVISO: miniatura não criada para {registro['arquivo']}: {e}", file=sys.stderr)
+
+    return {"subfolder_id": subfolder_id, "link": file_link, "thumb_link": thumb_link, "thumb_previa": thumb_previa}
+
+
+def montar_documento(numero, registro, envio, nome_manifesto, enviado_por):
+    data = {campo: valor for campo, valor in registro.items() if campo != "arquivo"}
+
+    if "ano_publicacao" in data:
+        data["ano_publicacao"] = int(data["ano_publicacao"])
+
+    if envio:
+        data.update(envio)
+
+    data["enviado_por"] = enviado_por
+    data["data_upload"] = datetime.now()
+
+    # Origem do documento, usada para não duplicar o último lote ao retomar
+    data["importacao"] = {"manifesto": nome_manifesto, "registro": numero}
+    return data
+
+
+def ja_importados(db, nome_manifesto, numeros):
+    """
+    Números dos registros do lote que já estão no banco. Só é consultado no
+    primeiro lote de uma retomada: é o único que pode ter sido gravado sem que
+    o checkpoint fosse atualizado.
+    """
+    importados = set()
+    for nome_colecao in set(COLECAO_POR_TIPO.values()):
+        cursor = db[nome_colecao].find(
+            {"importacao.manifesto": nome_manifesto, "importacao.registro": {"$in": numeros}},
+            {"importacao.registro": 1}
+        )
+        importados.update(doc["importacao"]["registro"] for doc in cursor)
+    return importados
+
+
+def importar(db, caminho_manifesto, registros, tamanho_lote=TAMANHO_LOTE, enviado_por=ENVIADO_POR_PADRAO):
+    """
+    Grava os registros (já validados) em lotes, retomando do checkpoint.
+    Retorna a quantidade de documentos inseridos nesta execução.
+    """
+    pasta_manifesto = os.path.dirname(os.path.abspath(caminho_manifesto))
+    nome_manifesto = os.path.basename(caminho_manifesto)
+
+    checkpoint = ler_checkpoint(caminho_manifesto, hash_arquivo(caminho_manifesto))
+    pendentes = [(numero, registro) for numero, registro in registros if numero > checkpoint["concluidos"]]
+    retomando = checkpoint["concluidos"] > 0 or bool(checkpoint["envios"])
+
+    if not pendentes:
+        print("Nada a importar: todos os registros do manifesto já foram importados.")
+        return 0
+    if retomando:
+        print(f"Retomando a importação após o registro {checkpoint['concluidos']}.")
+
+    drive = authenticate_drive() if any("arquivo" in registro for _, registro in pendentes) else None
+    inseridos = 0
+
+    for inicio in range(0, len(pendentes), tamanho_lote):
+        lote = pendentes[inicio:inicio + tamanho_lote]
+
+        if retomando:
+            existentes = ja_importados(db, nome_manifesto, [numero for numero, _ in lote])
+            lote = [(numero, registro) for numero, registro in lote if numero not in existentes]
+            retomando = False
+
+        # Envio dos arquivos ao Drive. Cada envio vai para o checkpoint na hora,
+        # para que uma retomada não envie o mesmo arquivo de novo.
+        for numero, registro in lote:
+            if "arquivo" in registro and str(numero) not in checkpoint["envios"]:
+                checkpoint["envios"][str(numero)] = enviar_arquivo(drive, registro, pasta_manifesto)
+                salvar_checkpoint(caminho_manifesto, checkpoint)
+
+        # Documentos do lote agrupados por coleção, na ordem do manifesto
+        por_colecao = {}
+        for numero, registro in lote:
+            data = montar_documento(numero, registro, checkpoint["envios"].get(str(numero)), nome_manifesto, enviado_por)
+            por_colecao.setdefault(COLECAO_POR_TIPO[registro["tipo"]], []).append(data)
+
+        for nome_colecao, documentos in por_colecao.items():
+            inserir_documentos(db[nome_colecao], documentos)
+            inseridos += len(documentos)
+
+        ultimo = pendentes[min(inicio + tamanho_lote, len(pendentes)) - 1][0]
+        checkpoint["concluidos"] = ultimo
+        checkpoint["envios"] = {numero: envio for numero, envio in checkpoint["envios"].items() if int(numero) > ultimo}
+        salvar_checkpoint(caminho_manifesto, checkpoint)
+
+        print(f"Registros até {ultimo} importados ({inseridos} documento(s) nesta execução)")
+
+    return inseridos
+
+
+# ------------------ Linha de comando ------------------ #
+
+def inteiro_positivo(texto):
+    valor = int(texto)
+    if valor < 1:
+        raise argparse.ArgumentTypeError(f"deve ser maior que zero: {texto}")
+    return valor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importação em lote para a Biblioteca Diálogos do Babaçu")
+    parser.add_argument("manifesto", help="Arquivo .csv ou .jsonl com um documento por registro")
+    parser.add_argument("--tipo", choices=list(COLECAO_POR_TIPO), help="Tipo dos registros sem a coluna tipo")
+    parser.add_argument("--lote", type=inteiro_positivo, default=TAMANHO_LOTE, help="Documentos gravados por lote")
+    parser.add_argument("--enviado-por", default=ENVIADO_POR_PADRAO, help="Valor do campo enviado_por")
+    parser.add_argument("--validar", action="store_true", help="Só valida o manifesto, sem gravar")
+    parser.add_argument("--ignorar-invalidos", action="store_true", help="Importa os registros válidos e pula os demais")
+    parser.add_argument("--uri", help="String de conexão do MongoDB")
+    parser.add_argument("--banco", help="Nome do banco de dados")
+    args = parser.parse_args(argv)
+
+    pasta_manifesto = os.path.dirname(os.path.abspath(args.manifesto))
+    registros = [(numero, normalizar_registro(registro, args.tipo)) for numero, registro in ler_manifesto(args.manifesto)]
+
+    validos, invalidos = [], 0
+    for numero, registro in registros:
+        erros = validar_registro(registro, pasta_manifesto)
+        if erros:
+            invalidos += 1
+            print(f"Registro {numero}: {'; '.join(erros)}", file=sys.stderr)
+        else:
+            validos.append((numero, registro))
+
+    print(f"{len(registros)} registro(s): {len(validos)} válido(s), {invalidos} inválido(s)")
+
+    if args.validar:
+        return 1 if invalidos else 0
+
+    if invalidos and not args.ignorar_invalidos:
+        print("ERRO: corrija os registros inválidos ou use --ignorar-invalidos.", file=sys.stderr)
+        return 1
+
+    db = conectar_mongo_cli(args.uri, args.banco)
+    inseridos = importar(db, args.manifesto, validos, args.lote, args.enviado_por)
+    print(f"Importação concluída: {inseridos} documento(s) inserido(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,17 @@ import time
 import random  
 import smtplib  
 from email.mime.text import MIMEText  
-from funcoes_auxiliares import conectar_mongo_dialogos_babacu  # Função personalizada para conectar ao MongoDB
+from funcoes_auxiliares import conectar_mongo_dialogos_babacu, COLLATION_EMAIL  # Função personalizada para conectar ao MongoDB
+from funcoes_auxiliares import definir_pagina_monitorada, iniciar_execucao_monitorada
+from rastreamento import definir_pagina as definir_pagina_rastreada
 import bcrypt
 
 
+# Início de uma execução do script: os comandos enviados ao MongoDB a partir
+# daqui são agrupados nela (ver Gerenciamento > Sistema)
+iniciar_execucao_monitorada()
+
+
 ##############################################################################################################
 # CONEXÃO COM O BANCO DE DADOS (MONGODB)
 ###############################################################################################################
@@ -228,9 +235,10 @@ def login():
 
         if st.form_submit_button("Entrar"):
             # Busca apenas por e-mail no banco
-            usuario_encontrado = colaboradores.find_one({
-                "e_mail": {"$regex": f"^{email_input.strip()}$", "$options": "i"}
-            })
+            usuario_encontrado = colaboradores.find_one(
+                {"e_mail": email_input.strip()},
+                collation=COLLATION_EMAIL  # ignora maiúsculas/minúsculas usando o índice de e_mail
+            )
 
             st.session_state["email_para_recuperar"] = email_input.strip()
 
@@ -303,6 +311,8 @@ else:
         ])
 
         # Executa a página selecionada
+        definir_pagina_monitorada(pg_com_icones.title)
+        definir_pagina_rastreada(pg_com_icones.title)
         pg_com_icones.run()
 
 
@@ -323,6 +333,8 @@ else:
         ])
 
         # Executa a página selecionada
+        definir_pagina_monitorada(pg_com_icones.title)
+        definir_pagina_rastreada(pg_com_icones.title)
         pg_com_icones.run()
 
 
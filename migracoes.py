@@ -0,0 +1,533 @@
+# --------------------------------------------------------------
+# Migrações de índices do MongoDB
+#
+# Uso:
+#   python migracoes.py aplicar     -> cria os índices declarados (idempotente)
+#   python migracoes.py verificar   -> compara os índices declarados com os do banco
+#   python migracoes.py backfill-busca -> calcula busca_tokens nos documentos já existentes
+#   python migracoes.py backfill-miniaturas -> grava o ID e a URL das miniaturas nos documentos já existentes
+#   python migracoes.py reconstruir-facetas -> recalcula a coleção de facetas (temas e contagens)
+#
+# Consolidação das 12 coleções na coleção acervo, nesta ordem:
+#   python migracoes.py aplicar                     -> cria também os índices do acervo
+#   python migracoes.py acervo-fase escrita_dupla   -> as escritas passam a ser copiadas para o acervo
+#   python migracoes.py acervo-copiar               -> copia os documentos já existentes (pode ser repetido)
+#   python migracoes.py acervo-verificar            -> compara quantidades e checksums
+#   python migracoes.py acervo-fase acervo          -> as consultas passam a ler o acervo
+# Para voltar atrás: python migracoes.py acervo-fase escrita_dupla (ou legado)
+#
+# Opções: --uri e --banco (por padrão, os dados de .streamlit/secrets.toml)
+# --------------------------------------------------------------
+
+import argparse
+import hashlib
+import sys
+import time
+from datetime import datetime
+
+from bson import json_util
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, ReplaceOne, UpdateOne
+from pymongo.errors import OperationFailure
+
+from catalogo import (
+    CAMPO_TOKENS_BUSCA,
+    CAMPOS_BUSCA,
+    CAMPOS_MINIATURA,
+    COLECAO_ACERVO,
+    COLECAO_FACETAS,
+    COLECOES_CATALOGO,
+    FASE_ACERVO,
+    FASE_LEGADO,
+    FASES_ACERVO,
+    INTERVALO_FASE_ACERVO,
+    definir_fase_acervo,
+    documento_acervo,
+    fase_acervo,
+    campos_miniatura,
+    incrementar_versao_catalogo,
+    reconstruir_facetas,
+    tokens_busca
+)
+from funcoes_auxiliares import COLLATION_EMAIL, conectar_mongo_cli
+
+
+# Coleção onde fica registrada a versão aplicada das migrações
+COLECAO_MIGRACOES = "migracoes"
+
+# Quantidade de documentos atualizados por lote nos backfills
+TAMANHO_LOTE = 500
+
+
+# ------------------ Índices declarados ------------------ #
+
+def indices_catalogo():
+    """
+    Índices de cada coleção do acervo, usados pelos filtros da Biblioteca
+    (tipo, tema) e pela ordenação/paginação por (data_upload, _id).
+    """
+    return [
+        IndexModel([("tipo", ASCENDING), ("tema", ASCENDING), ("data_upload", DESCENDING)], name="tipo_tema_data_upload"),
+        IndexModel([("tema", ASCENDING), ("data_upload", DESCENDING)], name="tema_data_upload"),
+        IndexModel([("data_upload", DESCENDING), ("_id", DESCENDING)], name="data_upload_id"),
+    ]
+
+
+# Pesos da busca textual: um termo no título vale mais que na descrição
+PESOS_BUSCA_TEXTUAL = {
+    "titulo": 10,
+    "tema": 5,
+    "autor": 3,
+    "organizacao": 3,
+    "descricao": 1
+}
+
+
+def indice_busca_textual():
+    return IndexModel(
+        [(campo, TEXT) for campo in PESOS_BUSCA_TEXTUAL],
+        name="busca_textual",
+        weights=PESOS_BUSCA_TEXTUAL,
+        default_language="portuguese"
+    )
+
+
+# Cada migração tem uma versão, uma descrição, os índices a criar por coleção
+# e, opcionalmente, os índices a remover (pelo nome). Novas migrações entram
+# sempre no fim da lista, com a próxima versão.
+MIGRACOES = [
+    {
+        "versao": 1,
+        "descricao": "Índices de filtro e ordenação do acervo e e-mail único de pessoas",
+        "criar": {
+            **{colecao: indices_catalogo() for colecao in COLECOES_CATALOGO},
+            "pessoas": [
+                IndexModel([("e_mail", ASCENDING)], name="e_mail_unico", unique=True, collation=COLLATION_EMAIL),
+            ],
+        },
+    },
+    {
+        "versao": 2,
+        "descricao": "Índice de texto em português para a busca por palavra-chave da Biblioteca",
+        "criar": {colecao: [indice_busca_textual()] for colecao in COLECOES_CATALOGO},
+    },
+    {
+        "versao": 3,
+        "descricao": "Índice dos termos de busca normalizados (sem acento e em minúsculas)",
+        "criar": {
+            colecao: [IndexModel([(CAMPO_TOKENS_BUSCA, ASCENDING)], name=CAMPO_TOKENS_BUSCA)]
+            for colecao in COLECOES_CATALOGO
+        },
+    },
+    {
+        "versao": 4,
+        "descricao": "Índice da coleção de facetas lida pelo formulário de filtros",
+        "criar": {
+            COLECAO_FACETAS: [IndexModel([("campo", ASCENDING), ("valor", ASCENDING)], name="campo_valor")],
+        },
+    },
+    {
+        "versao": 5,
+        "descricao": "Índices da coleção acervo, que consolida as 12 coleções do catálogo",
+        "criar": {
+            COLECAO_ACERVO: indices_catalogo() + [
+                indice_busca_textual(),
+                IndexModel([(CAMPO_TOKENS_BUSCA, ASCENDING)], name=CAMPO_TOKENS_BUSCA),
+                IndexModel([("_colecao", ASCENDING), ("_id", ASCENDING)], name="colecao_id"),
+            ],
+        },
+    },
+]
+
+
+def indices_declarados():
+    """
+    Reproduz as migrações em ordem e retorna o estado final esperado:
+    {colecao: {nome_do_indice: IndexModel}}.
+    """
+    declarados = {}
+    for migracao in MIGRACOES:
+        for colecao, indices in migracao.get("criar", {}).items():
+            for indice in indices:
+                declarados.setdefault(colecao, {})[indice.document["name"]] = indice
+        for colecao, nomes in migracao.get("remover", {}).items():
+            for nome in nomes:
+                declarados.get(colecao, {}).pop(nome, None)
+    return declarados
+
+
+# ------------------ Aplicação ------------------ #
+
+def versao_aplicada(db):
+    registro = db[COLECAO_MIGRACOES].find_one({"_id": "indices"})
+    return registro["versao"] if registro else 0
+
+
+def emails_duplicados(db):
+    """
+    Grupos de e-mails de `pessoas` iguais pela COLLATION_EMAIL (sem diferenciar
+    maiúsculas), que impedem a criação do índice único e_mail_unico.
+    Retorna [[e-mail, e-mail, ...], ...].
+    """
+    pipeline = [
+        {"$group": {"_id": "$e_mail", "emails": {"$push": "$e_mail"}, "quantidade": {"$sum": 1}}},
+        {"$match": {"quantidade": {"$gt": 1}}},
+    ]
+    return [grupo["emails"] for grupo in db["pessoas"].aggregate(pipeline, collation=COLLATION_EMAIL)]
+
+
+def aplicar_migracoes(db):
+    """
+    Remove os índices descontinuados pelas migrações pendentes e cria todos os
+    índices declarados. Criar um índice que já existe com a mesma definição não
+    tem efeito, então o comando pode ser repetido com segurança.
+    Retorna a lista de mensagens e a lista de erros.
+    """
+    mensagens, erros = [], []
+    versao_atual = versao_aplicada(db)
+
+    pendentes = [m for m in MIGRACOES if m["versao"] > versao_atual]
+    for migracao in pendentes:
+        for colecao, nomes in migracao.get("remover", {}).items():
+            existentes = db[colecao].index_information()
+            for nome in nomes:
+                if nome in existentes:
+                    db[colecao].drop_index(nome)
+                    mensagens.append(f"{colecao}: índice {nome} removido (v{migracao['versao']})")
+
+    for colecao, indices in indices_declarados().items():
+        for nome, indice in indices.items():
+            # O índice único falha se já houver e-mails repetidos: lista os conflitos antes
+            if colecao == "pessoas" and nome == "e_mail_unico" and nome not in db[colecao].index_information():
+                duplicados = emails_duplicados(db)
+                if duplicados:
+                    erros.append(
+                        f"{colecao}: não foi possível criar {nome}: e-mails cadastrados mais de uma vez "
+                        f"(sem diferenciar maiúsculas): {'; '.join(', '.join(grupo) for grupo in duplicados)}. "
+                        "Remova ou corrija os cadastros repetidos e rode `aplicar` de novo."
+                    )
+                    continue
+            try:
+                db[colecao].create_indexes([indice])
+                mensagens.append(f"{colecao}: índice {nome} ok")
+            except OperationFailure as e:
+                erros.append(f"{colecao}: não foi possível criar {nome}: {e}")
+
+    if erros:
+        return mensagens, erros
+
+    versao_final = MIGRACOES[-1]["versao"]
+    db[COLECAO_MIGRACOES].update_one(
+        {"_id": "indices"},
+        {"$set": {"versao": versao_final, "aplicado_em": datetime.now()}},
+        upsert=True
+    )
+    mensagens.append(f"Migrações de índices na versão {versao_final} (antes: {versao_atual})")
+
+    return mensagens, erros
+
+
+# ------------------ Verificação de divergências ------------------ #
+
+def _mesma_definicao(declarado, existente):
+    """
+    Compara a definição declarada (IndexModel.document) com a retornada por
+    index_information(). Só as opções declaradas são comparadas, porque o
+    servidor acrescenta valores padrão (por exemplo, na collation).
+    Índices de texto são guardados pelo servidor com as chaves _fts/_ftsx;
+    para eles, os campos são comparados pelos pesos (opção `weights`).
+    """
+    indice_texto = TEXT in declarado["key"].values()
+    if not indice_texto and list(declarado["key"].items()) != [tuple(k) for k in existente["key"]]:
+        return False
+
+    for opcao, valor in declarado.items():
+        if opcao in ("key", "name"):
+            continue
+        valor_existente = existente.get(opcao)
+        if isinstance(valor, dict) and isinstance(valor_existente, dict):
+            if any(valor_existente.get(k) != v for k, v in valor.items()):
+                return False
+        elif valor_existente != valor:
+            return False
+
+    return True
+
+
+def verificar_divergencias(db):
+    """
+    Retorna as divergências entre os índices declarados e os do banco, como
+    uma lista de dicionários {colecao, indice, situacao}.
+    """
+    divergencias = []
+    declarados = indices_declarados()
+
+    for colecao in sorted(set(declarados) | set(COLECOES_CATALOGO)):
+        existentes = db[colecao].index_information()
+        esperados = declarados.get(colecao, {})
+
+        for nome, indice in esperados.items():
+            if nome not in existentes:
+                divergencias.append({"colecao": colecao, "indice": nome, "situacao": "ausente"})
+            elif not _mesma_definicao(indice.document, existentes[nome]):
+                divergencias.append({"colecao": colecao, "indice": nome, "situacao": "definição diferente"})
+
+        for nome in existentes:
+            if nome != "_id_" and nome not in esperados:
+                divergencias.append({"colecao": colecao, "indice": nome, "situacao": "não declarado"})
+
+    return divergencias
+
+
+# ------------------ Backfills ------------------ #
+
+def backfill_busca(db, tamanho_lote=TAMANHO_LOTE):
+    """
+    Calcula o campo busca_tokens dos documentos já cadastrados, em lotes.
+    Só grava os documentos cujos termos mudaram, então pode ser repetido.
+    Retorna {colecao: documentos_atualizados}.
+    """
+    atualizados = {}
+    projecao = {campo: 1 for campo in CAMPOS_BUSCA + [CAMPO_TOKENS_BUSCA]}
+
+    for colecao in COLECOES_CATALOGO + [COLECAO_ACERVO]:
+        operacoes = []
+        atualizados[colecao] = 0
+
+        for doc in db[colecao].find({}, projecao, batch_size=tamanho_lote):
+            tokens = tokens_busca(doc)
+            if doc.get(CAMPO_TOKENS_BUSCA) != tokens:
+                operacoes.append(UpdateOne({"_id": doc["_id"]}, {"$set": {CAMPO_TOKENS_BUSCA: tokens}}))
+
+            if len(operacoes) >= tamanho_lote:
+                atualizados[colecao] += db[colecao].bulk_write(operacoes, ordered=False).modified_count
+                operacoes = []
+
+        if operacoes:
+            atualizados[colecao] += db[colecao].bulk_write(operacoes, ordered=False).modified_count
+
+    return atualizados
+
+
+def backfill_miniaturas(db, tamanho_lote=TAMANHO_LOTE):
+    """
+    Grava nos documentos já cadastrados o ID do arquivo no Drive e a URL
+    exibida das miniaturas (thumb_link e logotipo), em lotes, nas 12 coleções
+    e no acervo. Só grava os documentos cujos campos mudaram, então pode ser
+    repetido. Retorna {colecao: documentos_atualizados}.
+    """
+    atualizados = {}
+    projecao = {campo: 1 for origem, derivados in CAMPOS_MINIATURA.items() for campo in (origem, *derivados)}
+
+    for colecao in COLECOES_CATALOGO + [COLECAO_ACERVO]:
+        operacoes = []
+        atualizados[colecao] = 0
+
+        for doc in db[colecao].find({}, projecao, batch_size=tamanho_lote):
+            campos = campos_miniatura(doc)
+            if any(campo not in doc or doc[campo] != valor for campo, valor in campos.items()):
+                operacoes.append(UpdateOne({"_id": doc["_id"]}, {"$set": campos}))
+
+            if len(operacoes) >= tamanho_lote:
+                atualizados[colecao] += db[colecao].bulk_write(operacoes, ordered=False).modified_count
+                operacoes = []
+
+        if operacoes:
+            atualizados[colecao] += db[colecao].bulk_write(operacoes, ordered=False).modified_count
+
+    # Os snapshots e os cards em cache passam a ler os novos campos
+    if any(atualizados.values()):
+        incrementar_versao_catalogo(db)
+
+    return atualizados
+
+
+# ------------------ Consolidação do acervo ------------------ #
+
+def copiar_para_acervo(db, tamanho_lote=TAMANHO_LOTE):
+    """
+    Copia os documentos das 12 coleções para o acervo, substituindo pelo _id
+    (pode ser repetido), e remove do acervo os documentos que não existem mais
+    na origem. Deve rodar com a escrita dupla ativa, para que as escritas
+    feitas durante a cópia também cheguem ao acervo.
+    Retorna {colecao: {"copiados": n, "removidos": n}}.
+    """
+    acervo = db[COLECAO_ACERVO]
+    resumo = {}
+
+    for nome_colecao in COLECOES_CATALOGO:
+        operacoes, ids_origem = [], set()
+        resumo[nome_colecao] = {"copiados": 0, "removidos": 0}
+
+        for doc in db[nome_colecao].find({}, batch_size=tamanho_lote):
+            ids_origem.add(doc["_id"])
+            operacoes.append(ReplaceOne({"_id": doc["_id"]}, documento_acervo(doc, nome_colecao), upsert=True))
+
+            if len(operacoes) >= tamanho_lote:
+                acervo.bulk_write(operacoes, ordered=False)
+                resumo[nome_colecao]["copiados"] += len(operacoes)
+                operacoes = []
+
+        if operacoes:
+            acervo.bulk_write(operacoes, ordered=False)
+            resumo[nome_colecao]["copiados"] += len(operacoes)
+
+        sobrando = [
+            doc["_id"] for doc in acervo.find({"_colecao": nome_colecao}, {"_id": 1}, batch_size=tamanho_lote)
+            if doc["_id"] not in ids_origem
+        ]
+        if sobrando:
+            resumo[nome_colecao]["removidos"] = acervo.delete_many({"_id": {"$in": sobrando}}).deleted_count
+
+    return resumo
+
+
+def checksum_documento(doc):
+    """
+    SHA-256 do documento em JSON estendido com as chaves ordenadas, para que a
+    ordem dos campos gravados não altere o resultado.
+    """
+    return hashlib.sha256(json_util.dumps(doc, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def checksum_colecao(checksums):
+    """
+    Checksum de um conjunto de documentos ({_id: checksum}), independente da
+    ordem em que foram lidos.
+    """
+    soma = hashlib.sha256()
+    for id_doc in sorted(checksums, key=str):
+        soma.update(f"{id_doc}:{checksums[id_doc]}".encode("utf-8"))
+    return soma.hexdigest()
+
+
+def verificar_acervo(db, tamanho_lote=TAMANHO_LOTE):
+    """
+    Compara cada coleção de origem com a sua parte do acervo: quantidade de
+    documentos e checksum de cada documento (sem o campo `_colecao`).
+    Retorna uma lista com um dicionário por coleção: quantidades na origem e
+    no acervo, os _id ausentes no acervo, sobrando no acervo e com conteúdo
+    diferente, e os checksums das duas partes.
+    """
+    resultado = []
+
+    for nome_colecao in COLECOES_CATALOGO:
+        origem = {doc["_id"]: checksum_documento(doc) for doc in db[nome_colecao].find({}, batch_size=tamanho_lote)}
+
+        copia = {}
+        for doc in db[COLECAO_ACERVO].find({"_colecao": nome_colecao}, batch_size=tamanho_lote):
+            doc.pop("_colecao")
+            copia[doc["_id"]] = checksum_documento(doc)
+
+        resultado.append({
+            "colecao": nome_colecao,
+            "origem": len(origem),
+            "acervo": len(copia),
+            "ausentes": [id_doc for id_doc in origem if id_doc not in copia],
+            "sobrando": [id_doc for id_doc in copia if id_doc not in origem],
+            "diferentes": [id_doc for id_doc in origem if id_doc in copia and origem[id_doc] != copia[id_doc]],
+            "checksum_origem": checksum_colecao(origem),
+            "checksum_acervo": checksum_colecao(copia),
+        })
+
+    return resultado
+
+
+def acervo_consistente(verificacao):
+    return all(item["checksum_origem"] == item["checksum_acervo"] for item in verificacao)
+
+
+# ------------------ Linha de comando ------------------ #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrações de índices da Biblioteca Diálogos do Babaçu")
+    parser.add_argument("comando", choices=[
+        "aplicar", "verificar", "backfill-busca", "backfill-miniaturas", "reconstruir-facetas",
+        "acervo-copiar", "acervo-verificar", "acervo-fase"
+    ])
+    parser.add_argument("fase", nargs="?", choices=FASES_ACERVO, help="Nova fase (comando acervo-fase)")
+    parser.add_argument("--forcar", action="store_true", help="Troca para a fase acervo mesmo com divergências")
+    parser.add_argument("--uri", help="String de conexão do MongoDB")
+    parser.add_argument("--banco", help="Nome do banco de dados")
+    args = parser.parse_args(argv)
+
+    if args.comando == "acervo-fase" and not args.fase:
+        parser.error(f"informe a fase: {', '.join(FASES_ACERVO)}")
+
+    db = conectar_mongo_cli(args.uri, args.banco)
+
+    if args.comando == "aplicar":
+        mensagens, erros = aplicar_migracoes(db)
+        for mensagem in mensagens:
+            print(mensagem)
+        for erro in erros:
+            print(f"ERRO: {erro}", file=sys.stderr)
+        return 1 if erros else 0
+
+    if args.comando == "backfill-busca":
+        for colecao, quantidade in backfill_busca(db).items():
+            print(f"{colecao}: {quantidade} documento(s) atualizado(s)")
+        return 0
+
+    if args.comando == "backfill-miniaturas":
+        for colecao, quantidade in backfill_miniaturas(db).items():
+            print(f"{colecao}: {quantidade} documento(s) atualizado(s)")
+        return 0
+
+    if args.comando == "reconstruir-facetas":
+        for tema, quantidade in sorted(reconstruir_facetas(db).items()):
+            print(f"{tema}: {quantidade}")
+        return 0
+
+    if args.comando in ("acervo-copiar", "acervo-verificar", "acervo-fase"):
+        return comando_acervo(db, args)
+
+    divergencias = verificar_divergencias(db)
+    print(f"Versão aplicada: {versao_aplicada(db)} / declarada: {MIGRACOES[-1]['versao']}")
+    if not divergencias:
+        print("Nenhuma divergência entre os índices declarados e os do banco.")
+        return 0
+
+    for d in divergencias:
+        print(f"{d['colecao']}: {d['indice']} ({d['situacao']})")
+    return 1
+
+
+def comando_acervo(db, args):
+    if args.comando == "acervo-copiar":
+        if fase_acervo(db) == FASE_LEGADO:
+            print("ERRO: ative a escrita dupla antes da cópia (acervo-fase escrita_dupla).", file=sys.stderr)
+            return 1
+        for colecao, resumo in copiar_para_acervo(db).items():
+            print(f"{colecao}: {resumo['copiados']} copiado(s), {resumo['removidos']} removido(s) do acervo")
+        return 0
+
+    if args.comando == "acervo-fase":
+        if args.fase == FASE_ACERVO and not args.forcar:
+            if versao_aplicada(db) < 5:
+                print("ERRO: crie os índices do acervo antes da troca (python migracoes.py aplicar).", file=sys.stderr)
+                return 1
+            if not acervo_consistente(verificar_acervo(db)):
+                print("ERRO: o acervo diverge das coleções de origem (veja acervo-verificar).", file=sys.stderr)
+                return 1
+        definir_fase_acervo(db, args.fase)
+        # Os processos do app guardam a fase por alguns segundos: a cópia só
+        # pode começar depois que todos já estão fazendo a escrita dupla
+        print(f"Aguardando {INTERVALO_FASE_ACERVO} s para que o app perceba a troca...")
+        time.sleep(INTERVALO_FASE_ACERVO)
+        print(f"Fase do acervo: {args.fase}")
+        return 0
+
+    verificacao = verificar_acervo(db)
+    print(f"Fase do acervo: {fase_acervo(db)}")
+    for item in verificacao:
+        situacao = "ok" if item["checksum_origem"] == item["checksum_acervo"] else "DIVERGENTE"
+        print(
+            f"{item['colecao']}: origem {item['origem']} / acervo {item['acervo']} - {situacao}"
+            f" (ausentes: {len(item['ausentes'])}, sobrando: {len(item['sobrando'])},"
+            f" diferentes: {len(item['diferentes'])})"
+        )
+    return 0 if acervo_consistente(verificacao) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
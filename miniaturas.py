@@ -0,0 +1,189 @@
+# --------------------------------------------------------------
+# Cache local das miniaturas do Drive
+#
+# As miniaturas exibidas nos cards ficam em static/miniaturas/, servidas pelo
+# próprio Streamlit (server.enableStaticServing, em .streamlit/config.toml) em
+# app/static/miniaturas/<id>. Cada arquivo do Drive é buscado uma única vez:
+# na primeira exibição, o card ainda usa o link do Drive e o download é feito
+# em segundo plano; nas seguintes, o navegador recebe o endereço local.
+# As miniaturas geradas no Gerenciamento entram no cache já no envio.
+#
+# O diretório tem tamanho máximo; quando ele é ultrapassado, as miniaturas
+# usadas há mais tempo são apagadas (LRU).
+#
+# O Streamlit não permite configurar os cabeçalhos dos arquivos estáticos. O
+# servidor (Tornado) responde com ETag e Last-Modified e, quando a URL tem o
+# parâmetro `v`, com Cache-Control de 10 anos; o conteúdo de um arquivo do
+# Drive não muda, então os endereços levam `?v=<id>`.
+# --------------------------------------------------------------
+
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from catalogo import url_drive_miniatura
+
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_MINIATURAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "miniaturas")
+
+# Endereço do diretório no servidor do Streamlit
+URL_MINIATURAS = "app/static/miniaturas"
+
+TAMANHO_MAXIMO_PADRAO_MB = 500
+
+# Downloads simultâneos de miniaturas do Drive
+DOWNLOADS_SIMULTANEOS = 4
+
+TIMEOUT_DOWNLOAD = 15
+
+# IDs de arquivo do Drive (usados como nome do arquivo local)
+PADRAO_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+EXTENSOES_POR_TIPO = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+def baixar_do_drive(file_id):
+    """
+    Baixa a miniatura pública do arquivo no Drive. Retorna (conteúdo, extensão).
+    """
+    resposta = requests.get(url_drive_miniatura(file_id), timeout=TIMEOUT_DOWNLOAD)
+    resposta.raise_for_status()
+    tipo = resposta.headers.get("Content-Type", "").split(";")[0].strip()
+    if not tipo.startswith("image/"):
+        raise ValueError(f"O Drive não retornou uma imagem para {file_id} ({tipo or 'sem tipo'})")
+    return resposta.content, EXTENSOES_POR_TIPO.get(tipo, ".jpg")
+
+
+class CacheMiniaturas:
+    """
+    Miniaturas em disco, com tamanho máximo e descarte das menos usadas.
+    `baixar(file_id)` busca uma miniatura que não está no cache e retorna
+    (conteúdo, extensão); por padrão, do Drive.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_MINIATURAS, tamanho_maximo=TAMANHO_MAXIMO_PADRAO_MB * 1024 * 1024, baixar=baixar_do_drive):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self.baixar = baixar
+
+        self._trava = threading.Lock()
+        self._arquivos = OrderedDict()
+        self._tamanho_total = 0
+        self._pendentes = set()
+        self._executor = ThreadPoolExecutor(max_workers=DOWNLOADS_SIMULTANEOS, thread_name_prefix="miniaturas")
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._carregar_diretorio()
+
+    def _carregar_diretorio(self):
+        # Arquivos de execuções anteriores, dos menos para os mais recentes
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            file_id, extensao = os.path.splitext(entrada.name)
+            if entrada.is_file() and extensao != ".tmp":
+                estado = entrada.stat()
+                arquivos.append((estado.st_mtime, file_id, entrada.name, estado.st_size))
+
+        for _, file_id, nome, tamanho in sorted(arquivos):
+            # Um mesmo arquivo do Drive com duas extensões: fica o mais recente
+            if file_id in self._arquivos:
+                self._remover(*self._arquivos.pop(file_id))
+            self._arquivos[file_id] = (nome, tamanho)
+            self._tamanho_total += tamanho
+        self._descartar_excedente()
+
+    def _remover(self, nome, tamanho):
+        self._tamanho_total -= tamanho
+        try:
+            os.remove(os.path.join(self.diretorio, nome))
+        except FileNotFoundError:
+            pass
+
+    def _descartar_excedente(self):
+        while self._tamanho_total > self.tamanho_maximo and self._arquivos:
+            _, (nome, tamanho) = self._arquivos.popitem(last=False)
+            self._remover(nome, tamanho)
+
+    def _registrar(self, file_id, nome):
+        tamanho = os.path.getsize(os.path.join(self.diretorio, nome))
+        with self._trava:
+            if file_id in self._arquivos:
+                nome_anterior, tamanho_anterior = self._arquivos[file_id]
+                if nome_anterior == nome:
+                    self._tamanho_total -= tamanho_anterior
+                else:
+                    # Mesmo arquivo com outra extensão (prévia local em .png, Drive em .jpg)
+                    self._remover(nome_anterior, tamanho_anterior)
+                self._arquivos.move_to_end(file_id)
+            self._arquivos[file_id] = (nome, tamanho)
+            self._tamanho_total += tamanho
+            self._descartar_excedente()
+
+    # ------------------ Escrita ------------------ #
+
+    def guardar_arquivo(self, file_id, caminho_local):
+        """
+        Copia para o cache uma miniatura gerada localmente (envio pelo Gerenciamento).
+        """
+        if not PADRAO_ID.match(file_id):
+            return
+        nome = f"{file_id}{os.path.splitext(caminho_local)[1].lower() or '.png'}"
+        destino = os.path.join(self.diretorio, nome)
+        shutil.copyfile(caminho_local, f"{destino}.tmp")
+        os.replace(f"{destino}.tmp", destino)
+        self._registrar(file_id, nome)
+
+    def _baixar(self, file_id):
+        try:
+            conteudo, extensao = self.baixar(file_id)
+            nome = f"{file_id}{extensao}"
+            destino = os.path.join(self.diretorio, nome)
+            with open(f"{destino}.tmp", "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(f"{destino}.tmp", destino)
+            self._registrar(file_id, nome)
+        except Exception:
+            # O card continua usando o link do Drive; a próxima exibição tenta de novo
+            logger.exception("Erro ao baixar a miniatura %s", file_id)
+        finally:
+            with self._trava:
+                self._pendentes.discard(file_id)
+
+    # ------------------ Leitura ------------------ #
+
+    def url(self, file_id):
+        """
+        Endereço local da miniatura, ou None se ela ainda não está no cache
+        (nesse caso, o download é iniciado em segundo plano). Chamado a cada
+        exibição do card, o que mantém as miniaturas vistas no fim da fila de descarte.
+        """
+        if not file_id or not PADRAO_ID.match(file_id):
+            return None
+
+        with self._trava:
+            if file_id in self._arquivos:
+                self._arquivos.move_to_end(file_id)
+                return f"{URL_MINIATURAS}/{self._arquivos[file_id][0]}?v={file_id}"
+            if file_id in self._pendentes:
+                return None
+            self._pendentes.add(file_id)
+
+        self._executor.submit(self._baixar, file_id)
+        return None
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "miniaturas": len(self._arquivos),
+                "tamanho_mb": round(self._tamanho_total / (1024 * 1024), 1),
+                "tamanho_maximo_mb": round(self.tamanho_maximo / (1024 * 1024), 1),
+                "downloads_pendentes": len(self._pendentes),
+            }
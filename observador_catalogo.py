@@ -0,0 +1,294 @@
+# --------------------------------------------------------------
+# Índice do catálogo em memória, mantido por um change stream
+#
+# Uma thread em segundo plano acompanha as coleções lidas pelo catálogo (as 12
+# coleções de origem ou, depois da troca, a coleção acervo) com um único
+# db.watch() e aplica cada inserção, atualização e exclusão ao índice em
+# memória. Com o índice ativo, a Biblioteca lê os cards dele, sem consultar
+# o MongoDB a cada execução da página.
+#
+# O resume token só é guardado em memória, para reabrir o stream após uma
+# falha. Ao reiniciar o app, o stream é aberto no momento atual e o índice é
+# sempre recarregado por inteiro.
+#
+# Change streams exigem um replica set (um nó local já basta para testes).
+# --------------------------------------------------------------
+
+import copy
+import logging
+import threading
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from catalogo import (
+    CAMPO_TOKENS_BUSCA,
+    CAMPOS_CARD,
+    CAMPOS_CARD_POR_TIPO,
+    CAMPOS_LISTA_CARD,
+    COLECAO_ACERVO,
+    TAMANHO_DESCRICAO_CARD,
+    buscar_arquivos,
+    chave_paginacao,
+    colecoes_leitura,
+    separar_termos,
+    temas_do_documento,
+    tokens_busca,
+    unir_lista
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Campo interno do índice com os temas do documento (o campo tema fica como texto, para o card)
+CAMPO_TEMAS = "_temas"
+
+# Código de erro do servidor quando o resume token já saiu do oplog
+CODIGO_HISTORICO_PERDIDO = 286
+
+# Espera entre tentativas de reabrir o change stream após uma falha (segundos)
+ESPERA_RECONEXAO = 5
+
+
+def ordem_listagem(chave):
+    """
+    Chave de ordenação de (data_upload, _id) em que os documentos sem
+    data_upload ficam depois de todos os outros na ordem decrescente.
+    """
+    data_upload, id_doc = chave
+    return data_upload is not None, data_upload or 0, id_doc
+
+
+class IndiceCatalogo:
+    """
+    Cópia em memória dos campos de card de todo o acervo, com filtros por
+    tipo, tema e termos (prefixo dos termos normalizados) e paginação por keyset.
+    """
+
+    def __init__(self):
+        self._docs = {}
+        # Documentos na ordem da listagem, refeita só quando o índice muda
+        self._ordenados = None
+        self._trava = threading.Lock()
+        self.versao = 0
+        self.ativo = False
+
+    @staticmethod
+    def _resumir(doc, colecao):
+        """
+        Mantém só os campos exibidos nos cards (no formato da projeção do card),
+        a chave de paginação, os temas e os termos de busca.
+        """
+        campos = CAMPOS_CARD + CAMPOS_CARD_POR_TIPO.get(doc.get("tipo"), []) + ["descricao"]
+        resumo = {campo: doc[campo] for campo in campos if campo in doc}
+        resumo["_id"] = doc["_id"]
+        resumo["_colecao"] = colecao
+        resumo[CAMPO_TOKENS_BUSCA] = doc.get(CAMPO_TOKENS_BUSCA) or tokens_busca(doc)
+        resumo[CAMPO_TEMAS] = temas_do_documento(doc)
+
+        for campo in CAMPOS_LISTA_CARD:
+            if campo in resumo:
+                resumo[campo] = unir_lista(resumo[campo])
+
+        descricao = resumo.get("descricao")
+        if isinstance(descricao, str) and len(descricao) > TAMANHO_DESCRICAO_CARD:
+            resumo["descricao"] = descricao[:TAMANHO_DESCRICAO_CARD] + "…"
+
+        return resumo
+
+    def carregar(self, db):
+        """
+        Substitui o conteúdo do índice por todo o acervo (uma única agregação).
+        Os documentos são indexados pelo _id, único entre as 12 coleções (é
+        também a chave do acervo consolidado).
+        """
+        docs = {doc["_id"]: self._resumir(doc, doc["_colecao"]) for doc in buscar_arquivos(db)}
+        with self._trava:
+            self._docs = docs
+            self._ordenados = None
+            self.versao += 1
+
+    def aplicar(self, evento):
+        """
+        Aplica um evento do change stream. Inserções, substituições e
+        atualizações trazem o documento completo (full_document="updateLookup").
+        """
+        chave = evento["documentKey"]["_id"]
+        documento = evento.get("fullDocument")
+
+        # No acervo consolidado, a coleção de origem vem gravada no documento
+        colecao = evento["ns"]["coll"]
+        if colecao == COLECAO_ACERVO and documento is not None:
+            colecao = documento.get("_colecao")
+
+        with self._trava:
+            if evento["operationType"] == "delete" or documento is None:
+                self._docs.pop(chave, None)
+            else:
+                self._docs[chave] = self._resumir(documento, colecao)
+            self._ordenados = None
+            self.versao += 1
+
+    # ------------------ Leitura ------------------ #
+
+    def _em_ordem(self):
+        # Chamado com a trava. Mesma ordenação da consulta ao banco
+        if self._ordenados is None:
+            self._ordenados = sorted(self._docs.values(), key=lambda doc: ordem_listagem(chave_paginacao(doc)), reverse=True)
+        return self._ordenados
+
+    def _filtrar(self, tipos=None, temas=None, texto=None):
+        """
+        Documentos que atendem aos filtros, na ordem da listagem.
+        """
+        termos = separar_termos(texto) if texto else []
+
+        def atende(doc):
+            if tipos and doc.get("tipo") not in tipos:
+                return False
+            if temas and not doc[CAMPO_TEMAS] & set(temas):
+                return False
+            tokens = doc[CAMPO_TOKENS_BUSCA]
+            return all(any(token.startswith(termo) for token in tokens) for termo in termos)
+
+        with self._trava:
+            return [doc for doc in self._em_ordem() if atende(doc)]
+
+    def contar(self, tipos=None, temas=None, texto=None):
+        return len(self._filtrar(tipos, temas, texto))
+
+    def buscar(self, tipos=None, temas=None, texto=None, limite=None, apos=None):
+        """
+        Mesma ordenação da consulta ao banco: data_upload desc, _id desc,
+        com documentos sem data_upload no fim.
+        """
+        docs = self._filtrar(tipos, temas, texto)
+
+        if apos:
+            docs = [doc for doc in docs if ordem_listagem(chave_paginacao(doc)) < ordem_listagem(apos)]
+
+        if limite:
+            docs = docs[:limite]
+
+        return copy.deepcopy(docs)
+
+    def contar_facetas(self, texto=None):
+        facetas = {"tipo": {}, "tema": {}}
+        for doc in self._filtrar(texto=texto):
+            tipo = doc.get("tipo")
+            if tipo:
+                facetas["tipo"][tipo] = facetas["tipo"].get(tipo, 0) + 1
+            for tema in doc[CAMPO_TEMAS]:
+                facetas["tema"][tema] = facetas["tema"].get(tema, 0) + 1
+        return facetas
+
+    def temas(self):
+        with self._trava:
+            return sorted({tema for doc in self._docs.values() for tema in doc[CAMPO_TEMAS]})
+
+
+class ObservadorCatalogo(threading.Thread):
+    """
+    Thread que mantém o IndiceCatalogo atualizado com um change stream sobre o
+    banco, filtrado para as coleções do acervo. O stream é aberto no momento
+    atual, antes da carga completa; após uma falha, é reaberto a partir do
+    último evento aplicado (resume token em memória). Nada é gravado no banco.
+    """
+
+    def __init__(self, db, indice):
+        super().__init__(name="observador-catalogo", daemon=True)
+        self.db = db
+        self.indice = indice
+        self.colecoes = None
+        self.parar = threading.Event()
+
+    # ------------------ Change stream ------------------ #
+
+    def abrir_stream(self, token=None):
+        # Acompanha as coleções lidas pelo catálogo na fase atual
+        colecoes = colecoes_leitura(self.db)
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": colecoes},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+        }}]
+        stream = self.db.watch(pipeline, full_document="updateLookup", resume_after=token)
+        self.colecoes = colecoes
+        return stream
+
+    def iniciar(self):
+        """
+        Abre o change stream no momento atual e só então carrega o acervo:
+        alterações feitas durante a carga chegam pelo stream e nenhuma se perde.
+        Reaplicar uma delas sobre a carga apenas grava o mesmo estado.
+        Retorna False se o servidor não suporta change streams.
+        """
+        try:
+            self.stream = self.abrir_stream()
+            self.indice.carregar(self.db)
+        except PyMongoError as e:
+            logger.warning("Change stream indisponível, índice em memória desativado: %s", e)
+            return False
+
+        self.indice.ativo = True
+        self.start()
+        return True
+
+    def run(self):
+        while not self.parar.is_set():
+            trocou_fase = False
+            try:
+                with self.stream:
+                    while self.stream.alive and not self.parar.is_set():
+                        evento = self.stream.try_next()
+                        if evento is None:
+                            # A fase fica em cache por alguns segundos; a consulta é barata
+                            trocou_fase = colecoes_leitura(self.db) != self.colecoes
+                            if trocou_fase:
+                                break
+                            continue
+                        self.indice.aplicar(evento)
+
+                if trocou_fase:
+                    logger.info("Fase do acervo alterada; recarregando o índice do catálogo")
+                    self._reabrir(recarregar=True)
+                    continue
+
+            except OperationFailure as e:
+                # Histórico perdido: o índice pode ter perdido eventos, então é recarregado
+                if e.code == CODIGO_HISTORICO_PERDIDO:
+                    logger.warning("Resume token fora do oplog; recarregando o índice do catálogo")
+                    self._reabrir(recarregar=True)
+                    continue
+                logger.exception("Erro no change stream do catálogo")
+
+            except PyMongoError:
+                logger.exception("Erro no change stream do catálogo")
+
+            if self.parar.is_set():
+                break
+
+            # Reabre a partir do último evento aplicado
+            time.sleep(ESPERA_RECONEXAO)
+            self._reabrir(token=self.stream.resume_token)
+
+    def _reabrir(self, token=None, recarregar=False):
+        """
+        Reabre o stream a partir de `token` (ou do momento atual). Se o token já
+        saiu do oplog, abre no momento atual e recarrega o índice. O índice
+        também é recarregado se a fase do acervo mudou desde a última abertura.
+        """
+        colecoes_anteriores = self.colecoes
+        try:
+            try:
+                self.stream = self.abrir_stream(token)
+            except OperationFailure as e:
+                if token is None or e.code != CODIGO_HISTORICO_PERDIDO:
+                    raise
+                logger.warning("Resume token fora do oplog; recarregando o índice do catálogo")
+                self.stream = self.abrir_stream()
+                recarregar = True
+
+            if recarregar or self.colecoes != colecoes_anteriores:
+                self.indice.carregar(self.db)
+        except PyMongoError:
+            logger.exception("Não foi possível reabrir o change stream do catálogo")
@@ -0,0 +1,266 @@
+# --------------------------------------------------------------
+# Rastreamento do tempo das fases de cada página
+#
+# Ativado pela variável de ambiente BABACU_RASTREAMENTO:
+#   BABACU_RASTREAMENTO=1 streamlit run login.py                  -> grava em rastreamento.jsonl
+#   BABACU_RASTREAMENTO=/tmp/fases.jsonl streamlit run login.py   -> grava no arquivo indicado
+#
+# As páginas marcam as fases com `with fase("consulta"):` (ou @medir("consulta")
+# em funções). Cada fase medida
+# vira uma linha do arquivo JSONL (página, fase, início e duração), e os
+# percentis p50/p95/p99 de cada fase ficam disponíveis em memória, no painel
+# Sistema do Gerenciamento. Sem a variável, fase() devolve sempre o mesmo
+# objeto vazio e não mede nada.
+#
+# Resumo de um arquivo gravado:
+#   python rastreamento.py rastreamento.jsonl
+# --------------------------------------------------------------
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+
+VARIAVEL_AMBIENTE = "BABACU_RASTREAMENTO"
+
+# Arquivo usado quando a variável vale apenas "1"
+ARQUIVO_PADRAO = "rastreamento.jsonl"
+
+# Durações mantidas em memória por fase, para os percentis do painel
+MAX_AMOSTRAS_POR_FASE = 10000
+
+# Sessões com a página atual guardada (as mais antigas são esquecidas)
+MAX_SESSOES = 1000
+
+# Página das fases medidas fora de uma sessão (threads em segundo plano)
+PAGINA_SEGUNDO_PLANO = "Segundo plano"
+
+
+def _sessao_atual():
+    # Importado aqui para que o módulo não dependa do Streamlit (é usado pelo catalogo.py)
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    contexto = get_script_run_ctx(suppress_warning=True)
+    return contexto.session_id if contexto else None
+
+
+def percentis(duracoes):
+    """
+    Quantidade, p50, p95, p99 e máximo de uma lista de durações (ms).
+    """
+    duracoes = sorted(duracoes)
+    if len(duracoes) == 1:
+        p50 = p95 = p99 = duracoes[0]
+    else:
+        cortes = statistics.quantiles(duracoes, n=100, method="inclusive")
+        p50, p95, p99 = cortes[49], cortes[94], cortes[98]
+    return {
+        "quantidade": len(duracoes),
+        "p50_ms": round(p50, 2),
+        "p95_ms": round(p95, 2),
+        "p99_ms": round(p99, 2),
+        "max_ms": round(duracoes[-1], 2),
+    }
+
+
+class Rastreador:
+    """
+    Recebe as durações das fases, grava cada uma no arquivo JSONL e mantém as
+    últimas MAX_AMOSTRAS_POR_FASE de cada (página, fase) para os percentis.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        self._amostras = defaultdict(lambda: deque(maxlen=MAX_AMOSTRAS_POR_FASE))
+        self._paginas = {}
+        self._arquivo = open(caminho, "a", encoding="utf-8", buffering=1)
+        atexit.register(self.fechar)
+
+    def definir_pagina(self, sessao, pagina):
+        with self._trava:
+            self._paginas.pop(sessao, None)
+            self._paginas[sessao] = pagina
+            if len(self._paginas) > MAX_SESSOES:
+                del self._paginas[next(iter(self._paginas))]
+
+    def registrar(self, nome, inicio, duracao_ms):
+        # Callbacks de widgets rodam antes do login.py e ficam com a página da execução anterior.
+        # Uma sessão sem página definida ainda está na tela de login.
+        sessao = _sessao_atual()
+        if sessao is None:
+            pagina = PAGINA_SEGUNDO_PLANO
+        else:
+            pagina = self._paginas.get(sessao) or "Login"
+        linha = json.dumps({
+            "pagina": pagina,
+            "fase": nome,
+            "inicio": round(inicio, 3),
+            "duracao_ms": round(duracao_ms, 3),
+            "pid": os.getpid(),
+        }, ensure_ascii=False)
+
+        with self._trava:
+            self._amostras[(pagina, nome)].append(duracao_ms)
+            if not self._arquivo.closed:
+                self._arquivo.write(linha + "\n")
+
+    def resumo(self):
+        """
+        Percentis de cada (página, fase), na ordem em que foram medidas pela primeira vez.
+        """
+        with self._trava:
+            amostras = {chave: list(duracoes) for chave, duracoes in self._amostras.items()}
+        return [
+            {"pagina": pagina, "fase": nome, **percentis(duracoes)}
+            for (pagina, nome), duracoes in amostras.items()
+        ]
+
+    def fechar(self):
+        with self._trava:
+            self._arquivo.close()
+
+
+class Fase:
+    """
+    Mede o tempo do bloco `with` e o registra no rastreador, mesmo que o bloco
+    termine com exceção (st.rerun() e st.stop() também são exceções).
+    """
+    __slots__ = ("nome", "inicio", "_contador")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.time()
+        self._contador = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        _rastreador.registrar(self.nome, self.inicio, (time.perf_counter() - self._contador) * 1000)
+        return False
+
+
+class _SemRastreamento:
+    """
+    Usado quando o rastreamento está desativado: não mede nada.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+
+_SEM_RASTREAMENTO = _SemRastreamento()
+
+
+def _criar_rastreador():
+    valor = os.environ.get(VARIAVEL_AMBIENTE, "").strip()
+    if valor.lower() in ("", "0", "false", "nao", "não"):
+        return None
+    return Rastreador(ARQUIVO_PADRAO if valor.lower() in ("1", "true", "sim") else valor)
+
+
+# Um rastreador por processo, criado na primeira importação do módulo
+_rastreador = _criar_rastreador()
+
+
+def rastreamento_ativo():
+    return _rastreador is not None
+
+
+def rastreamento_arquivo():
+    return _rastreador.caminho if _rastreador is not None else None
+
+
+def fase(nome):
+    """
+    Bloco medido: `with fase("consulta"): ...`. A página é a definida por
+    definir_pagina() para a sessão atual.
+    """
+    if _rastreador is None:
+        return _SEM_RASTREAMENTO
+    return Fase(nome)
+
+
+def medir(nome):
+    """
+    Decorador: mede cada chamada da função como a fase `nome`. Com o
+    rastreamento desativado, devolve a própria função.
+    """
+    def decorar(funcao):
+        if _rastreador is None:
+            return funcao
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            with Fase(nome):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorar
+
+
+def definir_pagina(pagina):
+    """
+    Página atribuída às próximas fases medidas nesta sessão (chamada pelo
+    login.py antes de executar a página escolhida).
+    """
+    if _rastreador is not None:
+        _rastreador.definir_pagina(_sessao_atual(), pagina)
+
+
+def resumo_fases():
+    return _rastreador.resumo() if _rastreador is not None else []
+
+
+# ------------------ Resumo de arquivos gravados ------------------ #
+
+def resumir_arquivos(caminhos):
+    """
+    Percentis de cada (página, fase) dos arquivos JSONL gravados pelo
+    rastreador. As durações de vários arquivos (um por processo) são somadas.
+    """
+    duracoes = defaultdict(list)
+    for caminho in caminhos:
+        with open(caminho, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                if linha.strip():
+                    registro = json.loads(linha)
+                    duracoes[(registro["pagina"], registro["fase"])].append(registro["duracao_ms"])
+    return [{"pagina": pagina, "fase": nome, **percentis(valores)} for (pagina, nome), valores in duracoes.items()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Percentis das fases gravadas pelo rastreamento das páginas")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos JSONL gravados com BABACU_RASTREAMENTO")
+    parser.add_argument("--json", action="store_true", help="Imprime o resumo em JSON")
+    args = parser.parse_args(argv)
+
+    resumo = resumir_arquivos(args.arquivos)
+    resumo.sort(key=lambda item: (item["pagina"], item["fase"]))
+
+    if args.json:
+        print(json.dumps(resumo, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"{'Página':<20} {'Fase':<24} {'n':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'máx ms':>10}")
+    for item in resumo:
+        print(
+            f"{item['pagina']:<20} {item['fase']:<24} {item['quantidade']:>7} "
+            f"{item['p50_ms']:>10} {item['p95_ms']:>10} {item['p99_ms']:>10} {item['max_ms']:>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# --------------------------------------------------------------
+# Paginação por keyset, projeção dos cards e busca textual (catalogo.py)
+# --------------------------------------------------------------
+
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from catalogo import (
+    COLECAO_ACERVO,
+    COLECOES_CATALOGO,
+    ORDEM_DATA,
+    ORDEM_RELEVANCIA,
+    PROJECOES_CARD,
+    chave_paginacao,
+    filtro_apos,
+    montar_pipeline_catalogo,
+    projecao_card
+)
+
+
+def paginar(colecao, tamanho, por_relevancia=False):
+    """
+    Lê a coleção página a página, como a Biblioteca, e retorna os _id na ordem.
+    """
+    ordem = list((ORDEM_RELEVANCIA if por_relevancia else ORDEM_DATA).items())
+    lidos, apos = [], None
+    while True:
+        filtro = filtro_apos(apos, por_relevancia) if apos else {}
+        pagina = list(colecao.find(filtro).sort(ordem).limit(tamanho))
+        if not pagina:
+            return lidos
+        lidos.extend(doc["_id"] for doc in pagina)
+        apos = chave_paginacao(pagina[-1], por_relevancia)
+
+
+@pytest.fixture
+def colecao():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient().db.publicacoes
+
+
+# ------------------ filtro_apos / chave_paginacao ------------------ #
+
+def test_filtro_apos_com_data():
+    data, id_doc = datetime(2024, 5, 1), ObjectId()
+    assert filtro_apos((data, id_doc)) == {"$or": [
+        {"data_upload": {"$lt": data}},
+        {"data_upload": data, "_id": {"$lt": id_doc}},
+        {"data_upload": None}
+    ]}
+
+
+def test_filtro_apos_sem_data_so_percorre_os_sem_data():
+    id_doc = ObjectId()
+    assert filtro_apos((None, id_doc)) == {"data_upload": None, "_id": {"$lt": id_doc}}
+
+
+def test_filtro_apos_por_relevancia():
+    id_doc = ObjectId()
+    filtro = filtro_apos((1.5, id_doc), por_relevancia=True)
+    assert filtro["$or"][0] == {"_relevancia": {"$lt": 1.5}}
+    assert filtro["$or"][1] == {"_relevancia": 1.5, "_id": {"$lt": id_doc}}
+
+
+def test_chave_paginacao():
+    id_doc = ObjectId()
+    assert chave_paginacao({"_id": id_doc}) == (None, id_doc)
+    assert chave_paginacao({"_id": id_doc, "_relevancia": 2.0}, por_relevancia=True) == (2.0, id_doc)
+
+
+@pytest.mark.parametrize("tamanho", [1, 3, 4, 10])
+def test_paginas_cobrem_a_ordem_completa(colecao, tamanho):
+    inicio = datetime(2024, 1, 1)
+    # Datas repetidas (a página pode terminar no meio de um empate) e documentos sem data
+    docs = [{"_id": ObjectId(), "data_upload": inicio + timedelta(days=i // 2)} for i in range(7)]
+    docs += [{"_id": ObjectId()} for _ in range(3)]
+    colecao.insert_many(docs)
+
+    esperado = [doc["_id"] for doc in sorted(
+        docs, key=lambda doc: (doc.get("data_upload") is not None, doc.get("data_upload") or 0, doc["_id"]), reverse=True
+    )]
+    lidos = paginar(colecao, tamanho)
+
+    assert lidos == esperado
+    # Os documentos sem data_upload ficam no fim
+    assert set(lidos[-3:]) == {doc["_id"] for doc in docs[7:]}
+
+
+def test_paginas_por_relevancia(colecao):
+    docs = [{"_id": ObjectId(), "_relevancia": relevancia} for relevancia in [2.0, 1.0, 2.0, 0.5, 1.0]]
+    colecao.insert_many(docs)
+
+    esperado = [doc["_id"] for doc in sorted(docs, key=lambda doc: (doc["_relevancia"], doc["_id"]), reverse=True)]
+    assert paginar(colecao, 2, por_relevancia=True) == esperado
+
+
+# ------------------ Pipeline do catálogo ------------------ #
+
+def test_pipeline_junta_as_colecoes_e_ordena():
+    pipeline = montar_pipeline_catalogo(query={"tipo": "Publicação"}, limite=24)
+
+    unioes = [etapa["$unionWith"]["coll"] for etapa in pipeline if "$unionWith" in etapa]
+    assert unioes == COLECOES_CATALOGO[1:]
+    assert pipeline[0] == {"$match": {"tipo": "Publicação"}}
+    assert pipeline[-2:] == [{"$sort": ORDEM_DATA}, {"$limit": 24}]
+
+    # Cada coleção já chega ordenada e limitada, com a coleção de origem
+    etapas_imagens = next(
+        etapa["$unionWith"]["pipeline"] for etapa in pipeline
+        if "$unionWith" in etapa and etapa["$unionWith"]["coll"] == "imagens"
+    )
+    assert {"$sort": ORDEM_DATA} in etapas_imagens and {"$limit": 24} in etapas_imagens
+    assert etapas_imagens[-1] == {"$addFields": {"_colecao": "imagens"}}
+
+
+def test_pipeline_com_cursor_filtra_em_cada_colecao():
+    apos = (datetime(2024, 5, 1), ObjectId())
+    pipeline = montar_pipeline_catalogo(query={"tipo": "Vídeo"}, limite=10, apos=apos)
+
+    assert pipeline[0] == {"$match": {"$and": [{"tipo": "Vídeo"}, filtro_apos(apos)]}}
+    for etapa in pipeline:
+        if "$unionWith" in etapa:
+            assert etapa["$unionWith"]["pipeline"][0] == {"$match": {"$and": [{"tipo": "Vídeo"}, filtro_apos(apos)]}}
+
+
+def test_pipeline_do_acervo_consolidado():
+    pipeline = montar_pipeline_catalogo(limite=5, para_card=True, colecoes=[COLECAO_ACERVO])
+
+    assert not any("$unionWith" in etapa for etapa in pipeline)
+    # `_colecao` vem gravado no documento, só é projetado
+    assert {"$project": PROJECOES_CARD[COLECAO_ACERVO]} in pipeline
+    assert not any("$addFields" in etapa for etapa in pipeline)
+
+
+def test_pipeline_da_busca_textual():
+    apos = (1.5, ObjectId())
+    pipeline = montar_pipeline_catalogo(limite=10, apos=apos, texto="babaçu")
+
+    assert pipeline[0] == {"$match": {"$text": {"$search": "babaçu", "$language": "portuguese"}}}
+    assert pipeline[1] == {"$addFields": {"_relevancia": {"$meta": "textScore"}}}
+    # O cursor por relevância só pode ser aplicado depois do cálculo da relevância
+    assert pipeline[2] == {"$match": filtro_apos(apos, por_relevancia=True)}
+    assert pipeline[-2:] == [{"$sort": ORDEM_RELEVANCIA}, {"$limit": 10}]
+
+
+def test_busca_textual_mantem_a_relevancia_na_projecao():
+    pipeline = montar_pipeline_catalogo(limite=10, para_card=True, texto="babaçu")
+    projecao = next(etapa["$project"] for etapa in pipeline if "$project" in etapa)
+    assert projecao["_relevancia"] == 1
+
+
+# ------------------ Projeção dos cards ------------------ #
+
+def test_projecao_card_so_com_campos_exibidos():
+    projecao = projecao_card("Publicação")
+
+    assert projecao["titulo"] == 1 and projecao["data_upload"] == 1
+    assert "logotipo_url" not in projecao and "subfolder_id" not in projecao
+    # Descrição cortada e listas unidas no servidor
+    assert "$cond" in projecao["descricao"]
+    assert "$cond" in projecao["tema"] and "$cond" in projecao["organizacao"]
+
+
+def test_projecao_card_com_campos_do_tipo():
+    projecao = projecao_card("Organização")
+    for campo in ["logotipo_file_id", "logotipo_url", "sigla", "websites", "subfolder_id"]:
+        assert projecao[campo] == 1
+    assert projecao_card("Pesquisa")["subfolder_id"] == 1
+
+
+def test_projecao_do_acervo_inclui_todos_os_tipos():
+    projecao = PROJECOES_CARD[COLECAO_ACERVO]
+    assert projecao["_colecao"] == 1
+    assert projecao["logotipo_url"] == 1 and projecao["subfolder_id"] == 1
@@ -0,0 +1,155 @@
+# --------------------------------------------------------------
+# Cache local das miniaturas (miniaturas.CacheMiniaturas), com um Drive falso
+# --------------------------------------------------------------
+
+import os
+import time
+
+import pytest
+
+from miniaturas import URL_MINIATURAS, CacheMiniaturas
+
+
+class DriveFalso:
+    """
+    Substitui baixar_do_drive: conteúdo de `tamanho` bytes e extensão fixa.
+    """
+
+    def __init__(self, tamanho=100, extensao=".jpg"):
+        self.tamanho = tamanho
+        self.extensao = extensao
+        self.baixados = []
+
+    def __call__(self, file_id):
+        self.baixados.append(file_id)
+        return b"x" * self.tamanho, self.extensao
+
+
+def aguardar_downloads(cache, timeout=5):
+    limite = time.monotonic() + timeout
+    while cache.estatisticas()["downloads_pendentes"]:
+        assert time.monotonic() < limite, "downloads não terminaram"
+        time.sleep(0.01)
+
+
+def baixar(cache, *file_ids):
+    for file_id in file_ids:
+        cache.url(file_id)
+    aguardar_downloads(cache)
+
+
+@pytest.fixture
+def drive():
+    return DriveFalso()
+
+
+@pytest.fixture
+def cache(tmp_path, drive):
+    return CacheMiniaturas(str(tmp_path), tamanho_maximo=1000, baixar=drive)
+
+
+# ------------------ Leitura ------------------ #
+
+def test_primeira_exibicao_baixa_e_a_seguinte_usa_o_arquivo_local(cache, drive):
+    assert cache.url("abc") is None
+    aguardar_downloads(cache)
+
+    assert cache.url("abc") == f"{URL_MINIATURAS}/abc.jpg?v=abc"
+    assert drive.baixados == ["abc"]
+    assert os.path.exists(os.path.join(cache.diretorio, "abc.jpg"))
+
+
+def test_ids_invalidos_nao_sao_baixados(cache, drive):
+    assert cache.url(None) is None
+    assert cache.url("../segredo") is None
+    assert drive.baixados == []
+
+
+def test_falha_no_download_tenta_de_novo(tmp_path):
+    tentativas = []
+
+    def baixar_com_falha(file_id):
+        tentativas.append(file_id)
+        if len(tentativas) == 1:
+            raise OSError("Drive fora do ar")
+        return b"x", ".png"
+
+    cache = CacheMiniaturas(str(tmp_path), baixar=baixar_com_falha)
+    baixar(cache, "abc")
+    assert cache.url("abc") is None
+    aguardar_downloads(cache)
+    assert cache.url("abc") == f"{URL_MINIATURAS}/abc.png?v=abc"
+
+
+# ------------------ Descarte (LRU) ------------------ #
+
+def test_descarta_as_menos_usadas_acima_do_tamanho_maximo(cache):
+    # 100 bytes cada, máximo de 1000
+    ids = [f"id{i}" for i in range(12)]
+    baixar(cache, *ids)
+
+    estatisticas = cache.estatisticas()
+    assert estatisticas["miniaturas"] == 10
+    assert sorted(os.listdir(cache.diretorio)) == sorted(f"{file_id}.jpg" for file_id in ids[2:])
+
+
+def test_cada_exibicao_renova_a_miniatura(cache):
+    ids = [f"id{i}" for i in range(10)]
+    baixar(cache, *ids)
+
+    # A mais antiga volta a ser exibida, sem download
+    assert cache.url("id0") is not None
+    baixar(cache, "novo")
+
+    assert cache.url("id0") is not None
+    assert not os.path.exists(os.path.join(cache.diretorio, "id1.jpg"))
+
+
+# ------------------ Envio pelo Gerenciamento ------------------ #
+
+def test_guardar_arquivo_dispensa_o_download(cache, drive, tmp_path):
+    local = tmp_path / "gerada.PNG"
+    local.write_bytes(b"y" * 50)
+
+    cache.guardar_arquivo("abc", str(local))
+
+    assert cache.url("abc") == f"{URL_MINIATURAS}/abc.png?v=abc"
+    assert drive.baixados == []
+
+
+def test_mesmo_id_com_outra_extensao_substitui_o_arquivo(cache, tmp_path):
+    local = tmp_path / "gerada.png"
+    local.write_bytes(b"y" * 50)
+    cache.guardar_arquivo("abc", str(local))
+
+    # A mesma miniatura chega do Drive como .jpg
+    cache._baixar("abc")
+
+    assert not os.path.exists(os.path.join(cache.diretorio, "abc.png"))
+    assert cache.url("abc") == f"{URL_MINIATURAS}/abc.jpg?v=abc"
+    assert cache.estatisticas()["miniaturas"] == 1
+    assert cache._tamanho_total == 100
+
+
+# ------------------ Reinício ------------------ #
+
+def test_reinicio_reaproveita_o_diretorio(tmp_path, drive):
+    baixar(CacheMiniaturas(str(tmp_path), baixar=drive), "abc")
+
+    reiniciado = CacheMiniaturas(str(tmp_path), baixar=drive)
+    assert reiniciado.url("abc") == f"{URL_MINIATURAS}/abc.jpg?v=abc"
+    assert drive.baixados == ["abc"]
+
+
+def test_reinicio_mantem_um_arquivo_por_id(tmp_path, drive):
+    antigo, recente = tmp_path / "abc.png", tmp_path / "abc.jpg"
+    antigo.write_bytes(b"y" * 50)
+    recente.write_bytes(b"x" * 100)
+    os.utime(antigo, (1000, 1000))
+    os.utime(recente, (2000, 2000))
+
+    cache = CacheMiniaturas(str(tmp_path), baixar=drive)
+
+    assert os.listdir(tmp_path) == ["abc.jpg"]
+    assert cache._tamanho_total == 100
+    assert cache.url("abc") == f"{URL_MINIATURAS}/abc.jpg?v=abc"
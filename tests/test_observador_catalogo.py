@@ -0,0 +1,161 @@
+# --------------------------------------------------------------
+# Índice do catálogo em memória (observador_catalogo.IndiceCatalogo)
+#
+# Os eventos são montados no formato do change stream; o stream em si exige
+# um replica set e não é testado aqui.
+# --------------------------------------------------------------
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from observador_catalogo import IndiceCatalogo
+
+
+def evento(operacao, doc=None, colecao="publicacoes", id_doc=None):
+    evento = {
+        "operationType": operacao,
+        "ns": {"db": "dialogos_babacu", "coll": colecao},
+        "documentKey": {"_id": id_doc if id_doc is not None else doc["_id"]}
+    }
+    if doc is not None:
+        evento["fullDocument"] = doc
+    return evento
+
+
+def documento(titulo, dia=None, tema=None, tipo="Publicação", **campos):
+    doc = {"_id": ObjectId(), "tipo": tipo, "titulo": titulo, **campos}
+    if dia is not None:
+        doc["data_upload"] = datetime(2024, 1, dia)
+    if tema is not None:
+        doc["tema"] = tema
+    return doc
+
+
+@pytest.fixture
+def indice():
+    return IndiceCatalogo()
+
+
+def titulos(docs):
+    return [doc["titulo"] for doc in docs]
+
+
+# ------------------ Eventos ------------------ #
+
+def test_insercao_atualizacao_e_exclusao(indice):
+    doc = documento("Babaçu", dia=1)
+    indice.aplicar(evento("insert", doc))
+    assert titulos(indice.buscar()) == ["Babaçu"]
+    assert indice.buscar()[0]["_colecao"] == "publicacoes"
+
+    indice.aplicar(evento("update", {**doc, "titulo": "Coco babaçu"}))
+    assert titulos(indice.buscar()) == ["Coco babaçu"]
+
+    indice.aplicar(evento("delete", id_doc=doc["_id"]))
+    assert indice.buscar() == []
+
+
+def test_cada_evento_muda_a_versao(indice):
+    doc = documento("Babaçu", dia=1)
+    versoes = [indice.versao]
+    for e in [evento("insert", doc), evento("replace", doc), evento("delete", id_doc=doc["_id"])]:
+        indice.aplicar(e)
+        versoes.append(indice.versao)
+    assert versoes == sorted(set(versoes))
+
+
+def test_atualizacao_sem_documento_remove(indice):
+    # Com updateLookup, o documento pode ter sido excluído antes da leitura
+    doc = documento("Babaçu", dia=1)
+    indice.aplicar(evento("insert", doc))
+    indice.aplicar(evento("update", id_doc=doc["_id"]))
+    assert indice.contar() == 0
+
+
+def test_eventos_do_acervo_consolidado(indice):
+    doc = documento("Mapa do babaçu", dia=1, tipo="Mapa", _colecao="mapas")
+    indice.aplicar(evento("insert", doc, colecao="acervo"))
+    assert indice.buscar()[0]["_colecao"] == "mapas"
+
+    indice.aplicar(evento("delete", colecao="acervo", id_doc=doc["_id"]))
+    assert indice.contar() == 0
+
+
+def test_resumo_so_com_campos_do_card(indice):
+    doc = documento("Babaçu", dia=1, tema=["Saúde", "Educação"], descricao="x" * 1000, arquivo_original="a.pdf")
+    indice.aplicar(evento("insert", doc))
+    resumo = indice.buscar()[0]
+
+    assert "arquivo_original" not in resumo
+    assert resumo["tema"] == "Saúde, Educação"
+    assert len(resumo["descricao"]) < 1000 and resumo["descricao"].endswith("…")
+
+
+# ------------------ Ordem e paginação ------------------ #
+
+def test_ordem_com_documentos_sem_data_no_fim(indice):
+    for doc in [documento("B", dia=2), documento("sem data"), documento("C", dia=3), documento("A", dia=1)]:
+        indice.aplicar(evento("insert", doc))
+    assert titulos(indice.buscar()) == ["C", "B", "A", "sem data"]
+
+
+def test_paginacao_por_keyset(indice):
+    # Datas repetidas: o desempate é pelo _id
+    docs = [documento(f"doc {i}", dia=1 + i // 3) for i in range(7)] + [documento("sem data 1"), documento("sem data 2")]
+    for doc in docs:
+        indice.aplicar(evento("insert", doc))
+
+    completo = indice.buscar()
+    lidos, apos = [], None
+    while True:
+        pagina = indice.buscar(limite=2, apos=apos)
+        if not pagina:
+            break
+        lidos.extend(pagina)
+        apos = (pagina[-1].get("data_upload"), pagina[-1]["_id"])
+
+    assert [doc["_id"] for doc in lidos] == [doc["_id"] for doc in completo]
+    assert len(lidos) == len(docs)
+
+
+def test_busca_retorna_copias(indice):
+    indice.aplicar(evento("insert", documento("Babaçu", dia=1)))
+    indice.buscar()[0]["titulo"] = "alterado"
+    assert titulos(indice.buscar()) == ["Babaçu"]
+
+
+# ------------------ Filtros e facetas ------------------ #
+
+def test_busca_por_prefixo_sem_acento(indice):
+    indice.aplicar(evento("insert", documento("Quebradeiras de coco babaçu", dia=1)))
+    indice.aplicar(evento("insert", documento("Extrativismo", dia=2, autor="Fulano")))
+
+    assert titulos(indice.buscar(texto="babac")) == ["Quebradeiras de coco babaçu"]
+    assert titulos(indice.buscar(texto="QUEBRA BABACU")) == ["Quebradeiras de coco babaçu"]
+    assert titulos(indice.buscar(texto="fulan")) == ["Extrativismo"]
+    # Todos os termos precisam aparecer
+    assert indice.buscar(texto="babaçu fulano") == []
+
+
+def test_filtros_por_tipo_e_tema(indice):
+    indice.aplicar(evento("insert", documento("A", dia=1, tema=["Saúde", "Educação"])))
+    indice.aplicar(evento("insert", documento("B", dia=2, tema="Saúde", tipo="Vídeo"), colecao="videos"))
+    indice.aplicar(evento("insert", documento("C", dia=3, tema="Território")))
+
+    assert titulos(indice.buscar(tipos=["Publicação"])) == ["C", "A"]
+    assert titulos(indice.buscar(temas=["Saúde"])) == ["B", "A"]
+    assert indice.contar(tipos=["Publicação"], temas=["Saúde", "Território"]) == 2
+
+
+def test_temas_e_facetas(indice):
+    indice.aplicar(evento("insert", documento("A", dia=1, tema=["Saúde", "Educação", ""])))
+    indice.aplicar(evento("insert", documento("B", dia=2, tema="Saúde", tipo="Vídeo"), colecao="videos"))
+
+    assert indice.temas() == ["Educação", "Saúde"]
+    assert indice.contar_facetas() == {
+        "tipo": {"Publicação": 1, "Vídeo": 1},
+        "tema": {"Saúde": 2, "Educação": 1}
+    }
+    assert indice.contar_facetas(texto="b")["tipo"] == {"Vídeo": 1}